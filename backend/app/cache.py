@@ -0,0 +1,184 @@
+"""
+cache.py - Кэш ответов API с инвалидацией по версии данных
+Redis (REDIS_URL), если доступен, иначе LRU в памяти процесса.
+Версия данных входит в ключ, поэтому ее увеличение после записи
+новых сборок разом делает недействительными все ответы.
+Та же версия дает ETag для условных запросов HTTP
+"""
+
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+from app.metrics import cache_result
+
+logger = logging.getLogger(__name__)
+
+# Настройки
+REDIS_URL = os.getenv("REDIS_URL", "")
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+KEY_PREFIX = "pc_compare"
+VERSION_KEY = f"{KEY_PREFIX}:dataset_version"
+# Эпоха счетчика версий: после перезапуска процесса (или очистки Redis)
+# версия начинается заново, а старые ETag не должны совпасть с новыми
+EPOCH_KEY = f"{KEY_PREFIX}:dataset_epoch"
+
+class LocalCache:
+    """LRU в памяти процесса (без Redis)"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._version = 0
+        self._epoch = uuid.uuid4().hex
+        self._lock = threading.Lock()
+
+    def get_version(self) -> int:
+        return self._version
+
+    def get_tag(self) -> str:
+        return f"{self._epoch}.{self._version}"
+
+    def bump_version(self) -> int:
+        with self._lock:
+            self._version += 1
+            # Ответы старых версий больше не понадобятся
+            self._entries.clear()
+            return self._version
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class RedisCache:
+    """Кэш в Redis, общий для всех процессов API и парсинга"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get_version(self) -> int:
+        return int(self.client.get(VERSION_KEY) or 0)
+
+    def get_tag(self) -> str:
+        epoch, version = self.client.mget(EPOCH_KEY, VERSION_KEY)
+        if epoch is None:
+            self.client.set(EPOCH_KEY, uuid.uuid4().hex, nx=True)
+            epoch = self.client.get(EPOCH_KEY)
+        return f"{epoch.decode()}.{int(version or 0)}"
+
+    def bump_version(self) -> int:
+        return self.client.incr(VERSION_KEY)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self.client.set(key, value, ex=ttl)
+
+class ResponseCache:
+    """Сериализованные ответы по ключу "эндпоинт:параметры" текущей версии данных"""
+
+    def __init__(self, backend, ttl: int = 3600, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+
+    def _key(self, key: str, version: Optional[int] = None) -> str:
+        if version is None:
+            version = self.backend.get_version()
+        return f"{KEY_PREFIX}:v{version}:{key}"
+
+    def get(self, key: str, version: Optional[int] = None) -> Optional[bytes]:
+        """Ответ для версии version (по умолчанию - текущей)
+
+        Одна и та же версия, прочитанная до вычисления ответа, передается
+        в get и set: иначе ответ из данных до записи попадет под версию после нее
+        """
+        if not self.enabled or (version is not None and version < 0):
+            return None
+        try:
+            value = self.backend.get(self._key(key, version))
+        except Exception as e:
+            # Недоступный кэш не должен ломать API
+            logger.warning(f"Cache get failed: {e}")
+            return None
+        cache_result("response", value is not None)
+        return value
+
+    def set(self, key: str, value: bytes, version: Optional[int] = None):
+        if not self.enabled or (version is not None and version < 0):
+            return
+        try:
+            self.backend.set(self._key(key, version), value, self.ttl)
+        except Exception as e:
+            logger.warning(f"Cache set failed: {e}")
+
+    def version(self) -> int:
+        """Текущая версия данных (-1, если кэш недоступен)"""
+        try:
+            return self.backend.get_version()
+        except Exception as e:
+            logger.warning(f"Cache version read failed: {e}")
+            return -1
+
+    def etag(self, key: str) -> Optional[str]:
+        """Сильный ETag ответа key для текущей версии данных (None, если кэш недоступен)"""
+        try:
+            tag = self.backend.get_tag()
+        except Exception as e:
+            logger.warning(f"Cache version read failed: {e}")
+            return None
+        return '"' + hashlib.sha1(f"{tag}:{key}".encode()).hexdigest()[:24] + '"'
+
+    def bump_version(self):
+        """Данные изменились: все закэшированные ответы устарели"""
+        try:
+            version = self.backend.bump_version()
+            logger.info(f"Dataset version bumped to {version}")
+        except Exception as e:
+            logger.warning(f"Cache version bump failed: {e}")
+
+_cache: Optional[ResponseCache] = None
+
+def get_cache() -> ResponseCache:
+    """Кэш процесса: Redis, если настроен и отвечает, иначе локальный LRU"""
+    global _cache
+    if _cache is None:
+        backend = None
+        if REDIS_URL and redis is not None:
+            try:
+                client = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=1, socket_timeout=1)
+                client.ping()
+                backend = RedisCache(client)
+            except Exception as e:
+                logger.warning(f"Redis unavailable, using in-process cache: {e}")
+        _cache = ResponseCache(backend or LocalCache(CACHE_MAX_ENTRIES), CACHE_TTL, CACHE_ENABLED)
+    return _cache
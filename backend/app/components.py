@@ -0,0 +1,71 @@
+"""
+components.py - Таблица производительности CPU/GPU для сравнения по характеристикам
+Ключи таблицы - вывод PCComponentExtractor.normalize_cpu/normalize_gpu
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional
+import json
+import math
+import os
+import re
+
+COMPONENTS_PATH = os.path.join(os.path.dirname(__file__), "data", "components.json")
+
+_SEPARATORS_RE = re.compile(r"[\s\-]+")
+_SUFFIX_RE = re.compile(r"[A-Z]+$")
+
+def component_key(name: str) -> str:
+    """Ключ для поиска: без пробелов, дефисов и префикса INTEL"""
+    key = _SEPARATORS_RE.sub("", (name or "").upper())
+    return key[5:] if key.startswith("INTEL") else key
+
+class ComponentTable:
+    """Оценки производительности компонентов"""
+
+    def __init__(self, cpu: Dict[str, float], gpu: Dict[str, float]):
+        self.cpu = {component_key(name): float(score) for name, score in cpu.items()}
+        self.gpu = {component_key(name): float(score) for name, score in gpu.items()}
+
+    @classmethod
+    def load(cls, path: str = COMPONENTS_PATH) -> "ComponentTable":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["cpu"], data["gpu"])
+
+    def cpu_score(self, cpu: str) -> float:
+        """Оценка CPU; NaN, если модель неизвестна"""
+        key = component_key(cpu)
+        # I5-12400F = I5-12400; прочие суффиксы (K, X, X3D) меняют производительность
+        for candidate in self._candidates(key):
+            if candidate in self.cpu:
+                return self.cpu[candidate]
+        return math.nan
+
+    def gpu_score(self, gpu: str) -> float:
+        """Оценка GPU; NaN, если модель неизвестна"""
+        key = component_key(gpu)
+        # AMD Radeon 7900 XT нормализуется без RX
+        for candidate in (key, f"RX{key}"):
+            if candidate in self.gpu:
+                return self.gpu[candidate]
+        return math.nan
+
+    @staticmethod
+    def _candidates(key: str) -> List[str]:
+        candidates = [key]
+        if key.endswith("F"):
+            candidates.append(key[:-1])
+        candidates.append(_SUFFIX_RE.sub("", key))
+        return candidates
+
+def ram_gb(ram: Optional[str]) -> float:
+    """Объем памяти из поля ram ("16"); NaN, если не указан"""
+    try:
+        return float(ram)
+    except (TypeError, ValueError):
+        return math.nan
+
+@lru_cache(maxsize=1)
+def get_component_table() -> ComponentTable:
+    return ComponentTable.load()
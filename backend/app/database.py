@@ -0,0 +1,263 @@
+"""
+database.py - Подключение к БД, модели и массовая запись сборок
+"""
+
+from sqlalchemy import create_engine, Column, String, Float, DateTime, Boolean, Integer, Text, Index, func, inspect, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker, Session
+from dataclasses import asdict
+from typing import Dict, Iterable, List, Optional, Set
+from datetime import datetime
+import json
+import os
+
+import numpy as np
+
+# Настройки
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pc_builds.db")
+UPSERT_CHUNK_SIZE = int(os.getenv("UPSERT_CHUNK_SIZE", "500"))
+
+# База данных
+engine = create_engine(DATABASE_URL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+# Модель БД
+class PCBuildDB(Base):
+    __tablename__ = "pc_builds"
+
+    id = Column(String, primary_key=True)
+    company = Column(String, index=True)
+    title = Column(String)
+    description = Column(String)
+    price = Column(Float, index=True)
+    cpu = Column(String, index=True)
+    gpu = Column(String, index=True)
+    ram = Column(String)
+    case_color = Column(String)
+    photo_url = Column(String)
+    vk_url = Column(String)
+    parsed_at = Column(DateTime, default=datetime.now)
+    is_our_build = Column(Boolean, default=False)
+    fingerprint = Column(String)
+
+    # Цены компании без обращения к таблице: для перцентилей в агрегатах
+    __table_args__ = (Index("ix_pc_builds_company_price", "company", "price"),)
+
+# Агрегаты для /api/stats: одна строка, обновляется вместе с записью сборок
+STATS_ID = 1
+
+class BuildStatsDB(Base):
+    __tablename__ = "build_stats"
+
+    id = Column(Integer, primary_key=True)
+    total_builds = Column(Integer, default=0)
+    our_builds = Column(Integer, default=0)
+    last_update = Column(DateTime)
+    # JSON: компания -> число сборок и перцентили цен
+    companies = Column(Text, default="{}")
+
+# Инкрементальная загрузка: самый новый товар (пост) группы с прошлого обхода
+class CrawlStateDB(Base):
+    __tablename__ = "crawl_state"
+
+    group_id = Column(Integer, primary_key=True)
+    source = Column(String, primary_key=True)
+    last_item_id = Column(Integer, default=0)
+    # Дата элемента VK (unix time)
+    last_date = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.now)
+
+# Колонки, которые перезаписываются при повторном парсинге
+# (is_our_build определяется только при первой вставке)
+UPDATE_COLUMNS = [
+    column.name for column in PCBuildDB.__table__.columns
+    if column.name not in ("id", "is_our_build")
+]
+
+def ensure_schema(bind=None):
+    """Создать таблицы и добавить новые колонки в уже существующие"""
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+    # Агрегаты для уже заполненной базы считаем один раз целиком
+    with Session(bind=bind) as db:
+        if db.get(BuildStatsDB, STATS_ID) is None:
+            rebuild_stats(db)
+            db.commit()
+
+def is_our_company(company: str) -> bool:
+    """Сборка VA-PC"""
+    return "VA-PC" in (company or "").upper()
+
+def build_row(build) -> Dict:
+    """Строка для вставки из PCBuild"""
+    row = asdict(build)
+    row["is_our_build"] = is_our_company(build.company)
+    return row
+
+def upsert_builds(db: Session, builds: Iterable, chunk_size: Optional[int] = None,
+                  touched: Optional[Set[str]] = None) -> int:
+    """Массово записать сборки короткими транзакциями по chunk_size строк
+
+    PostgreSQL и SQLite - через INSERT ... ON CONFLICT DO UPDATE,
+    остальные СУБД - один запрос IN на пачку и обновление/добавление объектов.
+    С touched затронутые компании добавляются в него, а перцентили цен
+    пересчитывает вызывающий (refresh_company_stats один раз на обход);
+    без него - в конце вызова.
+    """
+    chunk_size = chunk_size or UPSERT_CHUNK_SIZE
+    dialect = db.get_bind().dialect.name
+    pending = touched if touched is not None else set()
+    written = 0
+
+    chunk = []
+    for build in builds:
+        chunk.append(build_row(build))
+        if len(chunk) >= chunk_size:
+            written += _write_chunk(db, chunk, dialect, pending)
+            chunk = []
+    if chunk:
+        written += _write_chunk(db, chunk, dialect, pending)
+
+    if touched is None:
+        refresh_company_stats(db, pending)
+    return written
+
+def _write_chunk(db: Session, rows: List[Dict], dialect: str, touched: Set[str]) -> int:
+    # Один товар может попасть в пачку дважды (два поста стены, сдвиг offset
+    # в market.get), а PostgreSQL не обновляет строку дважды в одном INSERT:
+    # оставляем последнюю версию
+    rows = list({row["id"]: row for row in rows}.values())
+
+    # Компании уже сохраненных сборок: для пересчета агрегатов
+    existing = dict(
+        db.query(PCBuildDB.id, PCBuildDB.company).filter(PCBuildDB.id.in_([row["id"] for row in rows]))
+    )
+
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        stmt = insert(PCBuildDB.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PCBuildDB.__table__.c.id],
+            set_={name: stmt.excluded[name] for name in UPDATE_COLUMNS}
+        )
+        db.execute(stmt, rows)
+    else:
+        builds = {
+            build.id: build for build in
+            db.query(PCBuildDB).filter(PCBuildDB.id.in_(list(existing)))
+        }
+        for row in rows:
+            if row["id"] in builds:
+                for name in UPDATE_COLUMNS:
+                    setattr(builds[row["id"]], name, row[name])
+            else:
+                db.add(PCBuildDB(**row))
+        db.flush()
+
+    # Агрегаты обновляются в той же транзакции, что и сборки
+    update_stats(db, rows, existing, touched)
+    db.commit()
+    return len(rows)
+
+def touch_parsed_at(db: Session, build_ids: List[str], chunk_size: Optional[int] = None):
+    """Массово обновить parsed_at без перезаписи остальных колонок"""
+    chunk_size = chunk_size or UPSERT_CHUNK_SIZE
+    now = datetime.now()
+    for start in range(0, len(build_ids), chunk_size):
+        db.query(PCBuildDB).filter(
+            PCBuildDB.id.in_(build_ids[start:start + chunk_size])
+        ).update({PCBuildDB.parsed_at: now}, synchronize_session=False)
+        _locked_stats(db).last_update = now
+        db.commit()
+
+def _locked_stats(db: Session) -> BuildStatsDB:
+    """Строка агрегатов, заблокированная до конца транзакции (на PostgreSQL)"""
+    stats = db.get(BuildStatsDB, STATS_ID, with_for_update=True)
+    if stats is None:
+        stats = BuildStatsDB(id=STATS_ID, total_builds=0, our_builds=0, companies="{}")
+        db.add(stats)
+    return stats
+
+def update_stats(db: Session, rows: List[Dict], existing: Dict[str, str], touched: Set[str]):
+    """Учесть записанную пачку в агрегатах
+
+    Счетчики меняются на число новых сборок (is_our_build при обновлении
+    не меняется), затронутые компании добавляются в touched: их перцентили
+    цен пересчитывает refresh_company_stats.
+    """
+    stats = _locked_stats(db)
+    # Новые сборки - по различным id (повтор id в пачке - одна строка)
+    new_rows = {row["id"]: row for row in rows if row["id"] not in existing}
+    stats.total_builds = (stats.total_builds or 0) + len(new_rows)
+    stats.our_builds = (stats.our_builds or 0) + sum(1 for row in new_rows.values() if row["is_our_build"])
+
+    latest = max(row["parsed_at"] for row in rows)
+    if stats.last_update is None or latest > stats.last_update:
+        stats.last_update = latest
+
+    touched.update(({row["company"] for row in rows} | set(existing.values())) - {None})
+
+def refresh_company_stats(db: Session, companies: Set[str]):
+    """Пересчитать перцентили цен затронутых компаний (одна транзакция)"""
+    if not companies:
+        return
+    stats = _locked_stats(db)
+    values = json.loads(stats.companies or "{}")
+    values.update(company_stats(db, companies))
+    stats.companies = json.dumps(
+        {name: value for name, value in values.items() if value}, ensure_ascii=False
+    )
+    db.commit()
+
+def company_stats(db: Session, companies: Optional[Set[str]] = None) -> Dict[str, Optional[Dict]]:
+    """Число сборок и перцентили цен по компаниям (все компании, если не указаны)
+
+    None - у компании больше нет сборок с ценой.
+    """
+    if companies is None:
+        companies = {company for company, in db.query(PCBuildDB.company).distinct()} - {None}
+
+    result = {}
+    for company in companies:
+        prices = np.fromiter(db.execute(
+            select(PCBuildDB.price).where(PCBuildDB.company == company, PCBuildDB.price.isnot(None))
+        ).scalars(), dtype=np.float64)
+        if not len(prices):
+            result[company] = None
+            continue
+        p25, median, p75 = np.percentile(prices, [25, 50, 75])
+        result[company] = {
+            "builds": len(prices),
+            "min_price": float(prices.min()),
+            "p25_price": float(p25),
+            "median_price": float(median),
+            "p75_price": float(p75),
+            "max_price": float(prices.max()),
+        }
+    return result
+
+def rebuild_stats(db: Session):
+    """Пересчитать агрегаты по всей таблице"""
+    stats = _locked_stats(db)
+    stats.total_builds = db.query(func.count(PCBuildDB.id)).scalar() or 0
+    stats.our_builds = db.query(func.count(PCBuildDB.id)).filter(PCBuildDB.is_our_build == True).scalar() or 0
+    stats.last_update = db.query(func.max(PCBuildDB.parsed_at)).scalar()
+    stats.companies = json.dumps(
+        {name: value for name, value in company_stats(db).items() if value}, ensure_ascii=False
+    )
@@ -0,0 +1,243 @@
+"""
+indexes.py - Снимки сборок в памяти процесса API для быстрого сравнения
+Снимок строится из БД и атомарно заменяется при смене версии данных
+"""
+
+from typing import Callable, Generic, Iterable, List, Optional, Tuple, TypeVar
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.components import ComponentTable, get_component_table, ram_gb
+from app.database import SessionLocal, PCBuildDB
+from app.metrics import cache_result
+
+logger = logging.getLogger(__name__)
+
+# Настройки
+PRICE_INDEX_ENABLED = os.getenv("PRICE_INDEX_ENABLED", "true").lower() == "true"
+# Веса признаков GPU, CPU, RAM при поиске похожих сборок
+SPEC_WEIGHTS = [float(w) for w in os.getenv("SPEC_WEIGHTS", "1.0,0.6,0.2").split(",")]
+# Вклад признака, неизвестного у одной из сборок (как разница в 50% шкалы)
+SPEC_MISSING_PENALTY = 0.25
+# Сколько запрос ждет перестройки снимка, прежде чем идти в БД (секунд):
+# ожидание занимает поток пула запросов, поэтому оно короткое
+SNAPSHOT_WAIT_TIMEOUT = float(os.getenv("SNAPSHOT_WAIT_TIMEOUT", "1"))
+
+T = TypeVar("T")
+
+class PriceIndex:
+    """Сборки конкурентов, отсортированные по цене"""
+
+    def __init__(self, ids: List[str], prices: np.ndarray):
+        self.ids = ids
+        self.prices = prices
+
+    @classmethod
+    def from_db(cls, db: Session) -> "PriceIndex":
+        rows = db.query(PCBuildDB.id, PCBuildDB.price).filter(
+            PCBuildDB.is_our_build == False,
+            PCBuildDB.price.isnot(None)
+        ).order_by(PCBuildDB.price, PCBuildDB.id).all()
+        return cls([row[0] for row in rows], np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def window(self, min_price: float, max_price: float,
+               exclude: Optional[str] = None, limit: int = 20) -> List[str]:
+        """id сборок с ценой в [min_price, max_price] по возрастанию цены"""
+        start = int(np.searchsorted(self.prices, min_price, side="left"))
+        end = int(np.searchsorted(self.prices, max_price, side="right"))
+        ids = self.ids[start:min(end, start + limit + 1)]
+        return [build_id for build_id in ids if build_id != exclude][:limit]
+
+class SpecIndex:
+    """Матрица признаков сборок конкурентов для поиска похожих по характеристикам"""
+
+    def __init__(self, ids: List[str], features: np.ndarray, prices: np.ndarray,
+                 weights: Optional[List[float]] = None):
+        self.ids = ids
+        self.weights = np.asarray(weights or SPEC_WEIGHTS, dtype=np.float32)
+
+        # Столбцы признаков (NaN -> 0) и веса с нулем для неизвестных значений:
+        # запрос - несколько проходов по непрерывным float32-массивам без проверок NaN
+        known = ~np.isnan(features)
+        self.columns = np.ascontiguousarray(np.where(known, features, 0).T, dtype=np.float32)
+        self.known_weights = np.ascontiguousarray((known * self.weights).T, dtype=np.float32)
+        # Штраф за признаки, неизвестные у самой сборки
+        self.base = ((~known) * self.weights).sum(axis=1).astype(np.float32) * np.float32(SPEC_MISSING_PENALTY)
+
+        # Цена сравнивается в логарифмах: 100k vs 150k и 200k vs 300k - одинаковая разница
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_prices = np.log(prices.astype(np.float32))
+        self.price_known = np.isfinite(log_prices).astype(np.float32)
+        self.log_prices = np.where(self.price_known > 0, log_prices, 0).astype(np.float32)
+
+    @staticmethod
+    def build_features(cpu: str, gpu: str, ram: str,
+                       table: Optional[ComponentTable] = None) -> List[float]:
+        """Нормированные признаки [GPU, CPU, RAM]; NaN - неизвестно"""
+        table = table or get_component_table()
+        memory = ram_gb(ram)
+        return [
+            table.gpu_score(gpu) / 100,
+            table.cpu_score(cpu) / 100,
+            # 8 GB -> 3/7, 128 GB -> 1
+            math.log2(memory) / 7 if memory > 0 else math.nan,
+        ]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, str, str, float]]) -> "SpecIndex":
+        """Строки (id, cpu, gpu, ram, price)"""
+        table = get_component_table()
+        ids, features, prices = [], [], []
+        for build_id, cpu, gpu, ram, price in rows:
+            ids.append(build_id)
+            features.append(cls.build_features(cpu, gpu, ram, table))
+            prices.append(price or 0)
+        return cls(ids, np.array(features, dtype=np.float32).reshape(-1, 3),
+                   np.array(prices, dtype=np.float32))
+
+    @classmethod
+    def from_db(cls, db: Session) -> "SpecIndex":
+        return cls.from_rows(db.query(
+            PCBuildDB.id, PCBuildDB.cpu, PCBuildDB.gpu, PCBuildDB.ram, PCBuildDB.price
+        ).filter(PCBuildDB.is_our_build == False).yield_per(10000))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def nearest(self, target: List[float], price: float = 0, limit: int = 20,
+                price_weight: float = 0.0, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Ближайшие сборки (id, расстояние) одним векторным вычислением"""
+        if not self.ids:
+            return []
+
+        distance = self.base.copy()
+        term = np.empty_like(distance)
+        for column, known_weights, value in zip(self.columns, self.known_weights, target):
+            if math.isnan(value):
+                # Признак неизвестен у целевой сборки - одинаковый штраф для всех
+                np.multiply(known_weights, np.float32(SPEC_MISSING_PENALTY), out=term)
+            else:
+                np.subtract(column, np.float32(value), out=term)
+                np.multiply(term, term, out=term)
+                np.multiply(term, known_weights, out=term)
+            distance += term
+
+        if price_weight and price > 0:
+            np.subtract(self.log_prices, np.float32(math.log(price)), out=term)
+            np.multiply(term, term, out=term)
+            np.multiply(term, self.price_known, out=term)
+            distance += np.float32(price_weight) * term
+
+        # Частичная сортировка: полная нужна только для top-k
+        k = min(limit + 1, len(self.ids))
+        top = np.argpartition(distance, k - 1)[:k]
+        top = top[np.argsort(distance[top], kind="stable")]
+
+        return [(self.ids[i], float(distance[i])) for i in top if self.ids[i] != exclude][:limit]
+
+class Snapshot(Generic[T]):
+    """Снимок данных для версии датасета; перестраивается в фоновом потоке"""
+
+    def __init__(self, name: str, build: Callable[[Session], T], enabled: bool = True):
+        self.name = name
+        self.metric_name = name.replace(" ", "_")
+        self.build = build
+        self.enabled = enabled
+        self._current: Optional[Tuple[int, T]] = None
+        self._building = False
+        # Версия, для которой идет перестройка
+        self._target = -1
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+
+    def get(self, version: int) -> Optional[T]:
+        """Снимок нужной версии или None (тогда запрос идет в БД, а снимок строится в фоне)"""
+        # Версия неизвестна (кэш недоступен) - снимку нельзя доверять
+        if not self.enabled or version < 0:
+            return None
+        current = self._current
+        hit = current is not None and current[0] == version
+        cache_result(self.metric_name, hit)
+        if hit:
+            return current[1]
+        self.rebuild_async(version)
+        return None
+
+    def wait(self, version: int, timeout: float = SNAPSHOT_WAIT_TIMEOUT) -> Optional[T]:
+        """Снимок версии не старше version; при промахе ждет перестройку
+
+        Все запросы ждут одну перестройку вместо того, чтобы строить
+        по копии. None - снимки выключены, версия неизвестна, перестройка
+        не удалась или не успела за timeout
+        """
+        current = self._current
+        if self.enabled and version >= 0 and current is not None and current[0] > version:
+            # Версия прочитана до перестройки, начатой другим запросом: снимок не старше нее
+            return current[1]
+        value = self.get(version)
+        if value is not None or not self.enabled or version < 0:
+            return value
+
+        deadline = time.monotonic() + timeout
+        awaited = False
+        with self._ready:
+            while True:
+                current = self._current
+                # Перестройка, начатая после чтения версии, видит данные не старше нее
+                if current is not None and current[0] >= version:
+                    return current[1]
+                if not self._building:
+                    if awaited:
+                        # Перестройка для нужной версии завершилась без снимка
+                        return None
+                    self._start(version)
+                awaited = awaited or self._target >= version
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._ready.wait(remaining)
+
+    def rebuild_async(self, version: int):
+        """Запустить перестройку, если она еще не идет"""
+        if not self.enabled or version < 0:
+            return
+        with self._lock:
+            if not self._building:
+                self._start(version)
+
+    def _start(self, version: int):
+        """Поток перестройки (вызывается под self._lock)"""
+        self._building = True
+        self._target = version
+        threading.Thread(target=self._rebuild, args=(version,), daemon=True).start()
+
+    def _rebuild(self, version: int):
+        """Построить снимок и заменить текущий одной операцией присваивания"""
+        try:
+            with SessionLocal() as db:
+                value = self.build(db)
+            self._current = (version, value)
+            logger.info(f"{self.name} rebuilt for dataset version {version}")
+        except Exception as e:
+            logger.error(f"Failed to rebuild {self.name}: {e}")
+        finally:
+            with self._ready:
+                self._building = False
+                self._ready.notify_all()
+
+price_index: Snapshot[PriceIndex] = Snapshot("price index", PriceIndex.from_db, PRICE_INDEX_ENABLED)
+spec_index: Snapshot[SpecIndex] = Snapshot("spec index", SpecIndex.from_db)
+
+def rebuild_indexes(version: int):
+    """Перестроить все снимки в фоне (после записи новых данных)"""
+    price_index.rebuild_async(version)
+    spec_index.rebuild_async(version)
@@ -2,50 +2,37 @@
 main.py - FastAPI backend для системы сравнения ПК сборок
 """
 
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, String, Float, DateTime, Boolean, func
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
+import json
 import os
-import asyncio
-from app.parser.unified_parser import UnifiedVKParser
+from app.database import SessionLocal, PCBuildDB, BuildStatsDB, STATS_ID, ensure_schema
+from app import metrics, worker
+from app.cache import get_cache
+from app.indexes import price_index, spec_index, rebuild_indexes, PriceIndex, SpecIndex
+from app.serialization import FIELDS, build_columns, dumps, format_rows, parse_fields
 
 # Настройки
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pc_builds.db")
 VK_TOKEN = os.getenv("VK_TOKEN", "")
 MIN_PRICE = float(os.getenv("MIN_PRICE", "40000"))
 PRICE_COMPARISON_RANGE = float(os.getenv("PRICE_COMPARISON_RANGE", "50000"))
+INCREMENTAL_PARSE = os.getenv("INCREMENTAL_PARSE", "true").lower() == "true"
+# Ответы больше этого размера (байт) сжимаются gzip, если клиент его принимает
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1000"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Данные меняются только после парсинга: браузер перепроверяет ответ по ETag
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+HTTP_CACHE_CONTROL = f"public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate"
 
-# База данных
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+ensure_schema()
 
-# Модель БД
-class PCBuildDB(Base):
-    __tablename__ = "pc_builds"
-    
-    id = Column(String, primary_key=True)
-    company = Column(String, index=True)
-    title = Column(String)
-    description = Column(String)
-    price = Column(Float, index=True)
-    cpu = Column(String, index=True)
-    gpu = Column(String, index=True)
-    ram = Column(String)
-    case_color = Column(String)
-    photo_url = Column(String)
-    vk_url = Column(String)
-    parsed_at = Column(DateTime, default=datetime.now)
-    is_our_build = Column(Boolean, default=False)
-
-Base.metadata.create_all(bind=engine)
-
-# Pydantic модели
+# Pydantic модели (схема ответов; сами ответы собирает app.serialization)
 class BuildResponse(BaseModel):
     id: str
     company: str
@@ -68,10 +55,21 @@ class BuildResponse(BaseModel):
 class ComparisonRequest(BaseModel):
     build_id: str
     comparison_type: str
+    # Для comparison_type="similar": вес близости по цене (0 - не учитывать)
+    price_weight: float = 0.0
+
+class BatchComparisonRequest(BaseModel):
+    # Пусто - все наши сборки
+    build_ids: Optional[List[str]] = None
+    comparison_type: str = "price"
+    price_weight: float = 0.0
 
 class ParseRequest(BaseModel):
     group_ids: List[int]
     source: str = "market"
+    incremental: bool = INCREMENTAL_PARSE
+    # Все страницы групп, а не только новые с прошлого обхода
+    full_resync: bool = False
 
 # FastAPI app
 app = FastAPI(
@@ -87,7 +85,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL)
+# Внешний слой: время ответа включает сжатие
+app.add_middleware(metrics.MetricsMiddleware,
+                   routes=lambda: {route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")})
+
+# Параметр fields= списков: "id,title,price" (без description ответ в разы меньше)
+FIELDS_QUERY = Query(None, description="Поля ответа через запятую, по умолчанию все")
 
 # Dependency для получения БД сессии
 def get_db():
@@ -105,191 +111,354 @@ async def root():
     return {"status": "ok", "service": "VK PC Build Comparator", "version": "1.0.0"}
 
 @app.get("/api/builds/our", response_model=List[BuildResponse])
-async def get_our_builds(db: Session = Depends(get_db)):
+def get_our_builds(request: Request, fields: Optional[str] = FIELDS_QUERY, db: Session = Depends(get_db)):
     """Получить список наших сборок (VA-PC)"""
-    builds = db.query(PCBuildDB).filter(
-        PCBuildDB.is_our_build == True
-    ).order_by(PCBuildDB.price).all()
+    columns = response_fields(fields)
     
-    return [format_build_response(build) for build in builds]
+    def load():
+        rows = db.query(*build_columns(columns)).filter(
+            PCBuildDB.is_our_build == True
+        ).order_by(PCBuildDB.price)
+        
+        return format_rows(rows, columns)
+        
+    return cached_response(f"builds:our:{','.join(columns)}", load, request)
 
 @app.get("/api/builds/{build_id}", response_model=BuildResponse)
-async def get_build(build_id: str, db: Session = Depends(get_db)):
+def get_build(build_id: str, request: Request, db: Session = Depends(get_db)):
     """Получить информацию о конкретной сборке"""
-    build = db.query(PCBuildDB).filter(PCBuildDB.id == build_id).first()
-    
-    if not build:
-        raise HTTPException(status_code=404, detail="Build not found")
+    def load():
+        rows = format_rows(db.query(*build_columns()).filter(PCBuildDB.id == build_id).limit(1))
+        if not rows:
+            raise HTTPException(status_code=404, detail="Build not found")
+        return rows[0]
         
-    return format_build_response(build)
+    return cached_response(f"build:{build_id}", load, request)
 
 @app.post("/api/compare/price", response_model=List[BuildResponse])
-async def compare_by_price(
+def compare_by_price(
     request: ComparisonRequest,
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db)
 ):
     """Сравнить сборку с другими по цене (±50k рублей)"""
-    
-    target = db.query(PCBuildDB).filter(PCBuildDB.id == request.build_id).first()
-    if not target:
-        raise HTTPException(status_code=404, detail="Build not found")
-    
-    min_price = target.price - PRICE_COMPARISON_RANGE
-    max_price = target.price + PRICE_COMPARISON_RANGE
-    
-    similar = db.query(PCBuildDB).filter(
-        PCBuildDB.price >= min_price,
-        PCBuildDB.price <= max_price,
-        PCBuildDB.id != target.id,
-        PCBuildDB.is_our_build == False
-    ).order_by(PCBuildDB.price).limit(20).all()
-    
-    results = []
-    for build in similar:
-        response = format_build_response(build)
-        
-        if build.price < target.price:
-            response.price_comparison = "cheaper"
-        elif build.price > target.price:
-            response.price_comparison = "more_expensive"
-        else:
-            response.price_comparison = "equal"
-            
-        results.append(response)
-    
-    return results
+    return price_comparison(db, request.build_id, response_fields(fields))
+
+@app.get("/api/compare/price", response_model=List[BuildResponse])
+def compare_by_price_get(
+    request: Request,
+    build_id: str,
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_db)
+):
+    """То же, что POST /api/compare/price, с кэшированием HTTP"""
+    return price_comparison(db, build_id, response_fields(fields), request)
 
 @app.post("/api/compare/specs", response_model=List[BuildResponse])
-async def compare_by_specs(
+def compare_by_specs(
     request: ComparisonRequest,
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db)
 ):
-    """Сравнить сборку с другими по CPU и GPU"""
+    """Сравнить сборку с другими по CPU и GPU
     
-    target = db.query(PCBuildDB).filter(PCBuildDB.id == request.build_id).first()
-    if not target:
-        raise HTTPException(status_code=404, detail="Build not found")
-    
-    similar = db.query(PCBuildDB).filter(
-        PCBuildDB.cpu == target.cpu,
-        PCBuildDB.gpu == target.gpu,
-        PCBuildDB.id != target.id,
-        PCBuildDB.is_our_build == False
-    ).order_by(PCBuildDB.price).limit(20).all()
-    
-    results = []
-    for build in similar:
-        response = format_build_response(build)
-        
-        if build.price < target.price:
-            response.price_comparison = "cheaper"
-        elif build.price > target.price:
-            response.price_comparison = "more_expensive"
-        else:
-            response.price_comparison = "equal"
-            
-        results.append(response)
+    comparison_type="similar" - ранжирование по близости производительности
+    CPU/GPU и объема памяти вместо точного совпадения моделей
+    """
+    return specs_comparison(db, request.build_id, request.comparison_type,
+                            request.price_weight, response_fields(fields))
+
+@app.get("/api/compare/specs", response_model=List[BuildResponse])
+def compare_by_specs_get(
+    request: Request,
+    build_id: str,
+    comparison_type: str = "specs",
+    price_weight: float = 0.0,
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_db)
+):
+    """То же, что POST /api/compare/specs, с кэшированием HTTP"""
+    return specs_comparison(db, build_id, comparison_type, price_weight, response_fields(fields), request)
+
+@app.post("/api/compare/batch", response_model=Dict[str, List[BuildResponse]])
+def compare_batch(
+    request: BatchComparisonRequest,
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_db)
+):
+    """Сравнить несколько сборок (по умолчанию все наши) за один запрос
     
-    return results
+    Ответ - словарь id сборки -> результаты, как у /api/compare/price
+    (comparison_type="price"), /api/compare/specs ("specs" или "similar")
+    """
+    return batch_comparison(db, request.comparison_type, request.build_ids,
+                            request.price_weight, response_fields(fields))
+
+@app.get("/api/compare/batch", response_model=Dict[str, List[BuildResponse]])
+def compare_batch_get(
+    request: Request,
+    comparison_type: str = "price",
+    build_ids: Optional[str] = Query(None, description="id сборок через запятую, по умолчанию все наши"),
+    price_weight: float = 0.0,
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_db)
+):
+    """То же, что POST /api/compare/batch, с кэшированием HTTP"""
+    ids = [build_id for build_id in (build_ids or "").split(",") if build_id]
+    return batch_comparison(db, comparison_type, ids or None, price_weight, response_fields(fields), request)
 
 @app.post("/api/parse/start")
 async def start_parsing(
     request: ParseRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks
 ):
-    """Запустить парсинг групп VK"""
+    """Запустить парсинг групп VK (в отдельном процессе)"""
     
     if not VK_TOKEN:
         raise HTTPException(status_code=500, detail="VK token not configured")
     
     background_tasks.add_task(
-        parse_groups_task,
+        worker.submit_parse_job,
         request.group_ids,
         request.source,
-        db
+        request.incremental,
+        request.full_resync
     )
     
     return {
         "status": "parsing_started",
         "groups": request.group_ids,
-        "source": request.source
+        "source": request.source,
+        "incremental": request.incremental,
+        "full_resync": request.full_resync
     }
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Метрики Prometheus"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/api/stats")
-async def get_statistics(db: Session = Depends(get_db)):
-    """Получить статистику по базе"""
-    
-    total_builds = db.query(PCBuildDB).count()
-    our_builds = db.query(PCBuildDB).filter(PCBuildDB.is_our_build == True).count()
-    other_builds = total_builds - our_builds
+def get_statistics(request: Request, db: Session = Depends(get_db)):
+    """Получить статистику по базе (из таблицы агрегатов)"""
     
-    last_update = db.query(PCBuildDB.parsed_at).order_by(
-        PCBuildDB.parsed_at.desc()
-    ).first()
-    
-    return {
-        "total_builds": total_builds,
-        "our_builds": our_builds,
-        "other_builds": other_builds,
-        "last_update": last_update[0] if last_update else None
-    }
+    def load():
+        stats = db.get(BuildStatsDB, STATS_ID)
+        total_builds = stats.total_builds if stats else 0
+        our_builds = stats.our_builds if stats else 0
+        
+        return {
+            "total_builds": total_builds,
+            "our_builds": our_builds,
+            "other_builds": total_builds - our_builds,
+            "last_update": stats.last_update if stats else None,
+            "companies": json.loads(stats.companies or "{}") if stats else {}
+        }
+        
+    return cached_response("stats", load, request)
 
 # === Helper функции ===
 
-def format_build_response(build: PCBuildDB) -> BuildResponse:
-    """Форматирование ответа для сборки"""
-    return BuildResponse(
-        id=build.id,
-        company=build.company,
-        title=build.title,
-        description=build.description,
-        price=build.price,
-        price_formatted=f"{int(build.price):,} руб.".replace(',', ' '),
-        cpu=build.cpu or "Не указан",
-        gpu=build.gpu or "Не указана",
-        ram=f"{build.ram} GB" if build.ram else "Не указана",
-        case_color=build.case_color or "Не определен",
-        photo_url=build.photo_url,
-        vk_url=build.vk_url,
-        is_our_build=build.is_our_build,
-        price_comparison=None
-    )
+def cached_response(key: str, load: Callable[[], Any], request: Optional[Request] = None) -> Response:
+    """Ответ из кэша; при промахе - результат load(), сохраненный в кэш
+    
+    С request (GET) ответ получает ETag версии данных и Cache-Control,
+    а совпавший If-None-Match дает 304 без обращения к кэшу и БД
+    """
+    cache = get_cache()
+    headers = {}
+    if request is not None:
+        etag = cache.etag(key)
+        if etag:
+            headers = {"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL}
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+                
+    # Версия читается один раз до load(): ответ сохраняется под версией,
+    # не новее данных, из которых он построен
+    version = cache.version()
+    body = cache.get(key, version)
+    if body is None:
+        body = dumps(load())
+        cache.set(key, body, version)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Есть ли etag в заголовке If-None-Match (слабое сравнение, RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def price_comparison(db: Session, build_id: str, columns: tuple,
+                     request: Optional[Request] = None) -> Response:
+    def load():
+        target = get_target(db, build_id)
+        return comparison_results(db, [target], find_price_matches(db, [target]), columns)[target.id]
+        
+    return cached_response(f"compare:price:{build_id}:{','.join(columns)}", load, request)
+
+def specs_comparison(db: Session, build_id: str, comparison_type: str, price_weight: float,
+                     columns: tuple, request: Optional[Request] = None) -> Response:
+    def load():
+        target = get_target(db, build_id)
+        if comparison_type == "similar":
+            matches = find_similar_matches(db, [target], price_weight)
+        else:
+            matches = find_spec_matches(db, [target])
+        return comparison_results(db, [target], matches, columns)[target.id]
+        
+    key = f"compare:specs:{build_id}"
+    if comparison_type == "similar":
+        key = f"compare:similar:{build_id}:{price_weight}"
+    return cached_response(f"{key}:{','.join(columns)}", load, request)
+
+def batch_comparison(db: Session, comparison_type: str, build_ids: Optional[List[str]],
+                     price_weight: float, columns: tuple, request: Optional[Request] = None) -> Response:
+    if comparison_type not in ("price", "specs", "similar"):
+        raise HTTPException(status_code=400, detail="Unknown comparison type")
+    
+    def load():
+        query = db.query(PCBuildDB)
+        if build_ids:
+            query = query.filter(PCBuildDB.id.in_(build_ids))
+        else:
+            query = query.filter(PCBuildDB.is_our_build == True)
+        targets = query.order_by(PCBuildDB.price).all()
+        
+        if comparison_type == "price":
+            matches = find_price_matches(db, targets)
+        elif comparison_type == "similar":
+            matches = find_similar_matches(db, targets, price_weight)
+        else:
+            matches = find_spec_matches(db, targets)
+        return comparison_results(db, targets, matches, columns)
+        
+    scope = "ours"
+    if build_ids:
+        scope = hashlib.sha1("\n".join(sorted(build_ids)).encode()).hexdigest()
+    key = f"compare:batch:{comparison_type}:{price_weight}:{scope}:{','.join(columns)}"
+    return cached_response(key, load, request)
 
-async def parse_groups_task(group_ids: List[int], source: str, db: Session):
-    """Фоновая задача для парсинга групп"""
+def response_fields(fields: Optional[str]) -> tuple:
+    """Поля ответа из параметра fields= или 400"""
     try:
-        parser = UnifiedVKParser(VK_TOKEN, MIN_PRICE)
-        builds = await parser.parse_groups(group_ids, source)
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def get_target(db: Session, build_id: str) -> PCBuildDB:
+    """Сборка для сравнения или 404"""
+    target = db.query(PCBuildDB).filter(PCBuildDB.id == build_id).first()
+    if not target:
+        raise HTTPException(status_code=404, detail="Build not found")
+    return target
+
+def find_price_matches(db: Session, targets: List[PCBuildDB]) -> Dict[str, List[str]]:
+    """id сборок конкурентов в окне ±PRICE_COMPARISON_RANGE для каждой цели"""
+    index = price_index.get(get_cache().version())
+    if index is None and len(targets) > 1:
+        # Для пакета один проход по отсортированным ценам дешевле запроса на каждую цель
+        index = PriceIndex.from_db(db)
+        
+    matches = {}
+    for target in targets:
+        min_price = target.price - PRICE_COMPARISON_RANGE
+        max_price = target.price + PRICE_COMPARISON_RANGE
+        if index is not None:
+            # Окно цен - два бинарных поиска по снимку
+            matches[target.id] = index.window(min_price, max_price, exclude=target.id, limit=20)
+        else:
+            matches[target.id] = [row[0] for row in db.query(PCBuildDB.id).filter(
+                PCBuildDB.price >= min_price,
+                PCBuildDB.price <= max_price,
+                PCBuildDB.id != target.id,
+                PCBuildDB.is_our_build == False
+            ).order_by(PCBuildDB.price).limit(20)]
+    return matches
+
+def find_spec_matches(db: Session, targets: List[PCBuildDB]) -> Dict[str, List[str]]:
+    """id сборок конкурентов с теми же CPU и GPU, по возрастанию цены"""
+    keys = {(target.cpu, target.gpu) for target in targets}
+    
+    # Один запрос на все пары CPU/GPU, группировка в памяти
+    groups: Dict[tuple, List[str]] = {key: [] for key in keys}
+    if keys:
+        rows = db.query(PCBuildDB.id, PCBuildDB.cpu, PCBuildDB.gpu).filter(
+            tuple_(PCBuildDB.cpu, PCBuildDB.gpu).in_(list(keys)),
+            PCBuildDB.is_our_build == False
+        ).order_by(PCBuildDB.price)
+        for build_id, cpu, gpu in rows:
+            groups[(cpu, gpu)].append(build_id)
+            
+    return {
+        target.id: [build_id for build_id in groups[(target.cpu, target.gpu)] if build_id != target.id][:20]
+        for target in targets
+    }
+
+def find_similar_matches(db: Session, targets: List[PCBuildDB], price_weight: float = 0.0) -> Dict[str, List[str]]:
+    """id ближайших по производительности сборок конкурентов"""
+    # Промах снимка недолго ждет общую перестройку (SNAPSHOT_WAIT_TIMEOUT), затем - индекс из БД
+    index = spec_index.wait(get_cache().version())
+    if index is None:
+        index = SpecIndex.from_db(db)
         
-        for build_data in builds:
-            existing = db.query(PCBuildDB).filter(
-                PCBuildDB.id == build_data.id
-            ).first()
+    return {
+        target.id: [build_id for build_id, _ in index.nearest(
+            SpecIndex.build_features(target.cpu, target.gpu, target.ram),
+            target.price, limit=20, price_weight=price_weight, exclude=target.id
+        )]
+        for target in targets
+    }
+
+def comparison_results(db: Session, targets: List[PCBuildDB], matches: Dict[str, List[str]],
+                       fields: tuple = FIELDS) -> Dict[str, List[Dict[str, Any]]]:
+    """Ответы для найденных сборок: одна выборка строк по id на все цели"""
+    ids = list({build_id for build_ids in matches.values() for build_id in build_ids})
+    responses: Dict[str, Dict[str, Any]] = {}
+    prices: Dict[str, float] = {}
+    for start in range(0, len(ids), 500):
+        rows = db.query(*build_columns(fields)).filter(PCBuildDB.id.in_(ids[start:start + 500])).all()
+        for row, response in zip(rows, format_rows(rows, fields)):
+            responses[row[0]] = response
+            prices[row[0]] = row[4]
             
-            if existing:
-                for key, value in build_data.to_dict().items():
-                    setattr(existing, key, value)
+    with_comparison = "price_comparison" in fields
+    results = {}
+    for target in targets:
+        results[target.id] = []
+        for build_id in matches.get(target.id, []):
+            response = responses.get(build_id)
+            if response is None:
+                continue
+            if not with_comparison:
+                results[target.id].append(response)
+                continue
+            
+            if prices[build_id] < target.price:
+                price_comparison = "cheaper"
+            elif prices[build_id] > target.price:
+                price_comparison = "more_expensive"
             else:
-                db_build = PCBuildDB(**build_data.to_dict())
+                price_comparison = "equal"
                 
-                if "VA-PC" in build_data.company.upper():
-                    db_build.is_our_build = True
-                    
-                db.add(db_build)
-        
-        db.commit()
-        
-    except Exception as e:
-        print(f"Parsing error: {e}")
-        db.rollback()
+            results[target.id].append({**response, "price_comparison": price_comparison})
+    return results
 
 @app.on_event("startup")
 async def startup_event():
     """Инициализация при запуске"""
     print("Starting VK PC Build Comparator API...")
+    rebuild_indexes(get_cache().version())
     # Можно добавить автоматический парсинг при старте
 
+@app.on_event("shutdown")
+def shutdown_event():
+    """Остановка пула парсинга"""
+    worker.shutdown()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,143 @@
+"""
+metrics.py - Метрики Prometheus для парсера и API
+Без prometheus-client метрики - пустые заглушки, /metrics отдает комментарий.
+Парсинг идет в отдельном процессе: чтобы его метрики попали в /metrics API,
+задайте PROMETHEUS_MULTIPROC_DIR (пустой каталог, общий для всех процессов)
+"""
+
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+import os
+import time
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Histogram
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover
+    prometheus_client = None
+
+# Настройки
+PROMETHEUS_ENABLED = os.getenv("PROMETHEUS_ENABLED", "true").lower() == "true"
+
+PREFIX = "pc_compare"
+
+# Границы гистограмм: от долей миллисекунды (извлечение страницы) до минут (пачка CLIP на CPU)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class _NoopMetric:
+    """Заглушка метрики: тот же интерфейс, ничего не делает"""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def observe(self, amount: float):
+        pass
+
+    @contextmanager
+    def time(self):
+        yield
+
+def _metric(kind: str, name: str, documentation: str, labels: Tuple[str, ...], **kwargs):
+    if prometheus_client is None or not PROMETHEUS_ENABLED:
+        return _NoopMetric()
+    factory = Histogram if kind == "histogram" else Counter
+    return factory(f"{PREFIX}_{name}", documentation, labels, **kwargs)
+
+# Стадии парсинга: rate_limit_wait, vk_call, page_batch, extract, image_download,
+# color_histogram, color_inference, db_upsert, db_touch, db_company_stats
+STAGE_SECONDS = _metric(
+    "histogram", "stage_seconds", "Время стадии парсинга (на один вызов)", ("stage",),
+    buckets=STAGE_BUCKETS,
+)
+VK_CALLS = _metric(
+    "counter", "vk_calls", "Вызовы VK API: метод, адрес API и код ошибки (0 - успех, http_NNN, exception)",
+    ("method", "endpoint", "code"),
+)
+VK_FALLBACKS = _metric(
+    "counter", "vk_fallbacks", "Переходы на следующий адрес из fallback_urls", ("method", "endpoint"),
+)
+VK_RETRIES = _metric(
+    "counter", "vk_retries", "Повторы вызовов VK API: rate_limit, server, breaker_open", ("method", "reason"),
+)
+VK_BREAKER_OPENS = _metric(
+    "counter", "vk_breaker_opens", "Отключения адреса API автоматом после серии сбоев", ("endpoint",),
+)
+CACHE_REQUESTS = _metric(
+    "counter", "cache_requests", "Обращения к кэшам: response, color_url, color_hash, price_index, spec_index",
+    ("cache", "result"),
+)
+COLOR_PHOTOS = _metric(
+    "counter", "color_photos", "Фото, цвет которых определил уровень: url_cache, hash_cache, histogram, model",
+    ("tier",),
+)
+ITEMS = _metric(
+    "counter", "items", "Товары парсинга: build, unchanged, below_min_price, failed", ("result",),
+)
+HTTP_REQUEST_SECONDS = _metric(
+    "histogram", "http_request_seconds", "Время ответа API по маршруту", ("method", "route", "status"),
+    buckets=HTTP_BUCKETS,
+)
+
+def stage(name: str):
+    """Таймер стадии: with stage("extract"): ..."""
+    return STAGE_SECONDS.labels(name).time()
+
+def cache_result(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+def render() -> Tuple[bytes, str]:
+    """Тело и Content-Type ответа /metrics"""
+    if prometheus_client is None:
+        return b"# prometheus-client is not installed\n", "text/plain; charset=utf-8"
+    registry = prometheus_client.REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Сумма по всем процессам: API (uvicorn --workers) и воркерам парсинга
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+class MetricsMiddleware:
+    """ASGI-middleware: время ответа по шаблону маршрута ("/api/builds/{build_id}")
+
+    Шаблон, а не путь запроса, чтобы число рядов метрики не росло с числом id
+    """
+
+    def __init__(self, app, routes: Optional[Callable[[], Dict]] = None):
+        self.app = app
+        # endpoint -> шаблон пути для Starlette без scope["route"]
+        self.routes = routes
+        self._paths: Optional[Dict] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or isinstance(HTTP_REQUEST_SECONDS, _NoopMetric):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(scope["method"], self._route(scope), str(status)).observe(
+                time.perf_counter() - started
+            )
+
+    def _route(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return getattr(route, "path", "unmatched")
+        if self._paths is None:
+            self._paths = self.routes() if self.routes else {}
+        return self._paths.get(scope.get("endpoint"), "unmatched")
@@ -0,0 +1,151 @@
+"""
+color_cache.py - Персистентный кэш "фото -> цвет корпуса"
+Ключи: URL фото и хэш содержимого изображения, с учетом версии модели
+(ответы гистограммы - под версией ее порогов)
+"""
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CachedColor:
+    """Запись кэша цвета"""
+    content_hash: str
+    color: str
+    probability: float
+    embedding: Optional[bytes] = None
+
+class ColorCache:
+    """SQLite-кэш предсказаний цвета с LRU-вытеснением"""
+
+    def __init__(self, path: str, model_version: str, max_entries: int = 100000,
+                 histogram_version: Optional[str] = None):
+        self.path = path
+        self.model_version = model_version
+        self.histogram_version = histogram_version
+        # Действующие версии: модель и (если включена) гистограмма
+        self.versions = (model_version,) + ((histogram_version,) if histogram_version else ())
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Кэш открывают и процессы пула CPU-стадии: WAL и ожидание блокировки записи
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS photo_urls (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS colors (
+                content_hash TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                color TEXT NOT NULL,
+                probability REAL NOT NULL,
+                embedding BLOB,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (content_hash, model_version)
+            );
+            CREATE INDEX IF NOT EXISTS colors_last_used ON colors (last_used);
+        """)
+        # Записи других версий модели и порогов гистограммы больше не нужны
+        self._conn.execute(
+            f"DELETE FROM colors WHERE model_version NOT IN ({self._placeholders})", self.versions
+        )
+        self._conn.commit()
+
+    def get_by_url(self, url: str) -> Optional[CachedColor]:
+        """Найти цвет по URL фото (без скачивания)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM photo_urls WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return self.get_by_hash(row[0])
+
+    def get_by_hash(self, content_hash: str) -> Optional[CachedColor]:
+        """Найти цвет по хэшу содержимого изображения"""
+        with self._lock:
+            # Предсказание модели важнее ответа гистограммы
+            row = self._conn.execute(
+                "SELECT color, probability, embedding, model_version FROM colors "
+                f"WHERE content_hash = ? AND model_version IN ({self._placeholders}) "
+                "ORDER BY model_version = ? DESC LIMIT 1",
+                (content_hash, *self.versions, self.model_version)
+            ).fetchone()
+            if not row:
+                return None
+
+            self._conn.execute(
+                "UPDATE colors SET last_used = ? WHERE content_hash = ? AND model_version = ?",
+                (time.time(), content_hash, row[3])
+            )
+            self._conn.commit()
+
+        return CachedColor(content_hash, row[0], row[1], row[2])
+
+    @property
+    def _placeholders(self) -> str:
+        return ", ".join("?" * len(self.versions))
+
+    def link_url(self, url: str, content_hash: str):
+        """Запомнить, что URL указывает на изображение с данным хэшем"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO photo_urls (url, content_hash) VALUES (?, ?)",
+                (url, content_hash)
+            )
+            self._conn.commit()
+
+    def put(self, content_hash: str, color: str, probability: float,
+            embedding: Optional[bytes] = None, url: Optional[str] = None):
+        """Сохранить предсказание"""
+        self.put_many([(content_hash, color, probability, embedding, url)])
+
+    def put_many(self, entries: List[Tuple[str, str, float, Optional[bytes], Optional[str]]],
+                 version: Optional[str] = None):
+        """Сохранить пакет предсказаний (content_hash, color, probability, embedding, url)
+
+        version - версия, под которой сохранять (по умолчанию версия модели)
+        """
+        version = version or self.model_version
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO colors "
+                "(content_hash, model_version, color, probability, embedding, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(content_hash, version, color, probability, embedding, now)
+                 for content_hash, color, probability, embedding, _ in entries]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO photo_urls (url, content_hash) VALUES (?, ?)",
+                [(url, content_hash) for content_hash, _, _, _, url in entries if url]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Удалить давно не использованные записи сверх лимита"""
+        total = self._conn.execute("SELECT COUNT(*) FROM colors").fetchone()[0]
+        excess = total - self.max_entries
+        if excess <= 0:
+            return
+
+        self._conn.execute(
+            "DELETE FROM colors WHERE rowid IN "
+            "(SELECT rowid FROM colors ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        self._conn.execute(
+            "DELETE FROM photo_urls WHERE content_hash NOT IN (SELECT content_hash FROM colors)"
+        )
+        logger.info(f"Color cache: evicted {excess} entries")
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,87 @@
+"""
+color_histogram.py - Быстрое определение цвета корпуса по гистограмме яркости
+Первый уровень перед CLIP: явно белые и явно черные фото решаются сразу,
+неоднозначные уходят в модель
+"""
+
+from typing import List, Optional, Tuple
+import hashlib
+import os
+
+import numpy as np
+from PIL import Image
+
+class HistogramColorClassifier:
+    """Взвешенная к центру гистограмма яркости уменьшенного фото
+
+    Белый - доля светлых малонасыщенных пикселей не меньше white_share,
+    черный - доля темных пикселей не меньше black_share; в обоих случаях
+    противоположная доля должна быть в DOMINANCE раз меньше.
+    """
+
+    DOMINANCE = 4
+
+    def __init__(self, size: Optional[int] = None, bins: int = 16,
+                 white_share: Optional[float] = None, black_share: Optional[float] = None,
+                 bright: Optional[float] = None, dark: Optional[float] = None,
+                 max_saturation: Optional[float] = None):
+        self.size = size or int(os.getenv('COLOR_HISTOGRAM_SIZE', '64'))
+        self.bins = bins
+        self.white_share = white_share or float(os.getenv('COLOR_HISTOGRAM_WHITE_SHARE', '0.4'))
+        self.black_share = black_share or float(os.getenv('COLOR_HISTOGRAM_BLACK_SHARE', '0.4'))
+        # Границы яркости (0..1) для светлых и темных пикселей
+        self.bright = bright or float(os.getenv('COLOR_HISTOGRAM_BRIGHT', '0.75'))
+        self.dark = dark or float(os.getenv('COLOR_HISTOGRAM_DARK', '0.2'))
+        self.max_saturation = max_saturation or float(os.getenv('COLOR_HISTOGRAM_MAX_SATURATION', '0.2'))
+
+        # Корпус обычно в центре кадра: гауссовы веса, в сумме 1
+        axis = np.linspace(-1, 1, self.size, dtype=np.float32)
+        weights = np.exp(-(axis[:, None] ** 2 + axis[None, :] ** 2) / 0.5)
+        self.weights = (weights / weights.sum()).ravel()
+
+    @property
+    def version(self) -> str:
+        """Ключ версии для кэша цвета: другие пороги инвалидируют ответы гистограммы"""
+        params = (self.size, self.bins, self.white_share, self.black_share,
+                  self.bright, self.dark, self.max_saturation, self.DOMINANCE)
+        return "histogram/" + hashlib.sha1(repr(params).encode()).hexdigest()[:8]
+
+    def thumbnail(self, image: Image.Image) -> np.ndarray:
+        """Квадратная копия size x size, RGB в 0..1"""
+        image = image.convert('RGB').resize((self.size, self.size), Image.BILINEAR)
+        return np.asarray(image, dtype=np.float32) / 255.0
+
+    def histograms(self, images: List[Image.Image]) -> Tuple[np.ndarray, np.ndarray]:
+        """Гистограммы яркости всех фото разом: (малонасыщенные пиксели, все пиксели)"""
+        pixels = np.stack([self.thumbnail(image) for image in images]).reshape(len(images), -1, 3)
+        luminance = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        high = pixels.max(axis=2)
+        saturation = np.where(high > 0, (high - pixels.min(axis=2)) / np.maximum(high, 1e-6), 0)
+
+        # Одна bincount на весь пакет: сдвиг корзин на номер фото
+        bins = np.minimum((luminance * self.bins).astype(np.int64), self.bins - 1)
+        bins += np.arange(len(images))[:, None] * self.bins
+        weights = np.broadcast_to(self.weights, bins.shape)
+        total = np.bincount(bins.ravel(), weights.ravel(), minlength=len(images) * self.bins)
+        neutral = np.bincount(bins.ravel(), (weights * (saturation <= self.max_saturation)).ravel(),
+                              minlength=len(images) * self.bins)
+        return neutral.reshape(-1, self.bins), total.reshape(-1, self.bins)
+
+    def classify(self, images: List[Image.Image]) -> List[Optional[Tuple[str, float]]]:
+        """Цвет и доля пикселей для уверенных фото, None - решать модели"""
+        if not images:
+            return []
+
+        neutral, total = self.histograms(images)
+        white = neutral[:, int(self.bright * self.bins):].sum(axis=1)
+        black = total[:, :max(1, int(round(self.dark * self.bins)))].sum(axis=1)
+
+        results: List[Optional[Tuple[str, float]]] = []
+        for white_share, black_share in zip(white.tolist(), black.tolist()):
+            if white_share >= self.white_share and black_share * self.DOMINANCE < white_share:
+                results.append(('white', white_share))
+            elif black_share >= self.black_share and white_share * self.DOMINANCE < black_share:
+                results.append(('black', black_share))
+            else:
+                results.append(None)
+        return results
@@ -0,0 +1,69 @@
+"""
+cpu_pool.py - Пул процессов для CPU-стадии парсинга
+Извлечение компонентов и определение цвета по фото идут пачками товаров
+в отдельных процессах: каждый загружает экстрактор и модель один раз
+при старте и держит их до остановки пула
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import multiprocessing
+import multiprocessing.util
+import os
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_key: Optional[Tuple[int, float]] = None
+
+# Парсер процесса пула (только в дочерних процессах)
+_parser = None
+
+def get_cpu_pool(workers: int, min_price: float) -> ProcessPoolExecutor:
+    """Пул процессов (создается при первом обходе и переиспользуется следующими)"""
+    global _pool, _pool_key
+    key = (workers, min_price)
+    # Умерший процесс пула (OOM, сбой torch) ломает весь пул - следующий обход получит новый
+    if _pool is not None and (_pool_key != key or getattr(_pool, "_broken", False)):
+        shutdown()
+    if _pool is None:
+        # spawn: torch и открытые соединения не наследуются от родителя
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(workers, min_price)
+        )
+        _pool_key = key
+        # Процесс парсинга сам дочерний (spawn) и завершается без atexit:
+        # пул останавливается финализатором multiprocessing - раньше
+        # финализаторов очередей пула (у них exitpriority=10)
+        multiprocessing.util.Finalize(None, shutdown, exitpriority=100)
+    return _pool
+
+def shutdown():
+    """Остановить пул процессов"""
+    global _pool, _pool_key
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _pool_key = None
+
+def _init_worker(workers: int, min_price: float):
+    """Старт процесса пула: экстрактор и модель цвета (если включена)"""
+    global _parser
+    from app.parser.unified_parser import UnifiedVKParser
+
+    _parser = UnifiedVKParser('', min_price)
+    detector = _parser.color_detector
+    # Потоки torch делятся между процессами, а не запускаются в каждом по числу ядер
+    if detector.threads <= 0:
+        detector.threads = max(1, (os.cpu_count() or 1) // workers)
+    detector.load_model()
+    logger.info(f"CPU worker {os.getpid()} ready (color model: {detector.model is not None})")
+
+def process_items(items: List[Dict], group_id: int, company: str) -> list:
+    """Точка входа в процессе пула: сборки из товаров VK (как в однопроцессном режиме)"""
+    return asyncio.run(_parser.process_items(items, group_id, company))
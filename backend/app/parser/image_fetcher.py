@@ -0,0 +1,110 @@
+"""
+image_fetcher.py - Загрузка фото товаров для определения цвета
+Одна пулированная сессия на весь парсинг, лимит соединений на хост,
+ограничение размера ответа и декодирование сразу в уменьшенную копию
+"""
+
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from typing import List, Optional
+import logging
+
+import aiohttp
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class FetchedImage:
+    """Скачанное фото"""
+    url: str
+    content_hash: str
+    image: Image.Image
+
+class ImageFetcher:
+    """Пулированная загрузка изображений"""
+
+    def __init__(self, max_connections: Optional[int] = None, per_host: Optional[int] = None,
+                 max_bytes: Optional[int] = None, thumbnail_size: int = 224,
+                 timeout: Optional[float] = None):
+        self.max_connections = max_connections or int(os.getenv('IMAGE_FETCH_MAX_CONNECTIONS', '32'))
+        self.per_host = per_host or int(os.getenv('IMAGE_FETCH_PER_HOST', '8'))
+        self.max_bytes = max_bytes or int(os.getenv('IMAGE_MAX_BYTES', str(10 * 1024 * 1024)))
+        self.timeout = timeout or float(os.getenv('IMAGE_FETCH_TIMEOUT', '20'))
+        # Короткая сторона уменьшенной копии (входное разрешение модели)
+        self.thumbnail_size = thumbnail_size
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._users = 0
+
+    async def __aenter__(self):
+        # Вложенные контексты используют одну и ту же сессию
+        if self._users == 0:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    limit_per_host=self.per_host
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        self._users += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._users -= 1
+        if self._users == 0 and self.session:
+            await self.session.close()
+            self.session = None
+
+    async def fetch_many(self, urls: List[str]) -> List[Optional[FetchedImage]]:
+        """Скачать несколько фото параллельно (в пределах лимитов пула)"""
+        async with self:
+            return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    async def fetch(self, url: str) -> Optional[FetchedImage]:
+        """Скачать одно фото; None при ошибке или слишком большом ответе"""
+        if not url:
+            return None
+
+        async with self:
+            try:
+                async with self.session.get(url) as resp:
+                    if resp.status != 200:
+                        return None
+
+                    if resp.content_length and resp.content_length > self.max_bytes:
+                        logger.warning(f"Image too large ({resp.content_length} bytes): {url}")
+                        return None
+
+                    digest = hashlib.sha256()
+                    buffer = BytesIO()
+                    async for chunk in resp.content.iter_chunked(64 * 1024):
+                        if buffer.tell() + len(chunk) > self.max_bytes:
+                            logger.warning(f"Image exceeds {self.max_bytes} bytes: {url}")
+                            return None
+                        digest.update(chunk)
+                        buffer.write(chunk)
+
+                # Декодирование - CPU-работа, не держим на нем event loop
+                loop = asyncio.get_running_loop()
+                image = await loop.run_in_executor(None, self._decode, buffer)
+                return FetchedImage(url, digest.hexdigest(), image)
+            except Exception as e:
+                logger.error(f"Failed to load image {url}: {e}")
+                return None
+
+    def _decode(self, buffer: BytesIO) -> Image.Image:
+        """Декодировать сразу в уменьшенную копию"""
+        buffer.seek(0)
+        image = Image.open(buffer)
+        # Для JPEG декодер сам уменьшает масштаб (не меньше запрошенного)
+        image.draft('RGB', (self.thumbnail_size, self.thumbnail_size))
+        image = image.convert('RGB')
+
+        scale = self.thumbnail_size / min(image.size)
+        if scale < 1:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.BICUBIC)
+        return image
@@ -0,0 +1,131 @@
+"""
+pattern_compiler.py - Предкомпиляция паттернов извлечения с дешевыми фильтрами
+Для каждого паттерна выводится:
+- класс символов, с которых может начаться совпадение (guard-lookahead
+  позволяет движку re пропускать заведомо неподходящие позиции);
+- обязательное ключевое слово, без которого совпадения быть не может
+  (проверяется обычным `in` по casefold-тексту до запуска regex).
+Оба фильтра только отсекают заведомо пустые поиски и не меняют результат.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: r'\d',
+    sre_parse.CATEGORY_SPACE: r'\s',
+    sre_parse.CATEGORY_WORD: r'\w',
+}
+
+@dataclass
+class CompiledPattern:
+    """Скомпилированный паттерн с фильтрами"""
+    source: str
+    regex: re.Pattern
+    keyword: str = ''
+
+    def search(self, text: str, folded: str, pos: int = 0, endpos: Optional[int] = None):
+        """re.search с предварительной проверкой ключевого слова"""
+        if self.keyword and self.keyword not in folded:
+            return None
+        if endpos is None:
+            return self.regex.search(text, pos)
+        return self.regex.search(text, pos, endpos)
+
+def fold(text: str) -> str:
+    """Текст для проверки ключевых слов (эквивалент IGNORECASE)"""
+    # re.IGNORECASE считает 'ı' и 'İ' равными 'i', а casefold - нет
+    return text.casefold().replace('ı', 'i').replace('\u0307', '')
+
+def compile_pattern(pattern: str, flags: int = re.IGNORECASE) -> CompiledPattern:
+    """Скомпилировать паттерн, добавив guard и ключевое слово, если их удалось вывести"""
+    try:
+        items = sre_parse.parse(pattern, flags)
+        first, nullable = _first_chars(items)
+        keyword = _required_literal(items)
+    except Exception:
+        first, nullable, keyword = None, True, ''
+
+    guarded = pattern
+    if first and not nullable:
+        guarded = f"(?=[{''.join(sorted(first))}])(?:{pattern})"
+
+    # Ключевое слово из одного символа ничего не отсекает
+    keyword = fold(keyword) if len(keyword) > 1 and flags & re.IGNORECASE else ''
+    return CompiledPattern(pattern, re.compile(guarded, flags), keyword)
+
+def _first_chars(items) -> Tuple[Optional[Set[str]], bool]:
+    """Возможные первые символы последовательности и может ли она быть пустой"""
+    result: Set[str] = set()
+    for op, av in items:
+        chars, nullable = _first_chars_item(op, av)
+        if chars is None:
+            return None, True
+        result |= chars
+        if not nullable:
+            return result, False
+    return result, True
+
+def _first_chars_item(op, av) -> Tuple[Optional[Set[str]], bool]:
+    if op is sre_parse.LITERAL:
+        return {re.escape(chr(av))}, False
+
+    if op is sre_parse.IN:
+        chars = set()
+        for item_op, item_av in av:
+            if item_op is sre_parse.LITERAL:
+                chars.add(re.escape(chr(item_av)))
+            elif item_op is sre_parse.RANGE:
+                chars.add(f"{re.escape(chr(item_av[0]))}-{re.escape(chr(item_av[1]))}")
+            elif item_op is sre_parse.CATEGORY and item_av in _CATEGORIES:
+                chars.add(_CATEGORIES[item_av])
+            else:
+                return None, True
+        return chars, False
+
+    if op is sre_parse.SUBPATTERN:
+        return _first_chars(av[-1])
+
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        low, _, body = av
+        chars, nullable = _first_chars(body)
+        return chars, nullable or low == 0
+
+    if op is sre_parse.BRANCH:
+        chars = set()
+        nullable = False
+        for branch in av[1]:
+            branch_chars, branch_nullable = _first_chars(branch)
+            if branch_chars is None:
+                return None, True
+            chars |= branch_chars
+            nullable = nullable or branch_nullable
+        return chars, nullable
+
+    return None, True
+
+def _required_literal(items) -> str:
+    """Самая длинная цепочка литералов, обязательная для совпадения"""
+    best = ''
+    current: List[str] = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+            continue
+        if len(current) > len(best):
+            best = ''.join(current)
+        current = []
+        # Обязательный подпаттерн без повторов тоже может содержать литерал
+        if op is sre_parse.SUBPATTERN:
+            inner = _required_literal(av[-1])
+            if len(inner) > len(best):
+                best = inner
+    if len(current) > len(best):
+        best = ''.join(current)
+    return best
@@ -8,20 +8,46 @@ import re
 import json
 import asyncio
 import aiohttp
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, AsyncIterator, Union
 from datetime import datetime
-from dataclasses import dataclass, asdict
-import torch
-import open_clip
+from dataclasses import dataclass, asdict, field
 from PIL import Image
-from io import BytesIO
 import logging
 import os
+import time
+import hashlib
+import threading
+from collections import Counter, deque
+from urllib.parse import urlparse
+from app import metrics
+from app.parser.color_cache import ColorCache
+from app.parser.color_histogram import HistogramColorClassifier
+from app.parser.cpu_pool import get_cpu_pool, process_items
+from app.parser.image_fetcher import ImageFetcher
+from app.parser.pattern_compiler import compile_pattern, fold
+from app.parser.vk_retry import CircuitBreaker, RetryPolicy, VKAPIError
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Максимум вызовов API внутри одного execute
+EXECUTE_MAX_CALLS = 25
+
+# Версия отпечатка товара: увеличить, если меняется логика обработки,
+# чтобы инкрементальный парсинг переобработал все товары
+FINGERPRINT_VERSION = '1'
+
+# Допустимые объемы оперативной памяти, GB
+RAM_SIZES = [8, 16, 32, 48, 64, 96, 128]
+
+# Нормализация названий CPU/GPU
+CPU_ULTRA_RE = re.compile(r'(?:Intel\s*)?Core\s*Ultra\s*(\d)', re.IGNORECASE)
+CPU_RYZEN_RE = re.compile(r'(?:AMD\s*)?Ryzen\s*(\d)', re.IGNORECASE)
+CPU_CORE_RE = re.compile(r'(?:Intel\s*)?(?:Core\s*)?i(\d)', re.IGNORECASE)
+GPU_NVIDIA_RE = re.compile(r'(?:NVIDIA\s*)?(?:GeForce\s*)?', re.IGNORECASE)
+GPU_AMD_RE = re.compile(r'(?:AMD\s*)?(?:Radeon\s*)?', re.IGNORECASE)
+
 @dataclass
 class PCBuild:
     """Модель данных для компьютерной сборки"""
@@ -37,27 +63,121 @@ class PCBuild:
     photo_url: str
     vk_url: str
     parsed_at: datetime
+    fingerprint: str = ''
     
     def to_dict(self) -> Dict:
         data = asdict(self)
         data['parsed_at'] = self.parsed_at.isoformat()
         return data
 
+@dataclass
+class ExtractedComponents:
+    """Результат извлечения компонентов из текста товара"""
+    cpu: str
+    gpu: str
+    ram: str
+    case_color: Optional[str]
+
+@dataclass
+class GroupProgress:
+    """Состояние парсинга одной группы"""
+    group_id: int
+    status: str = 'pending'
+    items: int = 0
+    builds: int = 0
+    unchanged: int = 0
+    error: str = ''
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+@dataclass
+class ParsedChunk:
+    """Пачка результатов потокового парсинга"""
+    builds: List[PCBuild] = field(default_factory=list)
+    # Товары без изменений с прошлого парсинга (инкрементальный режим)
+    unchanged_ids: List[str] = field(default_factory=list)
+    
+    def __len__(self) -> int:
+        return len(self.builds) + len(self.unchanged_ids)
+
+# Маркер завершения стадии конвейера
+_STAGE_DONE = object()
+
+@dataclass
+class CrawlMark:
+    """Самый новый товар (пост) группы, увиденный успешным обходом"""
+    item_id: int = 0
+    date: int = 0
+    
+    def key(self) -> Tuple[int, int]:
+        return (self.date, self.item_id)
+
+class RateLimiter:
+    """Token bucket для ограничения частоты запросов к VK API"""
+    
+    def __init__(self, rate: float, capacity: Optional[int] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+        
+    async def acquire(self):
+        """Дождаться свободного токена"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                    
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                
+    def pause(self, seconds: float):
+        """Не выдавать токены seconds секунд (ответ VK "слишком много запросов")
+        
+        Отметка пополнения переносится в будущее: acquire получит отрицательный
+        запас токенов и подождет до конца паузы
+        """
+        self.tokens = min(self.tokens, 0.0)
+        self.updated_at = max(self.updated_at, time.monotonic() + seconds)
+
 class VKMarketParser:
     """Парсер товаров из VK Market"""
     
-    def __init__(self, token: str, api_version: str = "5.199"):
+    def __init__(self, token: str, api_version: str = "5.199",
+                 rate_limiter: Optional[RateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
         self.token = token
         self.api_version = api_version
+        # Один лимитер на токен: VK ограничивает число запросов в секунду
+        self.rate_limiter = rate_limiter or RateLimiter(
+            float(os.getenv('VK_REQUESTS_PER_SECOND', '3'))
+        )
         self.base_url = "https://api.vk.com/method/"
         self.fallback_urls = [
             "https://api.vk.com/method/",
             "https://vkresult.ru/method/"
         ]
+        # Другой адрес API (прокси или тестовый сервер) заменяет список fallback
+        if os.getenv('VK_API_URL'):
+            self.base_url = os.getenv('VK_API_URL').rstrip('/') + '/'
+            self.fallback_urls = [self.base_url]
         self.session = None
+        # Повторы по коду ошибки и автоматы отключения адресов API
+        self.retry = retry_policy or RetryPolicy()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        # Пакетная загрузка страниц через execute
+        self.use_execute = os.getenv('VK_USE_EXECUTE', 'true').lower() == 'true'
+        self.group_names: Dict[int, str] = {}
+        # (группа, источник) -> самый новый элемент после полного обхода
+        self.marks: Dict[Tuple[int, str], CrawlMark] = {}
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.retry.timeout))
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -65,95 +185,315 @@ class VKMarketParser:
             await self.session.close()
             
     async def vk_call(self, method: str, params: Dict[str, Any]) -> Dict:
-        """Асинхронный вызов VK API с fallback"""
+        """Вызов VK API с повторами и переходом между адресами
+        
+        Лимит частоты - пауза общего лимитера и повтор, серверный сбой -
+        следующий адрес (отключенные автоматом пропускаются) и повтор
+        с задержкой, постоянная ошибка - сразу VKAPIError
+        """
         params['access_token'] = self.token
         params['v'] = self.api_version
+        error = VKAPIError(method, None, "no API endpoints")
+        reason = 'server'
+        delay = 0.0
         
-        for base_url in self.fallback_urls:
-            try:
-                async with self.session.get(f"{base_url}{method}", params=params) as resp:
-                    data = await resp.json()
-                    
-                    if 'error' in data:
-                        logger.error(f"VK API Error: {data['error']}")
-                        # Пробуем следующий URL если ошибка
-                        continue
-                        
-                    return data.get('response', {})
-            except Exception as e:
-                logger.warning(f"Failed with {base_url}: {e}")
+        for attempt in range(self.retry.max_retries + 1):
+            if attempt:
+                metrics.VK_RETRIES.labels(method, reason).inc()
+            if delay:
+                await asyncio.sleep(delay)
+                
+            endpoints = [url for url in self.fallback_urls if self._breaker(url).allow()]
+            if not endpoints:
+                # Все адреса отключены: ждем ближайшего пробного запроса, но не меньше
+                # обычной задержки - иначе повторы сгорят разом, пока идет чужой пробный
+                delay = max(min(min(self._breaker(url).retry_in() for url in self.fallback_urls),
+                                self.retry.backoff_max),
+                            self.retry.backoff(attempt))
+                error = VKAPIError(method, None, "all API endpoints are disabled")
+                reason = 'breaker_open'
                 continue
                 
-        raise Exception(f"All API endpoints failed for {method}")
+            for index, base_url in enumerate(endpoints):
+                if index:
+                    metrics.VK_FALLBACKS.labels(method, urlparse(base_url).netloc).inc()
+                kind, result = await self._request(method, base_url, params)
+                breaker = self._breaker(base_url)
+                
+                if kind == 'ok':
+                    breaker.success()
+                    return result
+                if kind == 'permanent':
+                    # Адрес ответил, повторять бессмысленно
+                    breaker.success()
+                    raise result
+                    
+                error, reason = result, kind
+                if kind == 'rate_limit':
+                    # Лимит общий для токена: другой адрес не поможет
+                    self.rate_limiter.pause(self.retry.backoff(attempt))
+                    delay = 0.0
+                    break
+                if breaker.failure():
+                    logger.warning(f"VK API endpoint {base_url} disabled for {breaker.cooldown:.0f}s")
+                    metrics.VK_BREAKER_OPENS.labels(urlparse(base_url).netloc).inc()
+            else:
+                delay = self.retry.backoff(attempt)
+                
+        raise error
+        
+    def _breaker(self, base_url: str) -> CircuitBreaker:
+        if base_url not in self.breakers:
+            self.breakers[base_url] = CircuitBreaker()
+        return self.breakers[base_url]
+        
+    async def _request(self, method: str, base_url: str,
+                       params: Dict[str, Any]) -> Tuple[str, Any]:
+        """Один HTTP-запрос: ('ok', ответ) или ('rate_limit' | 'server' | 'permanent', VKAPIError)"""
+        endpoint = urlparse(base_url).netloc
+        with metrics.stage('rate_limit_wait'):
+            await self.rate_limiter.acquire()
             
-    async def get_market_items(self, group_id: int, limit: int = 1000) -> List[Dict]:
-        """Получить товары из группы через market.get"""
-        items = []
+        try:
+            with metrics.stage('vk_call'):
+                async with self.session.get(f"{base_url}{method}", params=params) as resp:
+                    status = resp.status
+                    data = await resp.json(content_type=None) if status == 200 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            metrics.VK_CALLS.labels(method, endpoint, 'exception').inc()
+            logger.warning(f"Failed with {base_url}: {e!r}")
+            return 'server', VKAPIError(method, None, repr(e))
+            
+        if data is None:
+            metrics.VK_CALLS.labels(method, endpoint, f'http_{status}').inc()
+            logger.warning(f"VK API {method} via {base_url}: HTTP {status}")
+            return ('rate_limit' if status == 429 else 'server'), VKAPIError(method, None, f"HTTP {status}")
+            
+        if 'error' not in data:
+            metrics.VK_CALLS.labels(method, endpoint, '0').inc()
+            return 'ok', data.get('response', {})
+            
+        error_code = data['error'].get('error_code')
+        metrics.VK_CALLS.labels(method, endpoint, str(error_code)).inc()
+        logger.error(f"VK API Error: {data['error']}")
+        error = VKAPIError(method, error_code, data['error'].get('error_msg', ''))
+        if self.retry.is_rate_limit(error_code):
+            return 'rate_limit', error
+        if self.retry.is_server_error(error_code):
+            return 'server', error
+        return 'permanent', error
+        
+    async def execute(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+        """Выполнить до 25 вызовов API одним запросом execute"""
+        code = 'return [' + ','.join(
+            f"API.{method}({json.dumps(params, ensure_ascii=False)})"
+            for method, params in calls
+        ) + '];'
+        
+        results = await self.vk_call('execute', {'code': code})
+        if not isinstance(results, list) or len(results) != len(calls):
+            raise Exception(f"Unexpected execute response: {results!r}")
+        return results
+        
+    async def iter_pages(self, method: str, params: Dict[str, Any], count: int,
+                         max_pages: Optional[int] = None,
+                         first_batch: Optional[int] = None) -> AsyncIterator[Dict]:
+        """Постраничный обход метода API; страницы пакуются в execute
+        
+        first_batch ограничивает первый пакет страниц: при инкрементальном
+        обходе обычно хватает одной страницы
+        """
         offset = 0
-        count = 200
+        pages_left = max_pages
         
-        while len(items) < limit:
-            data = await self.vk_call('market.get', {
-                'owner_id': -group_id,
-                'count': count,
-                'offset': offset,
-                'extended': 1
-            })
-            
-            batch = data.get('items', [])
-            if not batch:
-                break
+        while pages_left is None or pages_left > 0:
+            batch_size = EXECUTE_MAX_CALLS if self.use_execute else 1
+            if first_batch and offset == 0:
+                batch_size = min(batch_size, first_batch)
+            if pages_left is not None:
+                batch_size = min(batch_size, pages_left)
                 
-            items.extend(batch)
-            offset += count
+            with metrics.stage('page_batch'):
+                pages = await self._fetch_page_batch(method, params, count, offset, batch_size)
+            for page in pages:
+                yield page
+                if len(page.get('items', [])) < count:
+                    return
+                    
+            offset += count * len(pages)
+            if pages_left is not None:
+                pages_left -= len(pages)
+                
+    async def _fetch_page_batch(self, method: str, params: Dict[str, Any], count: int,
+                                offset: int, pages: int) -> List[Dict]:
+        """Загрузить несколько страниц подряд (через execute, если доступен)"""
+        page_calls = [
+            (method, {**params, 'count': count, 'offset': offset + i * count})
+            for i in range(pages)
+        ]
+        
+        if self.use_execute:
+            # Название группы запрашиваем в том же execute
+            group_id = -params.get('owner_id', 0)
+            with_name = group_id > 0 and group_id not in self.group_names
+            if with_name:
+                page_calls = page_calls[:EXECUTE_MAX_CALLS - 1]
+                calls = [('groups.getById', {'group_ids': str(group_id)})] + page_calls
+            else:
+                calls = page_calls
+                
+            if len(calls) > 1:
+                try:
+                    results = await self.execute(calls)
+                except Exception as e:
+                    # Лимиты и сбои уже повторены в vk_call - execute тут ни при чем
+                    if isinstance(e, VKAPIError) and self.retry.is_transient(e.code):
+                        raise
+                    logger.warning(f"execute unavailable, falling back to per-page calls: {e}")
+                    self.use_execute = False
+                else:
+                    if with_name:
+                        name = results.pop(0)
+                        if isinstance(name, (dict, list)):
+                            self.group_names[group_id] = self._parse_group_name(name, group_id)
+                        else:
+                            # Упавший внутри execute groups.getById (false) - отдельным вызовом
+                            await self.get_group_name(group_id)
+                        
+                    batch = []
+                    for (page_method, page_params), result in zip(page_calls, results):
+                        # Упавший внутри execute вызов повторяем отдельно
+                        if not isinstance(result, dict):
+                            result = await self.vk_call(page_method, page_params)
+                        batch.append(result)
+                    return batch
+                    
+        page_method, page_params = page_calls[0]
+        return [await self.vk_call(page_method, page_params)]
+        
+    async def iter_market_items(self, group_id: int, limit: int = 1000,
+                                since: Optional[CrawlMark] = None) -> AsyncIterator[List[Dict]]:
+        """Товары группы через market.get, по странице за раз
+        
+        С since обход останавливается на странице, где встретился уже
+        известный товар, если товары идут от новых к старым (порядок витрины
+        задает группа, поэтому он проверяется по самим товарам)
+        """
+        count = 200
+        left = limit
+        newest = since or CrawlMark()
+        previous: Optional[Tuple[int, int]] = None
+        by_date = True
+        
+        pages = self.iter_pages('market.get', {
+            'owner_id': -group_id,
+            'extended': 1
+        }, count, max_pages=-(-limit // count), first_batch=1 if since else None)
+        
+        try:
+            async for data in pages:
+                items = data.get('items', [])[:left]
+                left -= len(items)
+                reached_known = False
+                for item in items:
+                    mark = CrawlMark(item.get('id', 0), item.get('date', 0))
+                    if mark.key() > newest.key():
+                        newest = mark
+                    if previous is not None and mark.key() > previous:
+                        by_date = False
+                    previous = mark.key()
+                    reached_known = reached_known or (since is not None and mark.key() <= since.key())
+                if items:
+                    yield items
+                if reached_known and by_date:
+                    break
+        finally:
+            await pages.aclose()
             
-            if len(batch) < count:
-                break
+        self.marks[(group_id, 'market')] = newest
                 
-        return items[:limit]
+    async def iter_wall_items(self, group_id: int, limit: int = 1000,
+                              since: Optional[CrawlMark] = None) -> AsyncIterator[List[Dict]]:
+        """Товары со стены группы, по странице за раз
         
-    async def get_wall_items(self, group_id: int, limit: int = 1000) -> List[Dict]:
-        """Получить товары со стены группы"""
-        items = []
-        offset = 0
+        Стена идет от новых постов к старым: с since обход останавливается
+        на первом уже известном посте (закрепленный пост не в счет)
+        """
         count = 100
+        left = limit
+        newest = since or CrawlMark()
         
-        while len(items) < limit:
-            data = await self.vk_call('wall.get', {
-                'owner_id': -group_id,
-                'count': count,
-                'offset': offset
-            })
+        pages = self.iter_pages('wall.get', {'owner_id': -group_id}, count,
+                                first_batch=1 if since else None)
+        
+        try:
+            async for data in pages:
+                posts = []
+                reached_known = False
+                for post in data.get('items', []):
+                    mark = CrawlMark(post.get('id', 0), post.get('date', 0))
+                    if not post.get('is_pinned'):
+                        if since is not None and mark.item_id <= since.item_id:
+                            reached_known = True
+                            break
+                        if mark.key() > newest.key():
+                            newest = mark
+                    posts.append(post)
+                    
+                # Извлекаем товары из вложений
+                items = [
+                    att.get('market', {})
+                    for post in posts
+                    for att in post.get('attachments', [])
+                    if att.get('type') == 'market'
+                ][:left]
+                left -= len(items)
+                if items:
+                    yield items
+                if left <= 0 or reached_known:
+                    break
+        finally:
+            await pages.aclose()
             
-            posts = data.get('items', [])
-            if not posts:
-                break
-                
-            # Извлекаем товары из вложений
-            for post in posts:
-                attachments = post.get('attachments', [])
-                for att in attachments:
-                    if att.get('type') == 'market':
-                        items.append(att.get('market', {}))
-                        
-            offset += count
+        self.marks[(group_id, 'wall')] = newest
             
-            if len(posts) < count:
-                break
-                
-        return items[:limit]
+    async def get_market_items(self, group_id: int, limit: int = 1000) -> List[Dict]:
+        """Получить товары из группы через market.get"""
+        items = []
+        async for page in self.iter_market_items(group_id, limit):
+            items.extend(page)
+        return items
+        
+    async def get_wall_items(self, group_id: int, limit: int = 1000) -> List[Dict]:
+        """Получить товары со стены группы"""
+        items = []
+        async for page in self.iter_wall_items(group_id, limit):
+            items.extend(page)
+        return items
         
     async def get_group_name(self, group_id: int) -> str:
         """Получить название группы"""
+        if group_id in self.group_names:
+            return self.group_names[group_id]
+            
         try:
             data = await self.vk_call('groups.getById', {
                 'group_ids': str(group_id)
             })
-            if data and len(data) > 0:
-                return data[0].get('name', f'Group {group_id}')
+            self.group_names[group_id] = self._parse_group_name(data, group_id)
+            return self.group_names[group_id]
         except:
             pass
         return f'Group {group_id}'
+        
+    @staticmethod
+    def _parse_group_name(data: Any, group_id: int) -> str:
+        """Название группы из ответа groups.getById (старый и новый формат)"""
+        if isinstance(data, dict):
+            data = data.get('groups', [])
+        if data and isinstance(data, list) and isinstance(data[0], dict):
+            return data[0].get('name', f'Group {group_id}')
+        return f'Group {group_id}'
 
 class PCComponentExtractor:
     """Извлечение компонентов ПК из текста"""
@@ -187,6 +527,94 @@ class PCComponentExtractor:
             r'DDR\d?\s+(\d+)\s*GB'          # DDR5 32GB format
         ]
         
+        self.ram_context_patterns = [
+            r'оперативная память[:\s\-—]+[^0-9]*(\d+)\s*GB',
+            r'память[:\s\-—]+[^0-9]*(\d+)\s*GB',
+            r'DDR\d[:\s]+[^0-9]*(\d+)\s*GB',
+            r'RAM[:\s]+(\d+)\s*GB',
+            r'ОЗУ[:\s]+(\d+)\s*GB'
+        ]
+        
+        # Предкомпилированные паттерны для extract_all
+        self._cpu_context = compile_pattern(r'процессор[:\s\-—]+([^\n\t]+)')
+        self._gpu_context = compile_pattern(r'видеокарта[:\s\-—]+([^\n\t]+)')
+        self._cpu_compiled = [compile_pattern(p) for p in self.cpu_patterns]
+        self._gpu_compiled = [compile_pattern(p) for p in self.gpu_patterns]
+        self._ram_mult = compile_pattern(r'(\d+)\s*[xх]\s*(\d+)\s*GB')
+        self._ram_contexts = [compile_pattern(p) for p in self.ram_context_patterns]
+        self._ram_simple = compile_pattern(r'(\d+)\s*GB')
+        self._case_context = re.compile(r'корпус[:\s]+([^\n\t]+)')
+        
+    def extract_all(self, title: str, description: str) -> ExtractedComponents:
+        """Извлечь CPU, GPU, RAM и цвет корпуса за один проход
+        
+        Результат совпадает с extract_cpu/extract_gpu/extract_ram(title + description)
+        и extract_case_color_from_text(description)
+        """
+        full_text = f"{title}\n{description}"
+        # Один проход casefold: дальше паттерны без своего ключевого слова не запускаются
+        folded = fold(full_text)
+        dashed = full_text.replace('–', '-').replace('—', '-')
+        
+        return ExtractedComponents(
+            cpu=self._find_component(dashed, folded, self._cpu_context,
+                                     self._cpu_compiled, self.normalize_cpu),
+            gpu=self._find_component(dashed, folded, self._gpu_context,
+                                     self._gpu_compiled, self.normalize_gpu),
+            ram=self._find_ram(full_text, folded),
+            case_color=self._find_case_color(description, folded)
+        )
+        
+    def _find_component(self, text: str, folded: str, context, patterns, normalize) -> str:
+        """Поиск компонента: сначала в строке-контексте, затем по всему тексту"""
+        context_match = context.search(text, folded)
+        if context_match:
+            start, end = context_match.span(1)
+            for pattern in patterns:
+                match = pattern.search(text, folded, start, end)
+                if match:
+                    return normalize(match.group())
+                    
+        for pattern in patterns:
+            match = pattern.search(text, folded)
+            if match:
+                return normalize(match.group())
+                
+        return ""
+        
+    def _find_ram(self, text: str, folded: str) -> str:
+        """Поиск объема памяти (та же логика, что в extract_ram)"""
+        mult_match = self._ram_mult.search(text, folded)
+        if mult_match:
+            total = int(mult_match.group(1)) * int(mult_match.group(2))
+            if total in RAM_SIZES:
+                return str(total)
+                
+        for pattern in self._ram_contexts:
+            match = pattern.search(text, folded)
+            if match:
+                ram = int(match.group(1))
+                if ram in RAM_SIZES:
+                    return str(ram)
+                    
+        if self._ram_simple.keyword in folded:
+            for match in self._ram_simple.regex.finditer(text):
+                ram = int(match.group(1))
+                if ram in RAM_SIZES:
+                    return str(ram)
+                    
+        return ""
+        
+    def _find_case_color(self, description: str, folded: str) -> Optional[str]:
+        """Цвет корпуса из описания (та же логика, что в extract_case_color_from_text)"""
+        if not description or 'корпус' not in folded:
+            return None
+            
+        case_match = self._case_context.search(description.lower())
+        if case_match:
+            return self._color_from_case_info(case_match.group(1))
+        return None
+        
     def extract_cpu(self, text: str) -> str:
         """Извлечь модель процессора"""
         if not text:
@@ -246,30 +674,22 @@ class PCComponentExtractor:
             count = int(mult_match.group(1))
             size = int(mult_match.group(2))
             total = count * size
-            if total in [8, 16, 32, 48, 64, 96, 128]:
+            if total in RAM_SIZES:
                 return str(total)
                 
         # Ищем в контексте памяти
-        ram_contexts = [
-            r'оперативная память[:\s\-—]+[^0-9]*(\d+)\s*GB',
-            r'память[:\s\-—]+[^0-9]*(\d+)\s*GB',
-            r'DDR\d[:\s]+[^0-9]*(\d+)\s*GB',
-            r'RAM[:\s]+(\d+)\s*GB',
-            r'ОЗУ[:\s]+(\d+)\s*GB'
-        ]
-        
-        for pattern in ram_contexts:
+        for pattern in self.ram_context_patterns:
             match = re.search(pattern, text, re.IGNORECASE)
             if match:
                 ram = int(match.group(1))
-                if ram in [8, 16, 32, 48, 64, 96, 128]:
+                if ram in RAM_SIZES:
                     return str(ram)
         
         # Простой поиск числа с GB
         ram_matches = re.findall(r'(\d+)\s*GB', text, re.IGNORECASE)
         for match in ram_matches:
             ram = int(match)
-            if ram in [8, 16, 32, 48, 64, 96, 128]:
+            if ram in RAM_SIZES:
                 return str(ram)
                 
         return ""
@@ -277,19 +697,19 @@ class PCComponentExtractor:
     def normalize_cpu(self, cpu: str) -> str:
         """Нормализация формата CPU"""
         # Intel Core Ultra -> U
-        cpu = re.sub(r'(?:Intel\s*)?Core\s*Ultra\s*(\d)', r'U\1', cpu, flags=re.IGNORECASE)
+        cpu = CPU_ULTRA_RE.sub(r'U\1', cpu)
         # AMD Ryzen -> R
-        cpu = re.sub(r'(?:AMD\s*)?Ryzen\s*(\d)', r'R\1', cpu, flags=re.IGNORECASE)
+        cpu = CPU_RYZEN_RE.sub(r'R\1', cpu)
         # Intel Core iX -> IX
-        cpu = re.sub(r'(?:Intel\s*)?(?:Core\s*)?i(\d)', r'I\1', cpu, flags=re.IGNORECASE)
+        cpu = CPU_CORE_RE.sub(r'I\1', cpu)
         
         return cpu.strip().upper()
         
     def normalize_gpu(self, gpu: str) -> str:
         """Нормализация формата GPU"""
         # Убираем производителя
-        gpu = re.sub(r'(?:NVIDIA\s*)?(?:GeForce\s*)?', '', gpu, flags=re.IGNORECASE)
-        gpu = re.sub(r'(?:AMD\s*)?(?:Radeon\s*)?', '', gpu, flags=re.IGNORECASE)
+        gpu = GPU_NVIDIA_RE.sub('', gpu)
+        gpu = GPU_AMD_RE.sub('', gpu)
         
         return gpu.strip().upper()
         
@@ -301,134 +721,601 @@ class PCComponentExtractor:
         text_lower = text.lower()
         
         # Ищем упоминания корпуса
-        case_match = re.search(r'корпус[:\s]+([^\n\t]+)', text_lower)
+        case_match = self._case_context.search(text_lower)
         if case_match:
-            case_info = case_match.group(1)
-            
-            white_indicators = ['белый', 'белом', 'white', 'wh']
-            black_indicators = ['черный', 'чёрный', 'черном', 'black', 'bk']
-            
-            for indicator in white_indicators:
-                if indicator in case_info:
-                    return 'white'
-                    
-            for indicator in black_indicators:
-                if indicator in case_info:
-                    return 'black'
+            return self._color_from_case_info(case_match.group(1))
                     
         return None
+        
+    @staticmethod
+    def _color_from_case_info(case_info: str) -> Optional[str]:
+        """Цвет по строке с описанием корпуса"""
+        white_indicators = ['белый', 'белом', 'white', 'wh']
+        black_indicators = ['черный', 'чёрный', 'черном', 'black', 'bk']
+        
+        for indicator in white_indicators:
+            if indicator in case_info:
+                return 'white'
+                
+        for indicator in black_indicators:
+            if indicator in case_info:
+                return 'black'
+                
+        return None
+
+@dataclass
+class ColorModel:
+    """Загруженная модель OpenCLIP с посчитанными эмбеддингами подсказок"""
+    model: Any
+    preprocess: Any
+    tokenizer: Any
+    text_features: Any
+    device: str
+    image_size: int
+    # Кодировщик изображений: model.encode_image или ускоренный (int8 + trace)
+    encode_image: Any = None
+
+# Модели процесса: загружаются один раз и остаются в памяти между обходами
+_color_models: Dict[Tuple[str, str, Tuple[str, ...], bool], ColorModel] = {}
+_color_models_lock = threading.Lock()
+
+def get_color_model(model_name: str, pretrained: str, prompts: List[str],
+                    fast: bool = False, threads: int = 0) -> ColorModel:
+    """Модель процесса для (чекпоинт, подсказки, режим); torch импортируется при первом вызове
+
+    threads > 0 задает число потоков torch для всего процесса.
+    """
+    key = (model_name, pretrained, tuple(prompts), fast)
+    with _color_models_lock:
+        if key not in _color_models:
+            _color_models[key] = _load_color_model(model_name, pretrained, prompts, fast, threads)
+        return _color_models[key]
+
+def _load_color_model(model_name: str, pretrained: str, prompts: List[str],
+                      fast: bool = False, threads: int = 0) -> ColorModel:
+    import torch
+    import open_clip
+
+    if threads > 0:
+        torch.set_num_threads(threads)
+
+    started = time.perf_counter()
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model, _, preprocess = open_clip.create_model_and_transforms(model_name, pretrained=pretrained or None)
+    model = model.to(device)
+    model.eval()
+    tokenizer = open_clip.get_tokenizer(model_name)
+    
+    # Эмбеддинги подсказок не меняются - считаем один раз на загрузку
+    text_inputs = tokenizer(prompts).to(device)
+    with torch.no_grad():
+        text_features = model.encode_text(text_inputs)
+        text_features /= text_features.norm(dim=-1, keepdim=True)
+        
+    image_size = getattr(model.visual, 'image_size', 224)
+    image_size = min(image_size) if isinstance(image_size, (tuple, list)) else image_size
+    
+    encode_image, mode = model.encode_image, "eager"
+    if fast and device == "cpu":
+        try:
+            encode_image, mode = _fast_image_encoder(model.visual, image_size), "int8"
+        except Exception as e:
+            logger.error(f"Fast color inference unavailable, using eager model: {e}")
+    
+    logger.info(f"Color model {model_name}/{pretrained} ({mode}) loaded in {time.perf_counter() - started:.1f}s")
+    return ColorModel(model, preprocess, tokenizer, text_features, device, image_size, encode_image)
+
+def _fast_image_encoder(visual, image_size: int):
+    """Башня изображений для CPU: int8-квантование Linear и трассировка в TorchScript"""
+    import torch
+    
+    quantized = torch.ao.quantization.quantize_dynamic(visual, {torch.nn.Linear}, dtype=torch.qint8)
+    with torch.no_grad():
+        traced = torch.jit.trace(quantized, torch.zeros(1, 3, image_size, image_size))
+        return torch.jit.freeze(traced)
 
 class CaseColorDetector:
     """Определение цвета корпуса через ML"""
     
-    def __init__(self):
+    MODEL_NAME = 'ViT-B-32'
+    # Тег OpenCLIP или путь к локальному чекпоинту
+    PRETRAINED = os.getenv('COLOR_MODEL_PRETRAINED', 'openai')
+    # Текстовые подсказки и соответствующие им цвета
+    PROMPTS = ['white computer case', 'black computer case']
+    
+    def __init__(self, batch_size: Optional[int] = None):
         self.model = None
+        self.encode_image = None
         self.preprocess = None
         self.tokenizer = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.text_features = None
+        self.device = None
         self.enabled = os.getenv('USE_ML_COLOR_DETECTION', 'false').lower() == 'true'
+        self.batch_size = batch_size or int(os.getenv('COLOR_BATCH_SIZE', '16'))
+        # Быстрый режим на CPU (int8 + TorchScript) и число потоков torch (0 - по умолчанию)
+        self.fast = os.getenv('COLOR_FAST_INFERENCE', 'false').lower() == 'true'
+        self.threads = int(os.getenv('COLOR_TORCH_THREADS', '0'))
+        
+        # Персистентный кэш предсказаний (пустой путь - без кэша)
+        self.cache: Optional[ColorCache] = None
+        self.cache_path = os.getenv('COLOR_CACHE_PATH', './color_cache.db')
+        self.cache_max_entries = int(os.getenv('COLOR_CACHE_MAX_ENTRIES', '100000'))
+        self.cache_embeddings = os.getenv('COLOR_CACHE_STORE_EMBEDDINGS', 'false').lower() == 'true'
+        
+        # Общий пул загрузки фото; парсер держит его открытым на весь обход
+        self.fetcher = ImageFetcher()
+        
+        # Первый уровень: гистограмма яркости, в модель идут только неоднозначные фото
+        self.histogram = (
+            HistogramColorClassifier()
+            if os.getenv('COLOR_HISTOGRAM_ENABLED', 'true').lower() == 'true' else None
+        )
+        # Сколько фото решил каждый уровень: url_cache, hash_cache, histogram, model
+        self.counters: Counter = Counter()
+        
+    @property
+    def model_version(self) -> str:
+        """Ключ версии модели: другой чекпоинт или подсказки инвалидируют кэш"""
+        prompts_hash = hashlib.sha1('|'.join(self.PROMPTS).encode()).hexdigest()[:8]
+        mode = "/int8" if self.fast else ""
+        return f"{self.MODEL_NAME}/{self.PRETRAINED}{mode}/{prompts_hash}"
         
     def load_model(self):
-        """Загрузка модели OpenCLIP"""
+        """Загрузка модели OpenCLIP (повторные вызовы берут уже загруженную)"""
         if not self.enabled:
             logger.info("ML color detection disabled")
             return
             
         try:
-            self.model, _, self.preprocess = open_clip.create_model_and_transforms(
-                'ViT-B-32', 
-                pretrained='openai'
-            )
-            self.model = self.model.to(self.device)
-            self.model.eval()
-            self.tokenizer = open_clip.get_tokenizer('ViT-B-32')
-            logger.info("Color detection model loaded")
+            color_model = get_color_model(self.MODEL_NAME, self.PRETRAINED, self.PROMPTS,
+                                          self.fast, self.threads)
         except Exception as e:
             logger.error(f"Failed to load color model: {e}")
             self.enabled = False
+            return
+            
+        self.model = color_model.model
+        self.encode_image = color_model.encode_image
+        self.preprocess = color_model.preprocess
+        self.tokenizer = color_model.tokenizer
+        self.text_features = color_model.text_features
+        self.device = color_model.device
+        # Фото декодируем сразу в разрешение входа модели
+        self.fetcher.thumbnail_size = color_model.image_size
+            
+        if self.cache_path and not self.cache:
+            try:
+                self.cache = ColorCache(self.cache_path, self.model_version, self.cache_max_entries,
+                                        self.histogram.version if self.histogram else None)
+            except Exception as e:
+                logger.error(f"Failed to open color cache: {e}")
             
     async def detect_color(self, image_url: str) -> str:
         """Определить цвет корпуса по фото"""
-        if not self.enabled or not self.model or not image_url:
+        if not image_url:
             return ""
             
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_url) as resp:
-                    if resp.status != 200:
-                        return ""
-                    
-                    image_data = await resp.read()
-                    image = Image.open(BytesIO(image_data)).convert('RGB')
-                    
-            # Подготовка изображения
-            image_input = self.preprocess(image).unsqueeze(0).to(self.device)
-            text_inputs = self.tokenizer([
-                'white computer case', 
-                'black computer case'
-            ]).to(self.device)
-            
-            # Получаем эмбеддинги
-            with torch.no_grad():
-                image_features = self.model.encode_image(image_input)
-                text_features = self.model.encode_text(text_inputs)
+        colors = await self.detect_colors([image_url])
+        return colors[0]
+        
+    async def detect_colors(self, images: List[Union[str, Image.Image]],
+                            batch_size: Optional[int] = None) -> List[str]:
+        """Определить цвет корпуса для списка фото (URL или изображений) пакетами"""
+        if not self.enabled or not self.model:
+            return [""] * len(images)
+            
+        colors = [""] * len(images)
+        
+        # Сначала кэш по URL - такие фото даже не скачиваем
+        pending = []
+        for i, image in enumerate(images):
+            if isinstance(image, str):
+                if not image:
+                    continue
+                cached = self.cache.get_by_url(image) if self.cache else None
+                if self.cache:
+                    metrics.cache_result('color_url', cached is not None)
+                if cached:
+                    colors[i] = cached.color
+                    self._count('url_cache')
+                    continue
+            pending.append(i)
+            
+        # Скачиваем фото, уже загруженные изображения используем как есть
+        loaded: Dict[int, Tuple[str, Image.Image]] = {}
+        urls = [i for i in pending if isinstance(images[i], str)]
+        if urls:
+            with metrics.stage('image_download'):
+                fetched = await self.fetcher.fetch_many([images[i] for i in urls])
+            for i, result in zip(urls, fetched):
+                if result:
+                    loaded[i] = (result.content_hash, result.image)
+        for i in pending:
+            if not isinstance(images[i], str):
+                loaded[i] = (self._image_hash(images[i]), images[i])
                 
-                # Нормализуем
-                image_features /= image_features.norm(dim=-1, keepdim=True)
-                text_features /= text_features.norm(dim=-1, keepdim=True)
+        # Затем кэш по содержимому: тот же снимок мог прийти по другому URL
+        to_infer = []
+        for i in sorted(loaded):
+            content_hash, image = loaded[i]
+            url = images[i] if isinstance(images[i], str) else None
+            cached = self.cache.get_by_hash(content_hash) if self.cache else None
+            if self.cache:
+                metrics.cache_result('color_hash', cached is not None)
+            if cached:
+                colors[i] = cached.color
+                self._count('hash_cache')
+                if url:
+                    self.cache.link_url(url, content_hash)
+                continue
+            to_infer.append((i, content_hash, url, image))
+            
+        # Явно белые и черные фото решает гистограмма; ее ответы кэшируются под
+        # версией порогов: смена порогов не смешивается с предсказаниями модели
+        if self.histogram and to_infer:
+            with metrics.stage('color_histogram'):
+                decided = self.histogram.classify([image for _, _, _, image in to_infer])
+            histogram_entries = []
+            for (i, content_hash, url, _), result in zip(to_infer, decided):
+                if result:
+                    colors[i] = result[0]
+                    histogram_entries.append((content_hash, result[0], result[1], None, url))
+            to_infer = [entry for entry, result in zip(to_infer, decided) if result is None]
+            self._count('histogram', len(histogram_entries))
+            if self.cache and histogram_entries:
+                self.cache.put_many(histogram_entries, version=self.histogram.version)
+            
+        batch_size = batch_size or self.batch_size
+        entries = []
+        
+        for start in range(0, len(to_infer), batch_size):
+            batch = to_infer[start:start + batch_size]
+            try:
+                with metrics.stage('color_inference'):
+                    results = self._classify([image for _, _, _, image in batch])
+            except Exception as e:
+                logger.error(f"Color detection failed: {e}")
+                continue
                 
-                # Считаем сходство
-                similarity = (100.0 * image_features @ text_features.T).softmax(dim=-1)
+            self._count('model', len(batch))
+            for (i, content_hash, url, _), (color, probability, embedding) in zip(batch, results):
+                colors[i] = color
+                entries.append((content_hash, color, probability, embedding, url))
                 
-            values = similarity[0].cpu().numpy()
-            return 'white' if values[0] > values[1] else 'black'
+        if self.cache and entries:
+            self.cache.put_many(entries)
             
-        except Exception as e:
-            logger.error(f"Color detection failed: {e}")
-            return ""
+        logger.info(f"Color detection: {len(images)} photos, {len(to_infer)} model inferences")
+        return colors
+        
+    def _count(self, tier: str, photos: int = 1):
+        """Учесть фото, решенные уровнем tier (счетчики обхода и метрики)"""
+        self.counters[tier] += photos
+        metrics.COLOR_PHOTOS.labels(tier).inc(photos)
+        
+    @staticmethod
+    def _image_hash(image: Image.Image) -> str:
+        """Хэш уже загруженного изображения по пикселям"""
+        digest = hashlib.sha256(f"{image.mode}:{image.size}".encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+            
+    def _classify(self, images: List[Image.Image]) -> List[Tuple[str, float, Optional[bytes]]]:
+        """Один проход модели по пакету: цвет, вероятность и эмбеддинг"""
+        import torch
+        
+        # Подготовка изображений одним тензором
+        image_input = torch.stack([self.preprocess(image) for image in images]).to(self.device)
+        
+        with torch.no_grad():
+            image_features = self.encode_image(image_input)
+            image_features /= image_features.norm(dim=-1, keepdim=True)
+            
+            # Считаем сходство с заранее посчитанными подсказками
+            similarity = (100.0 * image_features @ self.text_features.T).softmax(dim=-1)
+            
+        embeddings = image_features.cpu().float().numpy() if self.cache_embeddings else None
+        
+        results = []
+        for row, values in enumerate(similarity.cpu().tolist()):
+            color = 'white' if values[0] > values[1] else 'black'
+            embedding = embeddings[row].tobytes() if embeddings is not None else None
+            results.append((color, max(values), embedding))
+        return results
 
 class UnifiedVKParser:
     """Объединенный парсер VK Market"""
     
-    def __init__(self, token: str, min_price: float = 40000):
+    def __init__(self, token: str, min_price: float = 40000,
+                 concurrency: Optional[int] = None):
         self.vk_parser = VKMarketParser(token)
         self.extractor = PCComponentExtractor()
         self.color_detector = CaseColorDetector()
         self.min_price = min_price
+        # Сколько групп парсится одновременно (лимит запросов общий)
+        self.concurrency = concurrency or int(os.getenv('PARSE_CONCURRENCY', '4'))
+        # Размер пачки на выходе потокового парсинга и емкость очередей между стадиями
+        self.chunk_size = int(os.getenv('PARSE_CHUNK_SIZE', '500'))
+        self.queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', '8'))
+        # Извлечение и цвет в пуле процессов (0 - в этом процессе) и товаров в одной задаче пула
+        self.cpu_workers = int(os.getenv('PARSE_CPU_WORKERS', '0'))
+        self.cpu_batch_size = int(os.getenv('PARSE_CPU_BATCH_SIZE', '100'))
+        self.progress: Dict[int, GroupProgress] = {}
+        # Инкрементальный режим: id сборки -> отпечаток с прошлого парсинга
+        self.known_fingerprints: Dict[str, str] = {}
+        # (группа, источник) -> самый новый элемент прошлого обхода: загрузка до него
+        self.crawl_marks: Dict[Tuple[int, str], CrawlMark] = {}
+        self.unchanged_ids: List[str] = []
         
     async def parse_groups(self, group_ids: List[int], 
-                          source: str = 'market') -> List[PCBuild]:
-        """Парсинг групп и извлечение данных о сборках"""
-        
-        # Загружаем модель для определения цвета
-        self.color_detector.load_model()
+                          source: str = 'market',
+                          known_fingerprints: Optional[Dict[str, str]] = None) -> List[PCBuild]:
+        """Парсинг групп и извлечение данных о сборках
         
+        Товары, отпечаток которых совпал с known_fingerprints, не обрабатываются,
+        их id собираются в self.unchanged_ids
+        """
         all_builds = []
+        self.unchanged_ids = []
         
-        async with self.vk_parser as parser:
-            for group_id in group_ids:
-                logger.info(f"Parsing group {group_id}")
-                
-                # Получаем название группы
-                company = await parser.get_group_name(group_id)
+        async for chunk in self.stream_groups(group_ids, source, known_fingerprints):
+            all_builds.extend(chunk.builds)
+            self.unchanged_ids.extend(chunk.unchanged_ids)
+            
+        return all_builds
+        
+    async def stream_groups(self, group_ids: List[int],
+                            source: str = 'market',
+                            known_fingerprints: Optional[Dict[str, str]] = None,
+                            chunk_size: Optional[int] = None,
+                            crawl_marks: Optional[Dict[Tuple[int, str], CrawlMark]] = None
+                            ) -> AsyncIterator[ParsedChunk]:
+        """Потоковый парсинг: страницы -> извлечение -> цвет -> пачки по chunk_size
+        
+        Стадии связаны ограниченными очередями, поэтому в памяти одновременно
+        находится лишь несколько страниц и пачек независимо от размера каталога.
+        С crawl_marks группы загружаются только до уже виденных элементов;
+        новые отметки успешно обойденных групп - в self.vk_parser.marks.
+        С cpu_workers > 0 извлечение и цвет выполняет пул процессов
+        """
+        
+        # Загружаем модель для определения цвета (в режиме пула - процессы пула)
+        if not self.cpu_workers:
+            self.color_detector.load_model()
+        
+        self.known_fingerprints = known_fingerprints or {}
+        self.crawl_marks = crawl_marks or {}
+        self.progress = {group_id: GroupProgress(group_id) for group_id in group_ids}
+        chunk_size = chunk_size or self.chunk_size
+        
+        pages = asyncio.Queue(self.queue_size)
+        extracted = asyncio.Queue(self.queue_size)
+        colored = asyncio.Queue(self.queue_size)
+        total = 0
+        
+        async with self.vk_parser as parser, self.color_detector.fetcher:
+            stages = [asyncio.create_task(self._fetch_stage(parser, group_ids, source, pages))]
+            if self.cpu_workers:
+                stages.append(asyncio.create_task(self._pool_stage(pages, colored)))
+            else:
+                stages += [
+                    asyncio.create_task(self._extract_stage(pages, extracted)),
+                    asyncio.create_task(self._color_stage(extracted, colored)),
+                ]
+            try:
+                chunk = ParsedChunk()
+                while True:
+                    batch = await colored.get()
+                    if batch is _STAGE_DONE:
+                        break
+                    chunk.builds.extend(batch.builds)
+                    chunk.unchanged_ids.extend(batch.unchanged_ids)
+                    if len(chunk) >= chunk_size:
+                        total += len(chunk.builds)
+                        yield chunk
+                        chunk = ParsedChunk()
+                        
+                if len(chunk):
+                    total += len(chunk.builds)
+                    yield chunk
+                    
+                # Пробрасываем ошибку стадии, если она была
+                await asyncio.gather(*stages)
+            finally:
+                for stage in stages:
+                    stage.cancel()
+                await asyncio.gather(*stages, return_exceptions=True)
                 
-                # Получаем товары
+        logger.info(f"Total builds parsed: {total}")
+        
+    async def _fetch_stage(self, parser: VKMarketParser, group_ids: List[int],
+                           source: str, out: asyncio.Queue):
+        """Стадия загрузки: группы параллельно (не больше self.concurrency)"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            await asyncio.gather(*(
+                self._fetch_group(parser, group_id, source, out, semaphore)
+                for group_id in group_ids
+            ))
+        finally:
+            await self._finish_stage(out)
+            
+    async def _fetch_group(self, parser: VKMarketParser, group_id: int, source: str,
+                           out: asyncio.Queue, semaphore: asyncio.Semaphore):
+        """Постраничная загрузка одной группы; ошибка не прерывает остальные группы"""
+        async with semaphore:
+            progress = self.progress.setdefault(group_id, GroupProgress(group_id))
+            progress.status = 'running'
+            progress.started_at = datetime.now()
+            logger.info(f"Parsing group {group_id}")
+            
+            try:
+                since = self.crawl_marks.get((group_id, source))
                 if source == 'market':
-                    items = await parser.get_market_items(group_id)
+                    pages = parser.iter_market_items(group_id, since=since)
                 else:
-                    items = await parser.get_wall_items(group_id)
+                    pages = parser.iter_wall_items(group_id, since=since)
+                    
+                company = None
+                async for items in pages:
+                    if company is None:
+                        # Название группы уже получено в execute вместе с первой страницей
+                        company = await parser.get_group_name(group_id)
+                    progress.items += len(items)
+                    await out.put((group_id, company, items))
                     
-                logger.info(f"Found {len(items)} items in group {group_id}")
+                progress.status = 'done'
+            except Exception as e:
+                logger.error(f"Failed to parse group {group_id}: {e}")
+                progress.status = 'failed'
+                progress.error = str(e)
+                
+            progress.finished_at = datetime.now()
+            finished = sum(1 for p in self.progress.values() if p.status in ('done', 'failed'))
+            logger.info(f"Group {group_id} {progress.status}: {progress.items} items "
+                        f"({finished}/{len(self.progress)} groups)")
+            
+    async def _extract_stage(self, pages: asyncio.Queue, out: asyncio.Queue):
+        """Стадия извлечения: отпечатки и компоненты, пачки размером с батч модели"""
+        batch = ParsedChunk()
+        try:
+            while True:
+                page = await pages.get()
+                if page is _STAGE_DONE:
+                    break
                     
-                # Обрабатываем каждый товар
+                group_id, company, items = page
+                progress = self.progress[group_id]
+                builds, unchanged = progress.builds, progress.unchanged
+                started, waited = time.perf_counter(), 0.0
                 for item in items:
-                    build = await self.process_item(item, group_id, company)
-                    if build and build.price >= self.min_price:
-                        all_builds.append(build)
+                    build_id = f"{group_id}_{item.get('id')}"
+                    known = self.known_fingerprints.get(build_id)
+                    if known and known == self.item_fingerprint(item):
+                        batch.unchanged_ids.append(build_id)
+                        progress.unchanged += 1
+                    else:
+                        build = await self.process_item(item, group_id, company)
+                        if build and build.price >= self.min_price:
+                            batch.builds.append(build)
+                            progress.builds += 1
+                            
+                    if len(batch) >= self.color_detector.batch_size:
+                        put_started = time.perf_counter()
+                        await out.put(batch)
+                        waited += time.perf_counter() - put_started
+                        batch = ParsedChunk()
                         
-        logger.info(f"Total builds parsed: {len(all_builds)}")
-        return all_builds
+                # Метрики раз на страницу, а не на товар; ожидание очереди не в счет
+                metrics.STAGE_SECONDS.labels('extract').observe(time.perf_counter() - started - waited)
+                metrics.ITEMS.labels('build').inc(progress.builds - builds)
+                metrics.ITEMS.labels('unchanged').inc(progress.unchanged - unchanged)
+                
+            if len(batch):
+                await out.put(batch)
+        finally:
+            await self._finish_stage(out)
+            
+    async def _pool_stage(self, pages: asyncio.Queue, out: asyncio.Queue):
+        """Стадия извлечения и цвета в пуле процессов
+        
+        Неизмененные товары отсеиваются здесь, остальные уходят в пул пачками
+        по cpu_batch_size; результаты отдаются в порядке отправки (как в
+        однопроцессном режиме), в работе не больше двух пачек на процесс
+        """
+        loop = asyncio.get_running_loop()
+        pool = get_cpu_pool(self.cpu_workers, self.min_price)
+        pending = deque()
         
+        async def emit_oldest():
+            group_id, chunk, future = pending.popleft()
+            if future is not None:
+                builds = await future
+                chunk.builds.extend(builds)
+                self.progress[group_id].builds += len(builds)
+                metrics.ITEMS.labels('build').inc(len(builds))
+            await out.put(chunk)
+            
+        try:
+            while True:
+                page = await pages.get()
+                if page is _STAGE_DONE:
+                    break
+                    
+                group_id, company, items = page
+                progress = self.progress[group_id]
+                chunk, changed = ParsedChunk(), []
+                for item in items:
+                    build_id = f"{group_id}_{item.get('id')}"
+                    known = self.known_fingerprints.get(build_id)
+                    if known and known == self.item_fingerprint(item):
+                        chunk.unchanged_ids.append(build_id)
+                    else:
+                        changed.append(item)
+                progress.unchanged += len(chunk.unchanged_ids)
+                metrics.ITEMS.labels('unchanged').inc(len(chunk.unchanged_ids))
+                
+                if not changed:
+                    pending.append((group_id, chunk, None))
+                for start in range(0, len(changed), self.cpu_batch_size):
+                    while len(pending) >= 2 * self.cpu_workers:
+                        await emit_oldest()
+                    future = loop.run_in_executor(pool, process_items,
+                                                  changed[start:start + self.cpu_batch_size], group_id, company)
+                    pending.append((group_id, chunk, future))
+                    chunk = ParsedChunk()
+                    
+            while pending:
+                await emit_oldest()
+        finally:
+            for _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+            await self._finish_stage(out)
+            
+    async def process_items(self, items: List[Dict], group_id: int, company: str) -> List[PCBuild]:
+        """Сборки из пачки товаров: извлечение, фильтр цены и цвет по фото"""
+        builds = []
+        with metrics.stage('extract'):
+            for item in items:
+                build = await self.process_item(item, group_id, company)
+                if build and build.price >= self.min_price:
+                    builds.append(build)
+                    
+        if builds and self.color_detector.enabled:
+            async with self.color_detector.fetcher:
+                await self.detect_case_colors(builds)
+        return builds
+        
+    @staticmethod
+    async def _finish_stage(out: asyncio.Queue):
+        """Сообщить следующей стадии о завершении (кроме отмены конвейера)"""
+        # При отмене очередь уже никто не читает - put на полной очереди завис бы
+        if not asyncio.current_task().cancelling():
+            await out.put(_STAGE_DONE)
+            
+    async def _color_stage(self, extracted: asyncio.Queue, out: asyncio.Queue):
+        """Стадия определения цвета по фото"""
+        try:
+            while True:
+                batch = await extracted.get()
+                if batch is _STAGE_DONE:
+                    break
+                await self.detect_case_colors(batch.builds)
+                await out.put(batch)
+        finally:
+            await self._finish_stage(out)
+            
+    async def detect_case_colors(self, builds: List[PCBuild]):
+        """Определить цвет корпуса по фото для сборок, где его нет в тексте"""
+        pending = [build for build in builds if not build.case_color and build.photo_url]
+        if not pending or not self.color_detector.enabled:
+            return
+            
+        colors = await self.color_detector.detect_colors([build.photo_url for build in pending])
+        for build, color in zip(pending, colors):
+            build.case_color = color
+            
     async def process_item(self, item: Dict, group_id: int, company: str) -> Optional[PCBuild]:
         """Обработка одного товара"""
         try:
@@ -437,37 +1324,22 @@ class UnifiedVKParser:
             description = item.get('description', '')
             
             # Цена
-            price_obj = item.get('price', {})
-            if isinstance(price_obj, dict):
-                price = float(price_obj.get('amount', 0)) / 100
-            else:
-                price = 0
+            price = self._item_price(item)
             
             # Фильтр по цене
             if price < self.min_price:
+                metrics.ITEMS.labels('below_min_price').inc()
                 return None
                 
-            # Извлекаем компоненты
-            full_text = f"{title}\n{description}"
-            cpu = self.extractor.extract_cpu(full_text)
-            gpu = self.extractor.extract_gpu(full_text)
-            ram = self.extractor.extract_ram(full_text)
+            # Извлекаем компоненты за один проход
+            components = self.extractor.extract_all(title, description)
             
             # URL фото
-            photo_url = item.get('thumb_photo', '')
-            if not photo_url and item.get('photos'):
-                photos = item.get('photos', [])
-                if photos and isinstance(photos[0], dict):
-                    sizes = photos[0].get('sizes', [])
-                    if sizes:
-                        photo_url = sizes[-1].get('url', '')
+            photo_url = self._item_photo_url(item)
                     
-            # Определяем цвет корпуса
-            case_color = self.extractor.extract_case_color_from_text(description)
-            if not case_color and photo_url:
-                case_color = await self.color_detector.detect_color(photo_url)
-            if not case_color:
-                case_color = ""
+            # Цвет корпуса по тексту; фото без цвета
+            # обрабатываются пакетно в detect_case_colors
+            case_color = components.case_color or ""
             
             # Формируем URL товара
             item_id = item.get('id')
@@ -479,18 +1351,54 @@ class UnifiedVKParser:
                 title=title,
                 description=description,
                 price=price,
-                cpu=cpu,
-                gpu=gpu,
-                ram=ram,
+                cpu=components.cpu,
+                gpu=components.gpu,
+                ram=components.ram,
                 case_color=case_color,
                 photo_url=photo_url,
                 vk_url=vk_url,
-                parsed_at=datetime.now()
+                parsed_at=datetime.now(),
+                fingerprint=self.item_fingerprint(item)
             )
             
         except Exception as e:
             logger.error(f"Failed to process item: {e}")
+            metrics.ITEMS.labels('failed').inc()
             return None
+            
+    @staticmethod
+    def _item_price(item: Dict) -> float:
+        """Цена товара в рублях"""
+        price_obj = item.get('price', {})
+        if isinstance(price_obj, dict):
+            return float(price_obj.get('amount', 0)) / 100
+        return 0
+        
+    @staticmethod
+    def _item_photo_url(item: Dict) -> str:
+        """URL фото товара"""
+        photo_url = item.get('thumb_photo', '')
+        if not photo_url and item.get('photos'):
+            photos = item.get('photos', [])
+            if photos and isinstance(photos[0], dict):
+                sizes = photos[0].get('sizes', [])
+                if sizes:
+                    photo_url = sizes[-1].get('url', '')
+        return photo_url
+        
+    @classmethod
+    def item_fingerprint(cls, item: Dict) -> str:
+        """Отпечаток товара: название, описание, цена и фото"""
+        price_obj = item.get('price', {})
+        amount = price_obj.get('amount', '') if isinstance(price_obj, dict) else ''
+        payload = '\x00'.join([
+            FINGERPRINT_VERSION,
+            str(item.get('title', '')),
+            str(item.get('description', '')),
+            str(amount),
+            cls._item_photo_url(item)
+        ])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
 
 # Пример использования
 async def main():
@@ -0,0 +1,122 @@
+"""
+vk_retry.py - Политика повторов вызовов VK API
+Классификация ошибок по коду, экспоненциальная задержка со случайной
+составляющей и автомат отключения (circuit breaker) для каждого адреса API
+"""
+
+from typing import Optional, Set
+import os
+import random
+import time
+
+# Лимиты частоты: ждать и повторять на том же адресе (лимит общий для токена)
+RATE_LIMIT_CODES = {6, 9}
+# Сбои на стороне сервера: повторять, можно на другом адресе
+SERVER_ERROR_CODES = {1, 10}
+
+def _codes(value: str) -> Set[int]:
+    return {int(code) for code in value.split(',') if code.strip()}
+
+class VKAPIError(Exception):
+    """Ошибка VK API ({"error": ...} в ответе) или исчерпанные повторы"""
+
+    def __init__(self, method: str, code: Optional[int], message: str):
+        super().__init__(f"{method}: VK API error {code}: {message}")
+        self.method = method
+        self.code = code
+        self.message = message
+
+class RetryPolicy:
+    """Что повторять и сколько ждать
+
+    Лимиты частоты (6, 9, HTTP 429) - задержка и повтор, серверные сбои
+    (1, 10, HTTP 5xx, таймауты и обрывы соединения) - следующий адрес
+    и повтор, остальные коды (доступ, параметры, удаленная группа) -
+    сразу ошибка без повторов.
+    """
+
+    def __init__(self, max_retries: Optional[int] = None, backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None, timeout: Optional[float] = None,
+                 rate_limit_codes: Optional[Set[int]] = None, server_error_codes: Optional[Set[int]] = None):
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('VK_MAX_RETRIES', '4'))
+        self.backoff_base = backoff_base or float(os.getenv('VK_BACKOFF_BASE', '0.5'))
+        self.backoff_max = backoff_max or float(os.getenv('VK_BACKOFF_MAX', '30'))
+        # Таймаут одного HTTP-запроса, секунд
+        self.timeout = timeout or float(os.getenv('VK_REQUEST_TIMEOUT', '15'))
+        self.rate_limit_codes = rate_limit_codes or _codes(
+            os.getenv('VK_RATE_LIMIT_CODES', ','.join(map(str, sorted(RATE_LIMIT_CODES)))))
+        self.server_error_codes = server_error_codes or _codes(
+            os.getenv('VK_SERVER_ERROR_CODES', ','.join(map(str, sorted(SERVER_ERROR_CODES)))))
+
+    def is_rate_limit(self, code: int) -> bool:
+        return code in self.rate_limit_codes
+
+    def is_server_error(self, code: int) -> bool:
+        return code in self.server_error_codes
+
+    def is_transient(self, code: Optional[int]) -> bool:
+        """Временный сбой: лимит, ошибка сервера или сбой HTTP (code=None)"""
+        return code is None or self.is_rate_limit(code) or self.is_server_error(code)
+
+    def backoff(self, attempt: int) -> float:
+        """Задержка перед повтором attempt (с 0): full jitter от base * 2^attempt"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+class CircuitBreaker:
+    """Автомат отключения одного адреса API
+
+    После threshold сбоев подряд адрес исключается на cooldown секунд,
+    затем пропускается один пробный запрос: успех возвращает адрес,
+    сбой снова отключает его. Пробный запрос без ответа (отмена)
+    не блокирует адрес дольше еще одного cooldown.
+    """
+
+    def __init__(self, threshold: Optional[int] = None, cooldown: Optional[float] = None):
+        self.threshold = threshold or int(os.getenv('VK_BREAKER_THRESHOLD', '5'))
+        self.cooldown = cooldown or float(os.getenv('VK_BREAKER_COOLDOWN', '60'))
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        """Можно ли отправить запрос на адрес сейчас"""
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at < self.cooldown:
+            return False
+        if self.probe_at is not None and now - self.probe_at < self.cooldown:
+            return False
+        self.probe_at = now
+        return True
+
+    def retry_in(self) -> float:
+        """Секунд до пробного запроса (0 - адрес доступен)
+
+        Пока пробный запрос не ответил, адрес закрыт для остальных
+        до probe_at + cooldown
+        """
+        if self.opened_at is None:
+            return 0.0
+        ready_at = self.opened_at + self.cooldown
+        if self.probe_at is not None:
+            ready_at = max(ready_at, self.probe_at + self.cooldown)
+        return max(0.0, ready_at - time.monotonic())
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_at = None
+
+    def failure(self) -> bool:
+        """Учесть сбой; True, если адрес только что отключен"""
+        self.failures += 1
+        if self.probe_at is not None or (self.opened_at is None and self.failures >= self.threshold):
+            self.opened_at = time.monotonic()
+            self.probe_at = None
+            return True
+        return False
@@ -0,0 +1,85 @@
+"""
+serialization.py - Быстрая сериализация сборок для ответов API
+Строки выбираются из БД кортежами, форматируются за один проход
+и кодируются orjson (если установлен), без Pydantic-модели на строку
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+
+from sqlalchemy import null
+
+from app.database import PCBuildDB
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Поля ответа в порядке BuildResponse
+FIELDS: Tuple[str, ...] = (
+    "id", "company", "title", "description", "price", "price_formatted", "cpu", "gpu",
+    "ram", "case_color", "photo_url", "vk_url", "is_our_build", "price_comparison",
+)
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Поля из параметра fields= ("id,title,price"); None - все поля
+
+    id возвращается всегда. ValueError для неизвестного поля.
+    """
+    if not fields:
+        return FIELDS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return tuple(name for name in FIELDS if name in requested)
+
+def build_columns(fields: Sequence[str] = FIELDS) -> List[Any]:
+    """Колонки для выборки кортежами; description читается, только если нужен"""
+    description = PCBuildDB.description if "description" in fields else null().label("description")
+    return [
+        PCBuildDB.id, PCBuildDB.company, PCBuildDB.title, description, PCBuildDB.price,
+        PCBuildDB.cpu, PCBuildDB.gpu, PCBuildDB.ram, PCBuildDB.case_color,
+        PCBuildDB.photo_url, PCBuildDB.vk_url, PCBuildDB.is_our_build,
+    ]
+
+def format_rows(rows: Iterable[tuple], fields: Sequence[str] = FIELDS) -> List[Dict[str, Any]]:
+    """Ответы для строк build_columns() (то же форматирование, что у BuildResponse)"""
+    partial = tuple(fields) != FIELDS
+    result = []
+    for (build_id, company, title, description, price, cpu, gpu, ram,
+         case_color, photo_url, vk_url, is_our_build) in rows:
+        item = {
+            "id": build_id,
+            "company": company,
+            "title": title,
+            "description": description,
+            "price": price,
+            "price_formatted": f"{int(price):,} руб.".replace(",", " "),
+            "cpu": cpu or "Не указан",
+            "gpu": gpu or "Не указана",
+            "ram": f"{ram} GB" if ram else "Не указана",
+            "case_color": case_color or "Не определен",
+            "photo_url": photo_url,
+            "vk_url": vk_url,
+            "is_our_build": is_our_build,
+            "price_comparison": None,
+        }
+        if partial:
+            item = {name: item[name] for name in fields}
+        result.append(item)
+    return result
+
+def dumps(data: Any) -> bytes:
+    """JSON в байтах: orjson, без него - стандартный json в том же виде"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+def _default(value: Any) -> Any:
+    # datetime - как у orjson (ISO 8601)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,156 @@
+"""
+worker.py - Парсинг групп в отдельном процессе
+Загрузка VK, извлечение, CLIP и запись в БД не занимают event loop API
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+import asyncio
+import logging
+import multiprocessing
+import os
+
+from app import metrics
+from app.cache import get_cache
+from app.indexes import rebuild_indexes
+from app.database import (SessionLocal, PCBuildDB, CrawlStateDB, refresh_company_stats, touch_parsed_at,
+                          upsert_builds)
+
+logger = logging.getLogger(__name__)
+
+# Настройки
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "1"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def get_executor() -> ProcessPoolExecutor:
+    """Пул процессов для парсинга (создается при первом запуске и после гибели процесса)"""
+    global _executor
+    if _executor is not None and getattr(_executor, "_broken", False):
+        # Процесс парсинга умер без задачи (OOM, сбой torch): сломанный пул не примет новых
+        shutdown()
+    if _executor is None:
+        # spawn: не наследуем потоки и соединения процесса API
+        _executor = ProcessPoolExecutor(
+            max_workers=CRAWL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+def shutdown():
+    """Остановить пул процессов"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def submit_parse_job(group_ids: List[int], source: str, incremental: bool = True,
+                           full_resync: bool = False):
+    """Запустить парсинг в пуле процессов и дождаться результата"""
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    try:
+        result = await loop.run_in_executor(
+            executor, run_parse_job, group_ids, source, incremental, full_resync
+        )
+        logger.info(f"Parse job finished: {result}")
+    except BrokenProcessPool as e:
+        logger.error(f"Parse job failed, crawl process died: {e}")
+        # Следующий запуск получит новый пул (если его еще не пересоздал другой запуск)
+        if _executor is executor:
+            shutdown()
+    except Exception as e:
+        logger.error(f"Parse job failed: {e}")
+    finally:
+        # Без Redis версия данных живет в процессе API - увеличиваем ее здесь
+        cache = get_cache()
+        cache.bump_version()
+        # Индексы перестраиваем сразу, не дожидаясь первого запроса
+        rebuild_indexes(cache.version())
+
+def run_parse_job(group_ids: List[int], source: str, incremental: bool = True,
+                  full_resync: bool = False) -> Dict:
+    """Точка входа в процессе-воркере"""
+    logging.basicConfig(level=logging.INFO)
+    return asyncio.run(parse_groups_job(group_ids, source, incremental, full_resync))
+
+async def parse_groups_job(group_ids: List[int], source: str, incremental: bool = True,
+                           full_resync: bool = False) -> Dict:
+    """Парсинг групп с сохранением пачками
+
+    Без full_resync группы загружаются только до элементов, виденных
+    прошлым обходом; full_resync проходит все страницы (изменения цен
+    у старых товаров видны только так)
+    """
+    from app.parser.unified_parser import CrawlMark, UnifiedVKParser
+
+    vk_token = os.getenv("VK_TOKEN", "")
+    min_price = float(os.getenv("MIN_PRICE", "40000"))
+    saved = unchanged = 0
+    # Компании записанных сборок: перцентили цен пересчитываются один раз в конце
+    touched: Set[str] = set()
+
+    db = SessionLocal()
+    try:
+        # Отпечатки уже сохраненных сборок: неизменные товары не переобрабатываются
+        known_fingerprints = {}
+        if incremental:
+            known_fingerprints = dict(
+                db.query(PCBuildDB.id, PCBuildDB.fingerprint).filter(
+                    PCBuildDB.fingerprint.isnot(None)
+                ).all()
+            )
+
+        crawl_marks = {}
+        if not full_resync:
+            crawl_marks = {
+                (state.group_id, source): CrawlMark(state.last_item_id or 0, state.last_date or 0)
+                for state in db.query(CrawlStateDB).filter(
+                    CrawlStateDB.group_id.in_(group_ids), CrawlStateDB.source == source
+                )
+            }
+
+        parser = UnifiedVKParser(vk_token, min_price)
+
+        # Пачки сохраняются по мере готовности: сбой в конце обхода
+        # не теряет уже обработанные группы. Запись идет в потоке,
+        # чтобы не останавливать загрузку следующих страниц
+        async for chunk in parser.stream_groups(group_ids, source, known_fingerprints,
+                                                crawl_marks=crawl_marks):
+            with metrics.stage("db_upsert"):
+                saved += await asyncio.to_thread(upsert_builds, db, chunk.builds, None, touched)
+            with metrics.stage("db_touch"):
+                await asyncio.to_thread(touch_parsed_at, db, chunk.unchanged_ids)
+            unchanged += len(chunk.unchanged_ids)
+            # Сохраненная пачка делает закэшированные ответы устаревшими
+            if chunk.builds:
+                get_cache().bump_version()
+
+        if touched:
+            with metrics.stage("db_company_stats"):
+                await asyncio.to_thread(refresh_company_stats, db, touched)
+            touched.clear()
+            get_cache().bump_version()
+
+        # Отметки сохраняются после записи всех пачек: упавший обход повторит загрузку
+        for (group_id, mark_source), mark in parser.vk_parser.marks.items():
+            db.merge(CrawlStateDB(group_id=group_id, source=mark_source, last_item_id=mark.item_id,
+                                  last_date=mark.date, updated_at=datetime.now()))
+        db.commit()
+
+        failed = [p.group_id for p in parser.progress.values() if p.status == 'failed']
+        return {"groups": len(group_ids), "failed": failed, "saved": saved, "unchanged": unchanged,
+                "color_tiers": dict(parser.color_detector.counters)}
+    except Exception:
+        db.rollback()
+        # Записанные до сбоя пачки уже в счетчиках - перцентили тоже
+        try:
+            refresh_company_stats(db, touched)
+        except Exception as e:
+            logger.error(f"Failed to refresh company stats: {e}")
+            db.rollback()
+        raise
+    finally:
+        db.close()
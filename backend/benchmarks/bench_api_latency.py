@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+bench_api_latency.py - Задержка API во время парсинга
+
+Поднимает uvicorn с заполненной SQLite-базой, нагружает GET /api/builds/our
+и печатает p50/p95/p99 в простое и во время парсинга, запущенного через
+POST /api/parse/start. Для парсинга нужен доступный VK API: адрес задается
+--vk-api-url (переменная VK_API_URL сервера), токен - VK_TOKEN.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_api_latency --vk-api-url http://127.0.0.1:8081/method/ --groups 1,2,3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, upsert_builds
+from benchmarks.bench_upsert import generate_builds
+
+def seed_database(database_url: str, rows: int):
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        upsert_builds(db, generate_builds(rows))
+    engine.dispose()
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(port: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port), '--log-level', 'warning'],
+        env={**os.environ, **env},
+        # Своя группа процессов: при остановке завершаем и воркеры парсинга
+        start_new_session=True
+    )
+
+def stop_server(server: subprocess.Popen):
+    os.killpg(server.pid, signal.SIGTERM)
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+async def wait_ready(session: aiohttp.ClientSession, base: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base}/") as resp:
+                if resp.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("API server did not start")
+
+async def load(session: aiohttp.ClientSession, url: str, duration: float, concurrency: int) -> List[float]:
+    """Замкнутая нагрузка: concurrency клиентов в течение duration секунд"""
+    latencies: List[float] = []
+    deadline = time.monotonic() + duration
+
+    async def client():
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            async with session.get(url) as resp:
+                await resp.read()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {'requests': len(ordered), 'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99)}
+
+async def measure(base: str, duration: float, concurrency: int,
+                  groups: Optional[List[int]]) -> Dict[str, Dict[str, float]]:
+    url = f"{base}/api/builds/our"
+    async with aiohttp.ClientSession() as session:
+        await wait_ready(session, base)
+        await load(session, url, 1, concurrency)  # прогрев
+        result = {'idle': percentiles(await load(session, url, duration, concurrency))}
+
+        if groups:
+            async with session.post(f"{base}/api/parse/start", json={
+                'group_ids': groups, 'source': 'market', 'incremental': False
+            }) as resp:
+                if resp.status != 200:
+                    raise SystemExit(f"parse/start failed: {resp.status} {await resp.text()}")
+            result['crawl'] = percentiles(await load(session, url, duration, concurrency))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000, help='сборок в тестовой базе')
+    parser.add_argument('--duration', type=float, default=10, help='секунд нагрузки на фазу')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--groups', help='id групп для парсинга через запятую (без них - только простой)')
+    parser.add_argument('--vk-api-url', help='адрес VK API для сервера')
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    groups = [int(g) for g in args.groups.split(',')] if args.groups else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed_database(database_url, args.rows)
+
+        env = {'DATABASE_URL': database_url, 'VK_TOKEN': os.getenv('VK_TOKEN', 'bench'),
+               'COLOR_CACHE_PATH': os.path.join(tmp, 'color_cache.db')}
+        if args.vk_api_url:
+            env['VK_API_URL'] = args.vk_api_url
+
+        port = free_port()
+        server = start_server(port, env)
+        try:
+            result = asyncio.run(measure(f"http://127.0.0.1:{port}", args.duration, args.concurrency, groups))
+        finally:
+            stop_server(server)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for phase, stats in result.items():
+        print(f"{phase:6s} {stats['requests']:6d} req  p50 {stats['p50_ms']:7.1f} ms  "
+              f"p95 {stats['p95_ms']:7.1f} ms  p99 {stats['p99_ms']:7.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+bench_color_inference.py - Обычная модель цвета против быстрого режима (int8 + TorchScript)
+
+Классифицирует размеченный набор фото обеими моделями и печатает точность
+относительно разметки, долю совпавших ответов и изображений в секунду
+на CPU для каждого числа потоков.
+
+Набор: каталог с подкаталогами white/ и black/ (--fixtures). Без него
+генерируются синтетические фото корпусов - точность на них имеет смысл
+только с настоящими весами (COLOR_MODEL_PRETRAINED).
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_color_inference --fixtures ./fixtures/cases --threads 1,2,4
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Dict, List, Tuple
+
+from PIL import Image, ImageDraw
+
+from app.parser.unified_parser import CaseColorDetector
+
+COLORS = ('white', 'black')
+
+def synthetic_fixtures(count: int, seed: int = 42) -> List[Tuple[Image.Image, str]]:
+    """Корпус (светлый или темный прямоугольник) на случайном фоне"""
+    rng = random.Random(seed)
+    fixtures = []
+    for i in range(count):
+        label = COLORS[i % 2]
+        base = rng.randint(200, 255) if label == 'white' else rng.randint(0, 50)
+        image = Image.new('RGB', (320, 320), tuple(rng.randint(60, 200) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        left, top = rng.randint(20, 80), rng.randint(10, 60)
+        draw.rectangle([left, top, left + rng.randint(140, 200), top + rng.randint(200, 250)],
+                       fill=(base, base, base))
+        # Стекло и подсветка
+        draw.rectangle([left + 20, top + 30, left + 90, top + 150],
+                       fill=tuple(rng.randint(0, 255) for _ in range(3)))
+        fixtures.append((image, label))
+    return fixtures
+
+def load_fixtures(path: str) -> List[Tuple[Image.Image, str]]:
+    fixtures = []
+    for label in COLORS:
+        directory = os.path.join(path, label)
+        for name in sorted(os.listdir(directory)):
+            with Image.open(os.path.join(directory, name)) as image:
+                fixtures.append((image.convert('RGB'), label))
+    return fixtures
+
+def detector(fast: bool) -> CaseColorDetector:
+    import torch
+
+    # Одинаковые веса у обеих моделей и без чекпоинта (случайная инициализация)
+    torch.manual_seed(0)
+    result = CaseColorDetector()
+    result.enabled = True
+    result.fast = fast
+    result.cache_path = ''
+    result.load_model()
+    if result.model is None:
+        raise SystemExit("color model failed to load")
+    return result
+
+def classify(model: CaseColorDetector, images: List[Image.Image], batch_size: int) -> Tuple[List[str], float]:
+    start = time.perf_counter()
+    colors = []
+    for offset in range(0, len(images), batch_size):
+        colors.extend(color for color, _, _ in model._classify(images[offset:offset + batch_size]))
+    return colors, len(images) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', help='каталог с white/ и black/')
+    parser.add_argument('--count', type=int, default=64, help='синтетических фото без --fixtures')
+    parser.add_argument('--threads', default='1', help='числа потоков torch через запятую')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    import torch
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else synthetic_fixtures(args.count)
+    images = [image for image, _ in fixtures]
+    labels = [label for _, label in fixtures]
+    models = {'eager': detector(fast=False), 'fast': detector(fast=True)}
+
+    # Прогрев (первый вызов TorchScript оптимизирует граф)
+    for model in models.values():
+        classify(model, images[:args.batch_size], args.batch_size)
+
+    result: Dict = {'images': len(images), 'synthetic': not args.fixtures, 'throughput': {}}
+    predictions = {}
+    for threads in [int(t) for t in args.threads.split(',')]:
+        torch.set_num_threads(threads)
+        speed = {}
+        for name, model in models.items():
+            predictions[name], speed[name] = classify(model, images, args.batch_size)
+        result['throughput'][threads] = speed
+
+    for name, colors in predictions.items():
+        result[f'{name}_accuracy'] = sum(c == l for c, l in zip(colors, labels)) / len(labels)
+    result['agreement'] = sum(a == b for a, b in zip(predictions['eager'], predictions['fast'])) / len(labels)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['images']} images{' (synthetic)' if result['synthetic'] else ''}: "
+          f"accuracy eager {result['eager_accuracy']:.1%}, fast {result['fast_accuracy']:.1%}, "
+          f"agreement {result['agreement']:.1%}")
+    for threads, speed in result['throughput'].items():
+        print(f"  {threads} threads: eager {speed['eager']:6.1f} img/s  fast {speed['fast']:6.1f} img/s "
+              f"(x{speed['fast'] / speed['eager']:.2f})")
+
+if __name__ == '__main__':
+    main()
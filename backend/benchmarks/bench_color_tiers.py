@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+bench_color_tiers.py - Гистограмма яркости перед CLIP
+
+Прогоняет размеченный набор фото через detect_colors с первым уровнем
+(гистограммой) и без него: печатает, сколько фото решил каждый уровень,
+точность гистограммы на решенных ею фото и общее время.
+
+Набор - как в bench_color_inference (--fixtures с white/ и black/ или
+синтетические корпуса).
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_color_tiers --fixtures ./fixtures/cases
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict
+
+from app.parser.color_histogram import HistogramColorClassifier
+from benchmarks.bench_color_inference import detector, load_fixtures, synthetic_fixtures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', help='каталог с white/ и black/')
+    parser.add_argument('--count', type=int, default=128, help='синтетических фото без --fixtures')
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else synthetic_fixtures(args.count)
+    images = [image for image, _ in fixtures]
+    labels = [label for _, label in fixtures]
+
+    # Точность и скорость одной гистограммы
+    histogram = HistogramColorClassifier()
+    start = time.perf_counter()
+    decided = histogram.classify(images)
+    histogram_ms = (time.perf_counter() - start) * 1000 / len(images)
+    hits = [(result[0], label) for result, label in zip(decided, labels) if result]
+
+    result: Dict = {
+        'images': len(images), 'synthetic': not args.fixtures,
+        'histogram_ms_per_image': histogram_ms,
+        'histogram_accuracy': sum(color == label for color, label in hits) / len(hits) if hits else None,
+    }
+
+    # detect_colors целиком: только модель против гистограммы + модели
+    model = detector(fast=False)
+    asyncio.run(model.detect_colors(images[:model.batch_size]))  # прогрев
+    for name, tier in (('model_only', None), ('tiered', histogram)):
+        model.histogram = tier
+        model.counters.clear()
+        start = time.perf_counter()
+        asyncio.run(model.detect_colors(images))
+        result[name] = {'seconds': time.perf_counter() - start, 'counters': dict(model.counters)}
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    accuracy = result['histogram_accuracy']
+    print(f"{result['images']} images{' (synthetic)' if result['synthetic'] else ''}: "
+          f"histogram decided {len(hits)} ({len(hits) / len(images):.0%}), "
+          f"accuracy {'-' if accuracy is None else f'{accuracy:.1%}'}, {histogram_ms:.2f} ms/image")
+    for name in ('model_only', 'tiered'):
+        print(f"  {name:10s} {result[name]['seconds']:6.2f} s  {result[name]['counters']}")
+
+if __name__ == '__main__':
+    main()
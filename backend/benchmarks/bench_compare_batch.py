@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+bench_compare_batch.py - N одиночных сравнений против одного пакетного
+
+Поднимает uvicorn с заполненной SQLite-базой (кэш ответов выключен),
+затем для каждого типа сравнения выполняет по одному POST /api/compare/*
+на каждую нашу сборку и один POST /api/compare/batch, сверяет результаты
+и печатает общее время.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_compare_batch --rows 10000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Dict
+
+import aiohttp
+
+from benchmarks.bench_api_latency import free_port, seed_database, start_server, stop_server, wait_ready
+
+ENDPOINTS = {'price': '/api/compare/price', 'specs': '/api/compare/specs', 'similar': '/api/compare/specs'}
+
+async def measure(base: str) -> Dict[str, Dict[str, float]]:
+    result = {}
+    async with aiohttp.ClientSession() as session:
+        await wait_ready(session, base)
+        async with session.get(f"{base}/api/builds/our") as resp:
+            ours = [build['id'] for build in await resp.json()]
+
+        for comparison_type, endpoint in ENDPOINTS.items():
+            # Как страница обзора сейчас: запрос на каждую сборку
+            single = {}
+            start = time.perf_counter()
+            for build_id in ours:
+                async with session.post(f"{base}{endpoint}", json={
+                    'build_id': build_id, 'comparison_type': comparison_type
+                }) as resp:
+                    single[build_id] = await resp.json()
+            single_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            async with session.post(f"{base}/api/compare/batch", json={'comparison_type': comparison_type}) as resp:
+                batch = await resp.json()
+            batch_s = time.perf_counter() - start
+
+            if batch != single:
+                raise SystemExit(f"{comparison_type}: batch results differ from single calls")
+            result[comparison_type] = {'builds': len(ours), 'single_s': single_s,
+                                       'batch_s': batch_s, 'speedup': single_s / batch_s}
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help='сборок в тестовой базе (каждая четвертая - наша)')
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed_database(database_url, args.rows)
+
+        port = free_port()
+        server = start_server(port, {'DATABASE_URL': database_url, 'CACHE_ENABLED': 'false',
+                                     'COLOR_CACHE_PATH': os.path.join(tmp, 'color_cache.db')})
+        try:
+            result = asyncio.run(measure(f"http://127.0.0.1:{port}"))
+        finally:
+            stop_server(server)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for comparison_type, stats in result.items():
+        print(f"{comparison_type:8s} {stats['builds']} builds: {stats['builds']} calls {stats['single_s']:7.2f} s, "
+              f"batch {stats['batch_s']:6.2f} s (x{stats['speedup']:.1f})")
+
+if __name__ == '__main__':
+    main()
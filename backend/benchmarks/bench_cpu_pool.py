@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+bench_cpu_pool.py - Масштабирование CPU-стадии парсинга по процессам
+
+Обходит группы заглушки (benchmarks.vk_stub) в однопроцессном режиме
+и с пулом из 1..N процессов (PARSE_CPU_WORKERS), сверяет сборки
+(все поля, кроме parsed_at) с однопроцессным режимом и печатает items/s,
+ускорение и время старта пула. Пул прогревается отдельным обходом.
+
+С --color определяется и цвет по фото заглушки. Без сети модель
+создается со случайными весами и сохраняется во временный чекпоинт,
+чтобы основной процесс и процессы пула загрузили одни и те же веса.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_cpu_pool --workers 1,2,4,8 --items 2000
+    python -m benchmarks.bench_cpu_pool --workers 1,2,4,8 --items 200 --color
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Dict, List, Optional
+
+from benchmarks.vk_stub import StubConfig, StubServer
+
+def random_checkpoint(path: str, model_name: str):
+    """Чекпоинт модели со случайными (но воспроизводимыми) весами"""
+    import open_clip
+    import torch
+
+    torch.manual_seed(0)
+    model = open_clip.create_model(model_name, pretrained=None)
+    torch.save(model.state_dict(), path)
+
+def crawl(stub: StubServer, workers: int, batch_size: int) -> Dict:
+    from app.parser.unified_parser import UnifiedVKParser
+
+    parser = UnifiedVKParser('bench', min_price=40000)
+    parser.cpu_workers = workers
+    parser.cpu_batch_size = batch_size
+    builds = []
+
+    async def run():
+        async for chunk in parser.stream_groups(stub.stub.group_ids, 'market'):
+            builds.extend(chunk.builds)
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    seconds = time.perf_counter() - start
+    items = sum(p.items for p in parser.progress.values())
+    # Страницы разных групп чередуются по-разному от запуска к запуску - сверяем по id
+    rows = sorted(({**asdict(build), 'parsed_at': None} for build in builds), key=lambda row: row['id'])
+    return {'items': items, 'builds': len(builds), 'seconds': seconds,
+            'items_per_s': items / seconds, 'rows': rows}
+
+def run(worker_counts: List[int], groups: int, items: int, batch_size: int,
+        color: bool, histogram: bool) -> Dict:
+    from app.parser import cpu_pool
+
+    result: Dict = {'cpu_count': os.cpu_count(), 'modes': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {'VK_REQUESTS_PER_SECOND': '1000', 'COLOR_CACHE_PATH': '',
+               'USE_ML_COLOR_DETECTION': 'true' if color else 'false',
+               'COLOR_HISTOGRAM_ENABLED': 'true' if histogram else 'false'}
+        if color:
+            from app.parser.unified_parser import CaseColorDetector
+            env['COLOR_MODEL_PRETRAINED'] = os.path.join(tmp, 'random.pt')
+            random_checkpoint(env['COLOR_MODEL_PRETRAINED'], CaseColorDetector.MODEL_NAME)
+            # PRETRAINED читается при импорте: процессы пула получат путь из окружения
+            CaseColorDetector.PRETRAINED = env['COLOR_MODEL_PRETRAINED']
+        os.environ.update(env)
+
+        with StubServer(StubConfig(groups=groups, items=items)) as stub:
+            os.environ['VK_API_URL'] = stub.api_url
+            baseline: Optional[Dict] = None
+            for workers in [0] + worker_counts:
+                startup = 0.0
+                if workers:
+                    start = time.perf_counter()
+                    crawl(stub, workers, batch_size)  # прогрев: запуск процессов и загрузка модели
+                    startup = time.perf_counter() - start
+                stats = crawl(stub, workers, batch_size)
+                rows = stats.pop('rows')
+                if baseline is None:
+                    baseline = {'rows': rows, 'items_per_s': stats['items_per_s']}
+                elif rows != baseline['rows']:
+                    differ = sum(1 for a, b in zip(rows, baseline['rows']) if a != b)
+                    raise SystemExit(f"{workers} workers: {differ} builds differ from single-process mode")
+                stats['speedup'] = stats['items_per_s'] / baseline['items_per_s']
+                stats['warmup_s'] = startup
+                result['modes'][str(workers)] = stats
+                cpu_pool.shutdown()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default=','.join(str(n) for n in (1, 2, 4)),
+                        help='числа процессов пула через запятую')
+    parser.add_argument('--groups', type=int, default=4)
+    parser.add_argument('--items', type=int, default=2000, help='товаров в группе')
+    parser.add_argument('--batch-size', type=int, default=100, help='PARSE_CPU_BATCH_SIZE')
+    parser.add_argument('--color', action='store_true', help='определять цвет по фото')
+    parser.add_argument('--no-histogram', action='store_true', help='все фото - через модель')
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    result = run([int(n) for n in args.workers.split(',')], args.groups, args.items,
+                 args.batch_size, args.color, not args.no_histogram)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['cpu_count']} cpu, results identical to single-process mode")
+    for workers, stats in result['modes'].items():
+        name = 'single' if workers == '0' else f"{workers} workers"
+        print(f"{name:10s} {stats['items']} items  {stats['items_per_s']:8.0f} items/s  "
+              f"x{stats['speedup']:.2f}  (pool warm-up {stats['warmup_s']:.1f} s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+bench_extractor.py - Микробенчмарк извлечения компонентов
+
+Сравнивает старый путь (extract_cpu/extract_gpu/extract_ram +
+extract_case_color_from_text) с PCComponentExtractor.extract_all:
+проверяет совпадение результатов на корпусе и печатает items/s.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_extractor --items 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Dict, List
+
+from app.parser.unified_parser import PCComponentExtractor
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'extractor_corpus.json')
+
+CPUS = ['Intel Core i5-12400F', 'i7-13700KF', 'Core i9 14900K', 'AMD Ryzen 5 7600', 'Ryzen 7 5700X3D',
+        'R5 5600', 'Intel Core Ultra 7 265K', 'i3-12100', 'Xeon E5-2680', '']
+GPUS = ['NVIDIA GeForce RTX 4060 8GB', 'RTX 4070 SUPER', 'GTX 1660 Ti', 'Radeon RX 7800 XT', 'RX 6600',
+        'AMD Radeon 7900 XTX', 'Intel Arc A750', 'RTX 5080 16GB', 'интегрированная', '']
+RAMS = ['16GB', '2x8GB', '2 х 16 GB', 'DDR5 32GB', '64 GB DDR5', '24GB', '3x16GB', '']
+CASES = ['белый', 'черный', 'Black', 'White ARGB', 'mATX', 'чёрном исполнении', '']
+SEPARATORS = [': ', ' - ', ' – ', ' — ', ':\t', ' ']
+FILLER = ('Игровой компьютер для современных игр в Full HD и 2K. Гарантия 2 года, доставка по России. '
+          'Сборка и тестирование перед отправкой, Windows 11 установлена. ')
+
+def generate_corpus(count: int, seed: int = 42) -> List[Dict[str, str]]:
+    """Синтетический корпус: с подписями характеристик и без них"""
+    rng = random.Random(seed)
+    items = []
+    for _ in range(count):
+        cpu, gpu, ram, case = rng.choice(CPUS), rng.choice(GPUS), rng.choice(RAMS), rng.choice(CASES)
+        sep = rng.choice(SEPARATORS)
+        if rng.random() < 0.6:
+            lines = [f"Процессор{sep}{cpu}", f"Видеокарта{sep}{gpu}",
+                     f"{rng.choice(['Оперативная память', 'Память', 'ОЗУ', 'RAM'])}{sep}{ram}",
+                     f"SSD {rng.choice(['512GB', '1TB', '2000GB'])}", f"Корпус{sep}{case}"]
+            rng.shuffle(lines)
+            description = FILLER * rng.randint(0, 2) + '\n'.join(lines)
+        else:
+            description = f"{cpu} / {gpu} / {ram} / {case}. " + FILLER * rng.randint(1, 4)
+        title = rng.choice(['Игровой ПК', 'Компьютер', f'ПК {cpu}', f'Сборка {gpu} {ram}'])
+        items.append({'title': title, 'description': description})
+    return items
+
+def legacy_extract(extractor: PCComponentExtractor, item: Dict[str, str]) -> tuple:
+    full_text = f"{item['title']}\n{item['description']}"
+    return (extractor.extract_cpu(full_text), extractor.extract_gpu(full_text),
+            extractor.extract_ram(full_text), extractor.extract_case_color_from_text(item['description']))
+
+def engine_extract(extractor: PCComponentExtractor, item: Dict[str, str]) -> tuple:
+    result = extractor.extract_all(item['title'], item['description'])
+    return (result.cpu, result.gpu, result.ram, result.case_color)
+
+def measure(func, extractor, corpus, rounds: int) -> float:
+    """Лучший результат из нескольких прогонов, items/s"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in corpus:
+            func(extractor, item)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+def run(items: int = 20000, rounds: int = 3) -> Dict[str, float]:
+    extractor = PCComponentExtractor()
+    with open(FIXTURE, encoding='utf-8') as f:
+        corpus = json.load(f)
+    corpus += generate_corpus(items)
+
+    mismatches = [item for item in corpus
+                  if legacy_extract(extractor, item) != engine_extract(extractor, item)]
+    if mismatches:
+        raise SystemExit(f"extract_all differs from legacy extractors on {len(mismatches)} items, "
+                         f"first: {mismatches[0]!r}")
+
+    legacy = measure(legacy_extract, extractor, corpus, rounds)
+    engine = measure(engine_extract, extractor, corpus, rounds)
+    return {'items': len(corpus), 'legacy_items_per_s': legacy,
+            'engine_items_per_s': engine, 'speedup': engine / legacy}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=20000, help='размер синтетического корпуса')
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    result = run(args.items, args.rounds)
+    print(f"corpus: {result['items']} items, results identical")
+    print(f"legacy:      {result['legacy_items_per_s']:10.0f} items/s")
+    print(f"extract_all: {result['engine_items_per_s']:10.0f} items/s  (x{result['speedup']:.2f})")
+
+if __name__ == '__main__':
+    main()
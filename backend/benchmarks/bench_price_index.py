@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+bench_price_index.py - Окно цен: запрос к БД против PriceIndex
+
+Для каждого размера базы заполняет SQLite сборками (id и цена), затем
+измеряет среднюю и p99 задержку выборки окна ±PRICE_COMPARISON_RANGE
+запросом из compare_by_price и через PriceIndex.window, а также время
+построения индекса.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_price_index --sizes 1000,100000,1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, PCBuildDB
+from app.indexes import PriceIndex
+
+PRICE_RANGE = 50000
+LIMIT = 20
+
+def seed(session_factory, size: int, seed: int = 42):
+    """Сборки с ценами 40k-400k, каждая десятая - наша"""
+    rng = random.Random(seed)
+    with session_factory() as db:
+        for start in range(0, size, 50000):
+            rows = [{
+                'id': f"-{i % 500}_{i}",
+                'company': 'VA-PC' if i % 10 == 0 else 'PC Store',
+                'price': float(rng.randint(40000, 400000)),
+                'is_our_build': i % 10 == 0,
+            } for i in range(start, min(size, start + 50000))]
+            db.execute(insert(PCBuildDB.__table__), rows)
+            db.commit()
+
+def db_window(db, target_id: str, price: float) -> List[str]:
+    """Запрос compare_by_price"""
+    rows = db.query(PCBuildDB.id).filter(
+        PCBuildDB.price >= price - PRICE_RANGE,
+        PCBuildDB.price <= price + PRICE_RANGE,
+        PCBuildDB.id != target_id,
+        PCBuildDB.is_our_build == False
+    ).order_by(PCBuildDB.price).limit(LIMIT).all()
+    return [row[0] for row in rows]
+
+def timings(func, targets) -> Dict[str, float]:
+    samples = []
+    for target_id, price in targets:
+        start = time.perf_counter()
+        func(target_id, price)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {'mean_us': sum(samples) / len(samples) * 1e6,
+            'p99_us': samples[min(len(samples) - 1, int(0.99 * len(samples)))] * 1e6}
+
+def run(size: int, queries: int, workdir: str) -> Dict[str, Dict[str, float]]:
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, f'bench_{size}.db')}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    seed(session_factory, size)
+
+    with session_factory() as db:
+        start = time.perf_counter()
+        index = PriceIndex.from_db(db)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        targets = db.query(PCBuildDB.id, PCBuildDB.price).filter(
+            PCBuildDB.is_our_build == True
+        ).limit(queries).all()
+
+        db_stats = timings(lambda target_id, price: db_window(db, target_id, price), targets)
+        index_stats = timings(lambda target_id, price: index.window(
+            price - PRICE_RANGE, price + PRICE_RANGE, exclude=target_id, limit=LIMIT), targets)
+
+    engine.dispose()
+    return {'db': db_stats, 'index': index_stats, 'index_build_ms': build_ms}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,100000,1000000')
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in [int(s) for s in args.sizes.split(',')]:
+            result = run(size, args.queries, tmp)
+            print(f"{size:>8d} builds  db: mean {result['db']['mean_us']:8.1f} us  p99 {result['db']['p99_us']:8.1f} us   "
+                  f"index: mean {result['index']['mean_us']:6.1f} us  p99 {result['index']['p99_us']:6.1f} us   "
+                  f"(build {result['index_build_ms']:.0f} ms)")
+
+if __name__ == '__main__':
+    main()
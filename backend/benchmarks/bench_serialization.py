@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+bench_serialization.py - Сериализация списка сборок: Pydantic против кортежей + orjson
+
+Заполняет SQLite сборками и сравнивает старый путь ответа списков
+(ORM-объекты -> BuildResponse на строку -> TypeAdapter.dump_json) с
+app.serialization (кортежи -> format_rows -> dumps) на полном ответе
+и на fields= без description. Печатает строк в секунду и размер ответа
+без сжатия и с gzip.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_serialization --rows 5000 --description-size 2000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, PCBuildDB, upsert_builds
+from app.serialization import build_columns, dumps, format_rows, parse_fields
+from benchmarks.bench_upsert import generate_builds
+
+GZIP_LEVEL = 6
+
+class LegacyBuildResponse(BaseModel):
+    """BuildResponse до app.serialization"""
+    id: str
+    company: str
+    title: str
+    description: str
+    price: float
+    price_formatted: str
+    cpu: str
+    gpu: str
+    ram: str
+    case_color: str
+    photo_url: str
+    vk_url: str
+    is_our_build: bool
+    price_comparison: Optional[str] = None
+
+LEGACY_LIST = TypeAdapter(List[LegacyBuildResponse])
+
+def legacy_body(db) -> bytes:
+    """Ответ списка до app.serialization"""
+    builds = db.query(PCBuildDB).order_by(PCBuildDB.price).all()
+    return LEGACY_LIST.dump_json([LegacyBuildResponse(
+        id=build.id, company=build.company, title=build.title, description=build.description,
+        price=build.price, price_formatted=f"{int(build.price):,} руб.".replace(',', ' '),
+        cpu=build.cpu or "Не указан", gpu=build.gpu or "Не указана",
+        ram=f"{build.ram} GB" if build.ram else "Не указана",
+        case_color=build.case_color or "Не определен", photo_url=build.photo_url,
+        vk_url=build.vk_url, is_our_build=build.is_our_build
+    ) for build in builds])
+
+def fast_body(db, fields: Optional[str] = None) -> bytes:
+    columns = parse_fields(fields)
+    return dumps(format_rows(db.query(*build_columns(columns)).order_by(PCBuildDB.price), columns))
+
+def measure(db, rows: int, body: Callable[[], bytes], repeat: int) -> Dict[str, float]:
+    data = body()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body()
+    seconds = (time.perf_counter() - start) / repeat
+    return {'rows_per_s': rows / seconds, 'ms': seconds * 1000,
+            'bytes': len(data), 'gzip_bytes': len(gzip.compress(data, GZIP_LEVEL))}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--description-size', type=int, default=2000, help='длина описания, символов')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    builds = generate_builds(args.rows)
+    for build in builds:
+        build.description = (build.description * (args.description_size // len(build.description) + 1))[:args.description_size]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            upsert_builds(db, builds)
+
+            if json.loads(legacy_body(db)) != json.loads(fast_body(db)):
+                raise SystemExit("fast path output differs from the legacy path")
+
+            result = {
+                'legacy': measure(db, args.rows, lambda: legacy_body(db), args.repeat),
+                'fast': measure(db, args.rows, lambda: fast_body(db), args.repeat),
+                'fast_no_description': measure(
+                    db, args.rows, lambda: fast_body(db, 'id,title,price,price_formatted,cpu,gpu,ram,'
+                                                          'case_color,photo_url,vk_url,is_our_build'),
+                    args.repeat),
+            }
+        engine.dispose()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for name, stats in result.items():
+        print(f"{name:20s} {stats['rows_per_s']:9.0f} rows/s ({stats['ms']:6.1f} ms)  "
+              f"{stats['bytes'] / 1024:8.1f} KiB  gzip {stats['gzip_bytes'] / 1024:7.1f} KiB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+bench_similar_specs.py - Поиск похожих сборок по матрице признаков
+
+Строит SpecIndex из синтетических сборок (модели из таблицы компонентов,
+часть неизвестных) и измеряет задержку nearest с учетом цены и без.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_similar_specs --builds 100000
+"""
+
+import argparse
+import random
+import time
+from typing import Dict
+
+from app.components import get_component_table
+from app.indexes import SpecIndex
+
+RAMS = ['8', '16', '16', '32', '32', '64', '']
+
+def generate_rows(count: int, seed: int = 42):
+    table = get_component_table()
+    cpus = list(table.cpu) + ['XEON E5-2680', '']
+    gpus = list(table.gpu) + ['']
+    rng = random.Random(seed)
+    return [(f"-{i % 500}_{i}", rng.choice(cpus), rng.choice(gpus), rng.choice(RAMS),
+             float(rng.randint(40000, 400000))) for i in range(count)]
+
+def run(builds: int, queries: int) -> Dict[str, float]:
+    rows = generate_rows(builds)
+    start = time.perf_counter()
+    index = SpecIndex.from_rows(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(1)
+    targets = [rows[rng.randrange(len(rows))] for _ in range(queries)]
+    result = {'builds': builds, 'index_build_ms': build_ms}
+
+    for name, price_weight in (('specs', 0.0), ('specs+price', 0.5)):
+        samples = []
+        for build_id, cpu, gpu, ram, price in targets:
+            features = SpecIndex.build_features(cpu, gpu, ram)
+            start = time.perf_counter()
+            index.nearest(features, price, limit=20, price_weight=price_weight, exclude=build_id)
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        result[f'{name}_mean_ms'] = sum(samples) / len(samples) * 1000
+        result[f'{name}_p99_ms'] = samples[min(len(samples) - 1, int(0.99 * len(samples)))] * 1000
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--builds', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    result = run(args.builds, args.queries)
+    print(f"{result['builds']} builds, index built in {result['index_build_ms']:.0f} ms")
+    for name in ('specs', 'specs+price'):
+        print(f"{name:12s} mean {result[f'{name}_mean_ms']:6.2f} ms  p99 {result[f'{name}_p99_ms']:6.2f} ms")
+
+if __name__ == '__main__':
+    main()
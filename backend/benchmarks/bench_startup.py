@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+bench_startup.py - Холодный старт и память процесса с ML и без
+
+Каждый сценарий выполняется в отдельном процессе:
+  api      - импорт app.main (старт API)
+  parser   - импорт UnifiedVKParser (старт воркера парсинга)
+  ml       - USE_ML_COLOR_DETECTION=true: импорт парсера и load_model()
+Печатает время и RSS после старта; для ml - еще время повторной
+load_model() (модель процесса уже загружена).
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_startup
+    COLOR_MODEL_PRETRAINED= python -m benchmarks.bench_startup   # без скачивания весов
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict
+
+SCENARIOS = {
+    'api': "import app.main",
+    'parser': "from app.parser.unified_parser import UnifiedVKParser",
+    'ml': "from app.parser.unified_parser import CaseColorDetector\n"
+          "CaseColorDetector().load_model()",
+}
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+{code}
+cold = time.perf_counter() - start
+result = {{'cold_s': cold, 'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+           'torch_loaded': 'torch' in sys.modules}}
+if {warm}:
+    from app.parser.unified_parser import CaseColorDetector
+    detector = CaseColorDetector()
+    start = time.perf_counter()
+    detector.load_model()
+    result['warm_load_s'] = time.perf_counter() - start
+    result['model_loaded'] = detector.model is not None
+print(json.dumps(result))
+"""
+
+def run(name: str, tmp: str) -> Dict:
+    env = {**os.environ, 'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+           'COLOR_CACHE_PATH': '', 'USE_ML_COLOR_DETECTION': 'true' if name == 'ml' else 'false'}
+    probe = PROBE.format(code=SCENARIOS[name], warm=name == 'ml')
+    output = subprocess.run([sys.executable, '-c', probe], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='запусков на сценарий (берется лучший)')
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in SCENARIOS:
+            runs = [run(name, tmp) for _ in range(args.repeat)]
+            result[name] = min(runs, key=lambda r: r['cold_s'])
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for name, stats in result.items():
+        line = (f"{name:7s} cold {stats['cold_s']:6.2f} s  rss {stats['rss_mb']:7.1f} MB  "
+                f"torch {'yes' if stats['torch_loaded'] else 'no'}")
+        if 'warm_load_s' in stats:
+            line += f"  warm load_model {stats['warm_load_s'] * 1000:.2f} ms"
+        print(line)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+bench_suite.py - Сквозной набор бенчмарков на заглушке VK API
+
+Без доступа к VK: заглушка (benchmarks.vk_stub) поднимается в фоновом
+потоке, и на нескольких размерах каталога измеряются:
+    crawl   - обход групп UnifiedVKParser.stream_groups (market и wall), items/s и вызовы API
+    extract - извлечение компонентов, items/s
+    color   - detect_colors по фото заглушки, images/s и точность (--color-images 0 - пропустить)
+    upsert  - запись сборок в SQLite, rows/s
+    api     - p50/p99 чтения и сравнений (uvicorn, кэш ответов выключен)
+
+Результат сохраняется в JSON (--output); с --baseline печатается
+отношение к прошлому прогону (>1 - быстрее, для задержек - меньше).
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_suite --sizes 1000,10000 --output bench.json
+    python -m benchmarks.bench_suite --sizes 1000,10000 --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import aiohttp
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks import bench_extractor
+from benchmarks.bench_api_latency import free_port, load, percentiles, seed_database, start_server, \
+    stop_server, wait_ready
+from benchmarks.bench_upsert import bulk_save, generate_builds, measure as measure_upsert
+from benchmarks.vk_stub import StubConfig, StubServer
+
+SECTIONS = ('crawl', 'extract', 'color', 'upsert', 'api')
+
+# Чем больше - тем лучше; остальные метрики - задержки
+THROUGHPUT_SUFFIXES = ('_per_s',)
+
+def meta() -> Dict[str, object]:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                  text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'git_revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+def crawl(size: int, groups: int, chunk_size: int) -> Dict[str, Dict[str, float]]:
+    """Обход size товаров (поровну по groups группам) без определения цвета"""
+    config = StubConfig(groups=groups, items=max(1, size // groups))
+    result = {}
+    with StubServer(config) as stub:
+        # Настройки читаются парсером при создании
+        os.environ.update({'VK_API_URL': stub.api_url, 'VK_REQUESTS_PER_SECOND': '1000',
+                           'USE_ML_COLOR_DETECTION': 'false'})
+        from app.parser.unified_parser import UnifiedVKParser
+
+        for source in ('market', 'wall'):
+            parser = UnifiedVKParser('bench', min_price=40000)
+            stub.reset()
+
+            async def run() -> int:
+                builds = 0
+                async for chunk in parser.stream_groups(stub.stub.group_ids, source, chunk_size=chunk_size):
+                    builds += len(chunk.builds)
+                return builds
+
+            start = time.perf_counter()
+            builds = asyncio.run(run())
+            seconds = time.perf_counter() - start
+            items = sum(progress.items for progress in parser.progress.values())
+            stats = stub.stats()
+            result[source] = {
+                'items': items, 'builds': builds, 'seconds': seconds,
+                'items_per_s': items / seconds,
+                'http_requests': stats.get('requests', 0),
+                'api_calls': sum(count for name, count in stats.items() if name.startswith('method:')),
+            }
+    return result
+
+def extract(size: int) -> Dict[str, float]:
+    result = bench_extractor.run(size, rounds=1)
+    return {'items': result['items'], 'items_per_s': result['engine_items_per_s']}
+
+def color(images: int, fast: bool) -> Dict[str, float]:
+    """detect_colors по URL фото заглушки: загрузка, гистограмма и модель"""
+    from benchmarks.bench_color_inference import detector
+
+    with StubServer(StubConfig(groups=1, items=images)) as stub:
+        group_id = stub.stub.group_ids[0]
+        names = [f"{group_id}_{i}.jpg" for i in range(1, images + 1)]
+        urls = [f"{stub.url}/photos/{name}" for name in names]
+        labels = [stub.stub.photo_color(name) for name in names]
+        model = detector(fast)
+
+        async def run() -> List[str]:
+            async with model.fetcher:
+                return await model.detect_colors(urls)
+
+        start = time.perf_counter()
+        colors = asyncio.run(run())
+        seconds = time.perf_counter() - start
+    return {
+        'images': images, 'seconds': seconds, 'images_per_s': images / seconds,
+        'agreement': sum(c == label for c, label in zip(colors, labels)) / images,
+        'tiers': dict(model.counters),
+    }
+
+def upsert(size: int, chunk_size: int, tmp: str) -> Dict[str, float]:
+    from app.database import Base
+
+    engine = create_engine(f"sqlite:///{os.path.join(tmp, f'upsert_{size}.db')}")
+    Base.metadata.create_all(bind=engine)
+    try:
+        result = measure_upsert(sessionmaker(bind=engine), bulk_save, generate_builds(size), chunk_size)
+    finally:
+        engine.dispose()
+    return {'insert_rows_per_s': result['insert'], 'update_rows_per_s': result['update']}
+
+async def api_latency(base: str, duration: float, concurrency: int) -> Dict[str, Dict[str, float]]:
+    async with aiohttp.ClientSession() as session:
+        await wait_ready(session, base)
+        async with session.get(f"{base}/api/builds/our?fields=id") as resp:
+            build_id = quote((await resp.json())[0]['id'])
+
+        urls = {
+            'builds_our': f"{base}/api/builds/our",
+            'stats': f"{base}/api/stats",
+            'compare_price': f"{base}/api/compare/price?build_id={build_id}",
+            'compare_specs': f"{base}/api/compare/specs?build_id={build_id}",
+            'compare_similar': f"{base}/api/compare/specs?build_id={build_id}&comparison_type=similar",
+            'compare_batch': f"{base}/api/compare/batch?comparison_type=price",
+        }
+        result = {}
+        for name, url in urls.items():
+            await load(session, url, min(1.0, duration), concurrency)  # прогрев
+            stats = percentiles(await load(session, url, duration, concurrency))
+            result[name] = {'requests': stats['requests'], 'p50_ms': stats['p50_ms'], 'p99_ms': stats['p99_ms']}
+        return result
+
+def api(size: int, duration: float, concurrency: int, tmp: str) -> Dict[str, Dict[str, float]]:
+    database_url = f"sqlite:///{os.path.join(tmp, f'api_{size}.db')}"
+    seed_database(database_url, size)
+    port = free_port()
+    server = start_server(port, {'DATABASE_URL': database_url, 'CACHE_ENABLED': 'false',
+                                 'COLOR_CACHE_PATH': os.path.join(tmp, 'color_cache.db')})
+    try:
+        return asyncio.run(api_latency(f"http://127.0.0.1:{port}", duration, concurrency))
+    finally:
+        stop_server(server)
+
+def run(sizes: List[int], sections: List[str], args) -> Dict:
+    result: Dict = {'meta': meta(), 'sizes': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault('COLOR_CACHE_PATH', os.path.join(tmp, 'color_cache.db'))
+        if 'color' in sections and args.color_images:
+            # Модель одна на все размеры: фото заглушки не зависят от размера каталога
+            result['color'] = color(args.color_images, args.fast)
+        for size in sizes:
+            entry = {}
+            if 'crawl' in sections:
+                entry['crawl'] = crawl(size, args.groups, args.chunk_size)
+            if 'extract' in sections:
+                entry['extract'] = extract(size)
+            if 'upsert' in sections:
+                entry['upsert'] = upsert(size, args.chunk_size, tmp)
+            if 'api' in sections:
+                entry['api'] = api(size, args.duration, args.concurrency, tmp)
+            result['sizes'][str(size)] = entry
+    return result
+
+def flatten(data: Dict, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(result: Dict, baseline: Dict) -> Dict[str, float]:
+    """Отношение к baseline: пропускная способность - new/old, задержки - old/new"""
+    current = flatten({k: v for k, v in result.items() if k != 'meta'})
+    previous = flatten({k: v for k, v in baseline.items() if k != 'meta'})
+    ratios = {}
+    for name, value in current.items():
+        old = previous.get(name)
+        if not old or not value:
+            continue
+        if name.endswith(THROUGHPUT_SUFFIXES):
+            ratios[name] = value / old
+        elif name.endswith('_ms'):
+            ratios[name] = old / value
+    return ratios
+
+def print_report(result: Dict, ratios: Optional[Dict[str, float]]):
+    info = result['meta']
+    print(f"rev {info['git_revision']}  python {info['python']}  {info['cpu_count']} cpu")
+
+    def mark(name: str) -> str:
+        return f"  (x{ratios[name]:.2f})" if ratios and name in ratios else ''
+
+    if 'color' in result:
+        stats = result['color']
+        print(f"color    {stats['images']} images  {stats['images_per_s']:8.1f} images/s"
+              f"{mark('color.images_per_s')}  agreement {stats['agreement']:.1%}  {stats['tiers']}")
+    for size, entry in result['sizes'].items():
+        print(f"== {size} items")
+        prefix = f"sizes.{size}."
+        for source, stats in entry.get('crawl', {}).items():
+            print(f"crawl    {source:7s} {stats['items_per_s']:10.0f} items/s{mark(prefix + f'crawl.{source}.items_per_s')}"
+                  f"  {stats['api_calls']} API calls in {stats['http_requests']} requests, {stats['builds']} builds")
+        if 'extract' in entry:
+            print(f"extract          {entry['extract']['items_per_s']:10.0f} items/s{mark(prefix + 'extract.items_per_s')}")
+        if 'upsert' in entry:
+            stats = entry['upsert']
+            print(f"upsert   insert  {stats['insert_rows_per_s']:10.0f} rows/s{mark(prefix + 'upsert.insert_rows_per_s')}"
+                  f"  update {stats['update_rows_per_s']:.0f} rows/s{mark(prefix + 'upsert.update_rows_per_s')}")
+        for name, stats in entry.get('api', {}).items():
+            print(f"api      {name:16s} p50 {stats['p50_ms']:7.1f} ms{mark(prefix + f'api.{name}.p50_ms')}"
+                  f"  p99 {stats['p99_ms']:7.1f} ms{mark(prefix + f'api.{name}.p99_ms')}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000', help='размеры каталога (товаров) через запятую')
+    parser.add_argument('--sections', default=','.join(SECTIONS), help='разделы через запятую')
+    parser.add_argument('--groups', type=int, default=4, help='групп в заглушке')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--color-images', type=int, default=64, help='фото для раздела color (0 - пропустить)')
+    parser.add_argument('--fast', action='store_true', help='быстрый режим модели цвета (COLOR_FAST_INFERENCE)')
+    parser.add_argument('--duration', type=float, default=5, help='секунд нагрузки на каждый адрес API')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--output', help='сохранить результат в JSON-файл')
+    parser.add_argument('--baseline', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    sections = [section for section in args.sections.split(',') if section]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        raise SystemExit(f"unknown sections: {', '.join(sorted(unknown))}")
+
+    result = run(sizes, sections, args)
+    ratios = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            ratios = compare(result, json.load(f))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+    if args.json:
+        print(json.dumps({**result, 'ratios': ratios} if ratios else result, indent=2))
+        return
+    print_report(result, ratios)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+bench_vk_retry.py - Повторы и автомат отключения vk_call под внедренными ошибками
+
+Обходит группы заглушки (benchmarks.vk_stub) в нескольких сценариях:
+лимит частоты (ошибка 6), HTTP 500, постоянная ошибка доступа (15),
+мертвое зеркало первым в fallback_urls и зависающие ответы. Для каждого
+сценария сравнивает поведение без повторов (как было: ошибка - следующий
+адрес, затем группа потеряна) с политикой по умолчанию и печатает
+обойденные группы, товары, число HTTP-запросов и время.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_vk_retry --groups 8 --items 600
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict
+
+from benchmarks.bench_api_latency import free_port
+from benchmarks.vk_stub import StubConfig, StubServer
+
+SCENARIOS = {
+    'clean': {},
+    'rate_limit': {'error_rate': 0.2, 'error_codes': [6]},
+    'http_500': {'http_error_rate': 0.2},
+    'permanent': {'error_rate': 0.1, 'error_codes': [15]},
+    'dead_mirror': {},
+    'slow': {'slow_rate': 0.05, 'slow_ms': 5000},
+}
+
+def crawl(stub: StubServer, retry, breaker_threshold: int, dead_mirror: bool) -> Dict[str, float]:
+    from app.parser.unified_parser import RateLimiter, UnifiedVKParser
+    from app.parser.vk_retry import CircuitBreaker
+
+    parser = UnifiedVKParser('bench', min_price=40000)
+    parser.vk_parser.rate_limiter = RateLimiter(float(os.environ['VK_REQUESTS_PER_SECOND']))
+    parser.vk_parser.retry = retry
+    if dead_mirror:
+        # Первым - адрес, где никто не слушает: каждый запрос к нему - обрыв соединения
+        parser.vk_parser.fallback_urls = [f"http://127.0.0.1:{free_port()}/method/", stub.api_url]
+    parser.vk_parser.breakers = {url: CircuitBreaker(threshold=breaker_threshold, cooldown=30)
+                                 for url in parser.vk_parser.fallback_urls}
+
+    async def run():
+        async for _ in parser.stream_groups(stub.stub.group_ids, 'market'):
+            pass
+
+    stub.reset()
+    start = time.perf_counter()
+    asyncio.run(run())
+    seconds = time.perf_counter() - start
+    stats = stub.stats()
+    dead = parser.vk_parser.fallback_urls[0] if dead_mirror else None
+    return {
+        'groups_done': sum(1 for p in parser.progress.values() if p.status == 'done'),
+        'groups': len(parser.progress),
+        'items': sum(p.items for p in parser.progress.values()),
+        'requests': stats.get('requests', 0),
+        # Запросы к мертвому зеркалу (все они - сбои)
+        'dead_requests': parser.vk_parser.breakers[dead].failures if dead else 0,
+        'seconds': seconds,
+    }
+
+def run(groups: int, items: int, rate: float, seed: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    os.environ.update({'VK_REQUESTS_PER_SECOND': str(rate), 'USE_ML_COLOR_DETECTION': 'false',
+                       'VK_USE_EXECUTE': 'false'})
+    from app.parser.vk_retry import RetryPolicy
+
+    policies = {
+        # Без повторов и автомата: как vk_call до политики (ошибка - следующий адрес, затем исключение)
+        'no_retry': (lambda: RetryPolicy(max_retries=0, timeout=2, rate_limit_codes={-1},
+                                         server_error_codes={-1}), 10 ** 9),
+        'retry': (lambda: RetryPolicy(backoff_base=0.05, backoff_max=1, timeout=2), 5),
+    }
+    result = {}
+    for name, overrides in SCENARIOS.items():
+        result[name] = {}
+        for policy, (factory, breaker_threshold) in policies.items():
+            config = StubConfig(groups=groups, items=items, seed=seed, **overrides)
+            with StubServer(config) as stub:
+                os.environ['VK_API_URL'] = stub.api_url
+                result[name][policy] = crawl(stub, factory(), breaker_threshold, name == 'dead_mirror')
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', type=int, default=8)
+    parser.add_argument('--items', type=int, default=600, help='товаров в группе')
+    parser.add_argument('--rate', type=float, default=200, help='VK_REQUESTS_PER_SECOND')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    result = run(args.groups, args.items, args.rate, args.seed)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for scenario, policies in result.items():
+        for policy, stats in policies.items():
+            print(f"{scenario:12s} {policy:9s} groups {stats['groups_done']}/{stats['groups']}  "
+                  f"items {stats['items']:6d}  requests {stats['requests']:5d} (+{stats['dead_requests']} dead)  "
+                  f"{stats['seconds']:6.2f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+vk_stub.py - Локальная заглушка VK API для бенчмарков
+
+aiohttp-сервер с методами market.get, wall.get, groups.getById и execute
+и генератором фото товаров. Каталог групп детерминирован (seed), размер,
+задержка ответов и внедрение ошибок настраиваются. Парсер направляется
+на заглушку переменной VK_API_URL=http://127.0.0.1:<port>/method/
+
+Служебные адреса:
+    GET  /stub/stats   - число запросов по методам и внедренных ошибок
+    POST /stub/reset   - обнулить счетчики
+    POST /stub/add?group_id=1&count=5 - добавить в группу новые товары
+
+Запуск отдельно (из каталога backend):
+    python -m benchmarks.vk_stub --port 8081 --groups 4 --items 1000 --latency-ms 20 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from PIL import Image, ImageDraw
+
+from benchmarks.bench_extractor import generate_corpus
+
+# Дата самого старого товара (unix time); новые товары идут с шагом в минуту
+BASE_DATE = 1700000000
+
+@dataclass
+class StubConfig:
+    """Параметры заглушки"""
+    groups: int = 4
+    # Товаров в каждой группе
+    items: int = 1000
+    # Первая группа - наша (VA-PC), остальные - конкуренты
+    first_group_id: int = 1001
+    latency_ms: float = 0.0
+    # Доля запросов с ошибкой VK ({"error": ...}) и коды этих ошибок
+    error_rate: float = 0.0
+    error_codes: List[int] = field(default_factory=lambda: [6])
+    # Доля запросов с ответом HTTP 500 и "зависших" ответов (slow_ms)
+    http_error_rate: float = 0.0
+    slow_rate: float = 0.0
+    slow_ms: float = 30000.0
+    image_size: int = 400
+    seed: int = 42
+
+ERROR_MESSAGES = {
+    6: 'Too many requests per second',
+    9: 'Flood control',
+    10: 'Internal server error',
+    15: 'Access denied',
+    29: 'Rate limit reached',
+    100: 'One of the parameters specified was missing or invalid',
+}
+
+class VKStub:
+    """Каталог групп и обработчики методов"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.stats: Counter = Counter()
+        self.catalogs: Dict[int, List[Dict]] = {}
+        self._images: Dict[str, bytes] = {}
+        self.base_url = ''
+
+    @property
+    def group_ids(self) -> List[int]:
+        return [self.config.first_group_id + i for i in range(self.config.groups)]
+
+    def group_name(self, group_id: int) -> str:
+        return 'VA-PC' if group_id == self.config.first_group_id else f'PC Shop {group_id}'
+
+    def catalog(self, group_id: int) -> List[Dict]:
+        """Товары группы от новых к старым"""
+        if group_id not in self.catalogs:
+            self.catalogs[group_id] = []
+            self.add_items(group_id, self.config.items)
+        return self.catalogs[group_id]
+
+    def add_items(self, group_id: int, count: int):
+        items = self.catalogs.setdefault(group_id, [])
+        rng = random.Random(f"{self.config.seed}:{group_id}:{len(items)}")
+        start = len(items) + 1
+        new = []
+        for offset, text in enumerate(generate_corpus(count, seed=rng.randint(0, 2 ** 31))):
+            item_id = start + offset
+            new.append({
+                'id': item_id,
+                'owner_id': -group_id,
+                'date': BASE_DATE + item_id * 60,
+                'title': text['title'],
+                'description': text['description'],
+                # Часть товаров дешевле MIN_PRICE - проверка фильтра
+                'price': {'amount': str(rng.randint(20000, 400000) * 100), 'currency': {'name': 'RUB'}},
+                'thumb_photo': f"{self.base_url}/photos/{group_id}_{item_id}.jpg",
+            })
+        self.catalogs[group_id] = list(reversed(new)) + items
+
+    # === Методы API ===
+
+    def market_get(self, params: Dict[str, Any]) -> Dict:
+        items = self.catalog(-int(params.get('owner_id', 0)))
+        offset, count = int(params.get('offset', 0)), min(int(params.get('count', 100)), 200)
+        return {'count': len(items), 'items': items[offset:offset + count]}
+
+    def wall_get(self, params: Dict[str, Any]) -> Dict:
+        group_id = -int(params.get('owner_id', 0))
+        items = self.catalog(group_id)
+        offset, count = int(params.get('offset', 0)), min(int(params.get('count', 20)), 100)
+        posts = [{
+            'id': item['id'], 'owner_id': -group_id, 'date': item['date'],
+            'attachments': [{'type': 'market', 'market': item}],
+        } for item in items[offset:offset + count]]
+        if offset == 0 and items:
+            # Закрепленный старый пост сверху, как на реальных стенах
+            oldest = items[-1]
+            posts.insert(0, {'id': oldest['id'], 'owner_id': -group_id, 'date': oldest['date'],
+                             'is_pinned': 1, 'attachments': [{'type': 'market', 'market': oldest}]})
+        return {'count': len(items), 'items': posts}
+
+    def groups_get_by_id(self, params: Dict[str, Any]) -> Dict:
+        ids = [int(g) for g in str(params.get('group_ids', '')).split(',') if g]
+        return {'groups': [{'id': g, 'name': self.group_name(g), 'screen_name': f'club{g}'} for g in ids],
+                'profiles': []}
+
+    def execute(self, params: Dict[str, Any]) -> List[Any]:
+        return [self.call(method, args) for method, args in parse_execute(params.get('code', ''))]
+
+    def call(self, method: str, params: Dict[str, Any]) -> Any:
+        self.stats[f'method:{method}'] += 1
+        handler = {
+            'market.get': self.market_get,
+            'wall.get': self.wall_get,
+            'groups.getById': self.groups_get_by_id,
+            'execute': self.execute,
+        }.get(method)
+        if handler is None:
+            raise KeyError(method)
+        return handler(params)
+
+    # === HTTP ===
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        params: Dict[str, Any] = dict(request.query)
+        if request.method == 'POST':
+            params.update(await request.post())
+        self.stats['requests'] += 1
+
+        if self.config.latency_ms:
+            await asyncio.sleep(self.config.latency_ms / 1000)
+        roll = self.rng.random()
+        if roll < self.config.slow_rate:
+            self.stats['injected:slow'] += 1
+            await asyncio.sleep(self.config.slow_ms / 1000)
+        roll = self.rng.random()
+        if roll < self.config.http_error_rate:
+            self.stats['injected:http_500'] += 1
+            return web.Response(status=500, text='Internal Server Error')
+        roll = self.rng.random()
+        if roll < self.config.error_rate:
+            code = self.rng.choice(self.config.error_codes)
+            self.stats[f'injected:error_{code}'] += 1
+            return web.json_response({'error': {
+                'error_code': code, 'error_msg': ERROR_MESSAGES.get(code, 'Unknown error'),
+                'request_params': [{'key': 'method', 'value': method}],
+            }})
+
+        try:
+            return web.json_response({'response': self.call(method, params)})
+        except KeyError:
+            return web.json_response({'error': {'error_code': 3, 'error_msg': 'Unknown method passed'}})
+
+    async def handle_photo(self, request: web.Request) -> web.Response:
+        name = request.match_info['name']
+        self.stats['photos'] += 1
+        if name not in self._images:
+            self._images[name] = self.render_photo(name)
+        return web.Response(body=self._images[name], content_type='image/jpeg')
+
+    def photo_color(self, name: str) -> str:
+        """Цвет корпуса на фото товара (метка для проверки точности)"""
+        return 'white' if random.Random(f"{self.config.seed}:{name}").random() < 0.5 else 'black'
+
+    def render_photo(self, name: str) -> bytes:
+        rng = random.Random(f"{self.config.seed}:{name}:render")
+        color = self.photo_color(name)
+        size = self.config.image_size
+        shade = rng.randint(215, 255) if color == 'white' else rng.randint(0, 40)
+        image = Image.new('RGB', (size, size), tuple(rng.randint(150, 255) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        left, top = size // 5, size // 10
+        draw.rectangle([left, top, size - left, size - top], fill=(shade, shade, shade))
+        # Стеклянная панель с подсветкой
+        glass = tuple(rng.randint(0, 255) for _ in range(3))
+        draw.rectangle([left + size // 10, top + size // 8, size // 2, size // 2 + size // 8], fill=glass)
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=85)
+        return buffer.getvalue()
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.stats.clear()
+        return web.json_response({'ok': True})
+
+    async def handle_add(self, request: web.Request) -> web.Response:
+        group_id = int(request.query['group_id'])
+        self.catalog(group_id)
+        self.add_items(group_id, int(request.query.get('count', 1)))
+        return web.json_response({'count': len(self.catalogs[group_id])})
+
+    def application(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route('*', '/method/{method}', self.handle_method)
+        app.router.add_get('/photos/{name}', self.handle_photo)
+        app.router.add_get('/stub/stats', self.handle_stats)
+        app.router.add_post('/stub/reset', self.handle_reset)
+        app.router.add_post('/stub/add', self.handle_add)
+        return app
+
+def parse_execute(code: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Вызовы API.<метод>({json}) из кода execute в порядке следования"""
+    decoder = json.JSONDecoder()
+    calls = []
+    position = code.find('API.')
+    while position >= 0:
+        bracket = code.index('(', position)
+        params, end = decoder.raw_decode(code, bracket + 1)
+        calls.append((code[position + 4:bracket], params))
+        position = code.find('API.', end)
+    return calls
+
+class StubServer:
+    """Заглушка в фоновом потоке со своим event loop (не делит CPU-время с клиентом в одном loop)"""
+
+    def __init__(self, config: Optional[StubConfig] = None, port: int = 0):
+        self.stub = VKStub(config or StubConfig())
+        self.port = port
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/method/"
+
+    def __enter__(self) -> 'StubServer':
+        started = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name='vk-stub', daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    async def _start(self):
+        self._runner = web.AppRunner(self.stub.application(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.stub.base_url = self.url
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.stub.stats)
+
+    def reset(self):
+        self._loop.call_soon_threadsafe(self.stub.stats.clear)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--groups', type=int, default=4)
+    parser.add_argument('--items', type=int, default=1000, help='товаров в группе')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--error-codes', default='6', help='коды ошибок VK через запятую')
+    parser.add_argument('--http-error-rate', type=float, default=0)
+    parser.add_argument('--slow-rate', type=float, default=0)
+    parser.add_argument('--slow-ms', type=float, default=30000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    config = StubConfig(groups=args.groups, items=args.items, latency_ms=args.latency_ms,
+                        error_rate=args.error_rate, error_codes=[int(c) for c in args.error_codes.split(',')],
+                        http_error_rate=args.http_error_rate, slow_rate=args.slow_rate,
+                        slow_ms=args.slow_ms, seed=args.seed)
+    stub = VKStub(config)
+    stub.base_url = f"http://127.0.0.1:{args.port}"
+    print(f"VK stub on {stub.base_url}/method/, groups {','.join(map(str, stub.group_ids))}")
+    web.run_app(stub.application(), host='127.0.0.1', port=args.port, print=None, access_log=None)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+conftest.py - Общие фикстуры тестов
+Временная SQLite и кэш ответов в памяти процесса (без Redis);
+окружение задается до импорта app: настройки читаются при импорте
+"""
+
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="pc_compare_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["REDIS_URL"] = ""
+os.environ["USE_ML_COLOR_DETECTION"] = "false"
+os.environ["COLOR_CACHE_PATH"] = ""
+os.environ["VK_TOKEN"] = "test"
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cache import get_cache
+from app.database import Base, SessionLocal, engine, ensure_schema
+from app.parser.unified_parser import PCBuild
+
+@pytest.fixture
+def db():
+    """Пустая база; новая версия данных делает недействительными кэш и снимки прошлых тестов"""
+    Base.metadata.drop_all(engine)
+    ensure_schema()
+    get_cache().bump_version()
+    with SessionLocal() as session:
+        yield session
+
+@pytest.fixture
+def client(db):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+def make_build(n: int, company: str = "HYPERPC", price: float = 100000, **fields) -> PCBuild:
+    """Сборка с id n и характеристиками по умолчанию"""
+    values = dict(
+        id=f"1_{n}", company=company, title=f"Build {n}", description="", price=price,
+        cpu="Intel Core i5-13400F", gpu="RTX 4060", ram="16GB", case_color="black",
+        photo_url="", vk_url=f"https://vk.com/market-1_{n}", parsed_at=datetime(2024, 1, 1),
+    )
+    values.update(fields)
+    return PCBuild(**values)
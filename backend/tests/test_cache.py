@@ -0,0 +1,92 @@
+"""Кэш ответов с инвалидацией по версии данных"""
+
+import pytest
+
+from app import main
+from app.cache import LocalCache, RedisCache, ResponseCache
+
+class FakeRedis:
+    """Команды Redis, которые использует RedisCache"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    def incr(self, key):
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+class CountingBackend:
+    """Обертка бэкенда: сколько раз прочитана версия"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.version_reads = 0
+
+    def get_version(self):
+        self.version_reads += 1
+        return self.backend.get_version()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+@pytest.fixture(params=["local", "redis"])
+def cache(request, monkeypatch):
+    backend = LocalCache() if request.param == "local" else RedisCache(FakeRedis())
+    cache = ResponseCache(CountingBackend(backend), ttl=60)
+    monkeypatch.setattr(main, "get_cache", lambda: cache)
+    return cache
+
+def test_bump_version_invalidates(cache):
+    cache.set("k", b"v1")
+    assert cache.get("k") == b"v1"
+    cache.bump_version()
+    assert cache.get("k") is None
+
+def test_etag_changes_with_version(cache):
+    etag = cache.etag("k")
+    assert etag == cache.etag("k")
+    cache.bump_version()
+    assert cache.etag("k") != etag
+
+def test_cached_response_reads_version_once(cache):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    main.cached_response("k", load)
+    assert cache.backend.version_reads == 1
+    assert main.cached_response("k", load).body == b'{"value":1}'
+    assert len(calls) == 1
+
+def test_response_built_before_bump_is_not_stored_as_fresh(cache):
+    def load():
+        # Парсинг записал новую пачку, пока ответ строился из старых данных
+        cache.bump_version()
+        return {"value": "old"}
+
+    main.cached_response("k", load)
+    assert cache.get("k") is None
+    assert main.cached_response("k", lambda: {"value": "new"}).body == b'{"value":"new"}'
+
+def test_unavailable_cache_is_a_miss(cache, monkeypatch):
+    def fail():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cache.backend.backend, "get_version", fail)
+    assert main.cached_response("k", lambda: {"value": 1}).body == b'{"value":1}'
+    assert main.cached_response("k", lambda: {"value": 2}).body == b'{"value":2}'
@@ -0,0 +1,92 @@
+"""Кэш цвета: ответы модели и гистограммы, повторные обходы без скачивания"""
+
+import asyncio
+import hashlib
+from typing import List, Optional
+
+import pytest
+from PIL import Image
+
+from app.parser.color_cache import ColorCache
+from app.parser.color_histogram import HistogramColorClassifier
+from app.parser.image_fetcher import FetchedImage
+from app.parser.unified_parser import CaseColorDetector
+
+MODEL = "ViT-B-32/test/00000000"
+
+class FakeFetcher:
+    """Фото по URL: white-*, black-* - однотонные, остальные - неоднозначные"""
+
+    def __init__(self):
+        self.downloads: List[str] = []
+
+    async def fetch_many(self, urls: List[str]) -> List[Optional[FetchedImage]]:
+        self.downloads.extend(urls)
+        return [self.fetch(url) for url in urls]
+
+    @staticmethod
+    def fetch(url: str) -> FetchedImage:
+        color = {"white": (245, 245, 245), "black": (10, 10, 10)}.get(url.split("-")[0], (200, 40, 40))
+        image = Image.new("RGB", (64, 64), color)
+        return FetchedImage(url=url, content_hash=hashlib.sha256(url.encode()).hexdigest(), image=image)
+
+@pytest.fixture
+def detector(tmp_path, monkeypatch):
+    detector = CaseColorDetector()
+    detector.enabled = True
+    # Вместо CLIP: неоднозначные фото модель считает черными
+    detector.model = object()
+    monkeypatch.setattr(detector, "_classify", lambda images: [("black", 0.9, None)] * len(images))
+    detector.fetcher = FakeFetcher()
+    detector.histogram = HistogramColorClassifier()
+    detector.cache = ColorCache(str(tmp_path / "colors.db"), MODEL, histogram_version=detector.histogram.version)
+    return detector
+
+URLS = [f"white-{n}" for n in range(10)] + [f"black-{n}" for n in range(5)] + [f"red-{n}" for n in range(5)]
+
+def test_second_pass_downloads_nothing(detector):
+    first = asyncio.run(detector.detect_colors(URLS))
+    assert len(detector.fetcher.downloads) == len(URLS)
+    assert detector.counters["histogram"] == 15
+    assert detector.counters["model"] == 5
+
+    second = asyncio.run(detector.detect_colors(URLS))
+    assert second == first
+    assert len(detector.fetcher.downloads) == len(URLS)
+    assert detector.counters["url_cache"] == len(URLS)
+
+def test_retuned_histogram_invalidates_only_its_answers(detector, tmp_path):
+    asyncio.run(detector.detect_colors(URLS))
+    path = str(tmp_path / "colors.db")
+    detector.cache.close()
+
+    retuned = HistogramColorClassifier(white_share=0.5)
+    assert retuned.version != detector.histogram.version
+    cache = ColorCache(path, MODEL, histogram_version=retuned.version)
+    assert cache.get_by_url("white-0") is None
+    assert cache.get_by_url("red-0").color == "black"
+
+def test_histogram_disabled_drops_its_answers(detector, tmp_path):
+    asyncio.run(detector.detect_colors(URLS))
+    detector.cache.close()
+    cache = ColorCache(str(tmp_path / "colors.db"), MODEL)
+    assert cache.get_by_url("white-0") is None
+    assert cache.get_by_url("red-0") is not None
+
+def test_model_answer_preferred(tmp_path):
+    cache = ColorCache(str(tmp_path / "colors.db"), MODEL, histogram_version="histogram/1")
+    cache.put_many([("h", "white", 0.7, None, "u")], version="histogram/1")
+    assert cache.get_by_url("u").color == "white"
+    cache.put("h", "black", 0.95)
+    assert cache.get_by_url("u").color == "black"
+
+def test_model_version_change_keeps_histogram_answers(tmp_path):
+    path = str(tmp_path / "colors.db")
+    cache = ColorCache(path, MODEL, histogram_version="histogram/1")
+    cache.put_many([("h1", "white", 0.7, None, "u1")], version="histogram/1")
+    cache.put("h2", "black", 0.9, url="u2")
+    cache.close()
+
+    cache = ColorCache(path, "ViT-B-32/other/00000000", histogram_version="histogram/1")
+    assert cache.get_by_url("u1").color == "white"
+    assert cache.get_by_url("u2") is None
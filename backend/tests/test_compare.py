@@ -0,0 +1,55 @@
+"""Сравнение сборок: пакетный эндпоинт дает те же результаты, что и одиночные"""
+
+import random
+
+import pytest
+
+from app.cache import get_cache
+from app.database import upsert_builds
+from conftest import make_build
+
+CPUS = ["Intel Core i5-13400F", "Intel Core i7-14700K", "AMD Ryzen 5 7600", "AMD Ryzen 7 7800X3D"]
+GPUS = ["RTX 4060", "RTX 4070 Super", "RTX 4080", "RX 7800 XT"]
+RAMS = ["16GB", "32GB", "64GB"]
+
+@pytest.fixture
+def builds(db):
+    rng = random.Random(14)
+    builds = [
+        make_build(n, company="VA-PC" if n % 3 == 0 else rng.choice(["HYPERPC", "Compday"]),
+                   price=rng.randrange(60000, 300000, 5000), cpu=rng.choice(CPUS),
+                   gpu=rng.choice(GPUS), ram=rng.choice(RAMS))
+        for n in range(60)
+    ]
+    upsert_builds(db, builds)
+    # Как после пачки парсинга: снимки индексов и кэш ответов устаревают
+    get_cache().bump_version()
+    return builds
+
+def single(client, comparison_type: str, build_id: str):
+    endpoint = "/api/compare/price" if comparison_type == "price" else "/api/compare/specs"
+    response = client.post(endpoint, json={"build_id": build_id, "comparison_type": comparison_type})
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.mark.parametrize("comparison_type", ["price", "specs", "similar"])
+def test_batch_matches_single_endpoints(client, builds, comparison_type):
+    ours = [build.id for build in builds if build.company == "VA-PC"]
+    response = client.post("/api/compare/batch", json={"comparison_type": comparison_type})
+    assert response.status_code == 200
+    batch = response.json()
+
+    assert sorted(batch) == sorted(ours)
+    assert any(batch.values())
+    for build_id in ours:
+        assert batch[build_id] == single(client, comparison_type, build_id)
+
+def test_batch_with_build_ids(client, builds):
+    ids = [builds[1].id, builds[2].id]
+    batch = client.get("/api/compare/batch", params={"comparison_type": "specs",
+                                                     "build_ids": ",".join(ids)}).json()
+    assert batch == {build_id: single(client, "specs", build_id) for build_id in ids}
+
+def test_batch_unknown_type(client, builds):
+    response = client.post("/api/compare/batch", json={"comparison_type": "colour"})
+    assert response.status_code == 400
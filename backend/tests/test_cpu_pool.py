@@ -0,0 +1,30 @@
+"""Пул процессов CPU-стадии парсинга"""
+
+import os
+import signal
+
+import pytest
+
+from app.parser import cpu_pool
+
+@pytest.fixture(autouse=True)
+def stop_pool():
+    yield
+    cpu_pool.shutdown()
+
+def test_pool_reused_between_crawls():
+    pool = cpu_pool.get_cpu_pool(1, 40000)
+    assert cpu_pool.get_cpu_pool(1, 40000) is pool
+    assert pool.submit(cpu_pool.process_items, [], 1, "HYPERPC").result(timeout=60) == []
+
+def test_dead_worker_replaces_pool():
+    pool = cpu_pool.get_cpu_pool(1, 40000)
+    pool.submit(cpu_pool.process_items, [], 1, "HYPERPC").result(timeout=60)
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+    with pytest.raises(Exception):
+        pool.submit(cpu_pool.process_items, [], 1, "HYPERPC").result(timeout=60)
+
+    replaced = cpu_pool.get_cpu_pool(1, 40000)
+    assert replaced is not pool
+    assert replaced.submit(cpu_pool.process_items, [], 1, "HYPERPC").result(timeout=60) == []
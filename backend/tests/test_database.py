@@ -0,0 +1,79 @@
+"""Массовая запись сборок и агрегаты для /api/stats"""
+
+import json
+from datetime import datetime
+
+from sqlalchemy import func
+
+from app.database import (BuildStatsDB, PCBuildDB, STATS_ID, rebuild_stats, refresh_company_stats,
+                          upsert_builds)
+from conftest import make_build
+
+def row_count(db) -> int:
+    return db.query(func.count(PCBuildDB.id)).scalar()
+
+def test_upsert_inserts_and_updates(db):
+    assert upsert_builds(db, [make_build(1), make_build(2)]) == 2
+    upsert_builds(db, [make_build(1, price=120000)])
+    assert row_count(db) == 2
+    assert db.get(PCBuildDB, "1_1").price == 120000
+
+def test_duplicate_ids_in_chunk_keep_last(db):
+    # Один товар дважды в пачке (два поста стены): одна строка, последняя версия
+    written = upsert_builds(db, [make_build(1), make_build(1, price=150000), make_build(2)])
+    assert written == 2
+    assert row_count(db) == 2
+    assert db.get(PCBuildDB, "1_1").price == 150000
+
+def test_duplicate_ids_across_chunks(db):
+    upsert_builds(db, [make_build(1), make_build(2), make_build(1, price=90000)], chunk_size=2)
+    assert row_count(db) == 2
+    assert db.get(PCBuildDB, "1_1").price == 90000
+
+def test_is_our_build_set_on_insert(db):
+    upsert_builds(db, [make_build(1, company="VA-PC"), make_build(2)])
+    assert db.get(PCBuildDB, "1_1").is_our_build
+    assert not db.get(PCBuildDB, "1_2").is_our_build
+
+def stats_snapshot(db) -> tuple:
+    stats = db.get(BuildStatsDB, STATS_ID)
+    db.refresh(stats)
+    return stats.total_builds, stats.our_builds, stats.last_update, json.loads(stats.companies)
+
+def test_incremental_stats_match_rebuild(db):
+    upsert_builds(db, [make_build(n, company="VA-PC" if n % 4 == 0 else "HYPERPC", price=60000 + n * 1000)
+                       for n in range(30)], chunk_size=7)
+    # Обновление цен, переход сборки в другую компанию, повторы id и новые сборки
+    upsert_builds(db, [make_build(1, price=250000), make_build(2, company="Compday"),
+                       make_build(2, company="Compday", price=70000), make_build(40, company="Compday"),
+                       make_build(41, company="VA-PC", parsed_at=datetime(2024, 2, 1))], chunk_size=2)
+    incremental = stats_snapshot(db)
+
+    rebuild_stats(db)
+    db.commit()
+    assert incremental == stats_snapshot(db)
+    assert incremental[0] == row_count(db) == 32
+    assert incremental[2] == datetime(2024, 2, 1)
+
+def test_duplicate_ids_counted_once(db):
+    upsert_builds(db, [make_build(1), make_build(1), make_build(2)])
+    assert stats_snapshot(db)[0] == row_count(db) == 2
+
+def test_percentiles_refreshed_once_by_caller(db):
+    touched = set()
+    upsert_builds(db, [make_build(1, price=100000)], touched=touched)
+    upsert_builds(db, [make_build(2, price=200000)], touched=touched)
+    # Счетчики - сразу, перцентили - после refresh_company_stats
+    assert stats_snapshot(db)[0] == 2
+    assert "HYPERPC" not in stats_snapshot(db)[3]
+
+    refresh_company_stats(db, touched)
+    companies = stats_snapshot(db)[3]
+    assert companies["HYPERPC"]["builds"] == 2
+    assert companies["HYPERPC"]["median_price"] == 150000
+
+def test_stats_endpoint(client, db):
+    upsert_builds(db, [make_build(1, company="VA-PC"), make_build(2), make_build(3)])
+    stats = client.get("/api/stats").json()
+    assert (stats["total_builds"], stats["our_builds"], stats["other_builds"]) == (3, 1, 2)
+    assert stats["companies"]["HYPERPC"]["builds"] == 2
@@ -0,0 +1,73 @@
+"""ETag и If-None-Match на GET-эндпоинтах"""
+
+import pytest
+from sqlalchemy import event
+
+from app.cache import get_cache
+from app.database import engine, upsert_builds
+from conftest import make_build
+
+GET_ENDPOINTS = [
+    "/api/builds/our",
+    "/api/builds/1_1",
+    "/api/stats",
+    "/api/compare/price?build_id=1_1",
+    "/api/compare/specs?build_id=1_1",
+    "/api/compare/specs?build_id=1_1&comparison_type=similar",
+    "/api/compare/batch?comparison_type=price",
+]
+
+@pytest.fixture
+def builds(db):
+    upsert_builds(db, [make_build(n, company="VA-PC" if n < 3 else "HYPERPC", price=90000 + n * 5000)
+                       for n in range(10)])
+    get_cache().bump_version()
+
+@pytest.fixture
+def statements():
+    """SQL-запросы, выполненные за время теста"""
+    executed = []
+
+    def count(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine, "before_cursor_execute", count)
+
+@pytest.mark.parametrize("url", GET_ENDPOINTS)
+def test_matching_etag_gives_304_without_sql(client, builds, statements, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"]
+
+    statements.clear()
+    repeat = client.get(url, headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.headers["etag"] == etag
+    assert statements == []
+
+    # Слабое сравнение и список тегов
+    assert client.get(url, headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+@pytest.mark.parametrize("url", GET_ENDPOINTS)
+def test_old_etag_after_bump_gives_200(client, builds, url):
+    etag = client.get(url).headers["etag"]
+    get_cache().bump_version()
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+@pytest.mark.parametrize("get_url, post_url, body", [
+    ("/api/compare/price?build_id=1_1", "/api/compare/price", {"build_id": "1_1", "comparison_type": "price"}),
+    ("/api/compare/specs?build_id=1_1&comparison_type=similar&price_weight=0.5", "/api/compare/specs",
+     {"build_id": "1_1", "comparison_type": "similar", "price_weight": 0.5}),
+    ("/api/compare/batch?comparison_type=specs&build_ids=1_1,1_2", "/api/compare/batch",
+     {"comparison_type": "specs", "build_ids": ["1_1", "1_2"]}),
+])
+def test_get_and_post_bodies_match(client, builds, get_url, post_url, body):
+    response = client.post(post_url, json=body)
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert client.get(get_url).content == response.content
@@ -0,0 +1,57 @@
+"""Снимки индексов: одна перестройка на всех и ограниченное ожидание"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.indexes import Snapshot
+
+def slow_snapshot(seconds: float):
+    builds = []
+
+    def build(db):
+        builds.append(1)
+        time.sleep(seconds)
+        return f"index {len(builds)}"
+
+    return Snapshot("test index", build), builds
+
+def test_concurrent_misses_share_one_rebuild():
+    snapshot, builds = slow_snapshot(0.2)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: snapshot.wait(1, timeout=5), range(8)))
+    assert results == ["index 1"] * 8
+    assert len(builds) == 1
+    assert snapshot.get(1) == "index 1"
+
+def test_newer_version_waits_for_its_own_rebuild():
+    snapshot, builds = slow_snapshot(0.1)
+    assert snapshot.wait(1, timeout=5) == "index 1"
+    assert snapshot.wait(2, timeout=5) == "index 2"
+    # Снимок новее запрошенной версии подходит
+    assert snapshot.wait(1, timeout=5) == "index 2"
+    assert len(builds) == 2
+
+def test_wait_is_bounded():
+    snapshot, builds = slow_snapshot(1.0)
+    start = time.monotonic()
+    assert snapshot.wait(1, timeout=0.1) is None
+    assert time.monotonic() - start < 0.5
+    # Перестройка продолжается в фоне и достается следующим запросам
+    assert snapshot.wait(1, timeout=5) == "index 1"
+    assert len(builds) == 1
+
+def test_failed_rebuild_returns_none():
+    def fail(db):
+        raise RuntimeError("db down")
+
+    snapshot = Snapshot("broken index", fail)
+    start = time.monotonic()
+    assert snapshot.wait(1, timeout=5) is None
+    assert time.monotonic() - start < 1
+
+def test_disabled_or_unknown_version():
+    snapshot, builds = slow_snapshot(0)
+    assert snapshot.wait(-1) is None
+    assert Snapshot("off", lambda db: 1, enabled=False).wait(1) is None
+    assert not builds
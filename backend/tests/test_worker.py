@@ -0,0 +1,42 @@
+"""Пул процессов парсинга: восстановление после гибели процесса"""
+
+import asyncio
+import logging
+import os
+import signal
+
+import pytest
+
+from app import worker
+
+@pytest.fixture
+def crawl_pool():
+    yield
+    worker.shutdown()
+
+def test_killed_crawl_process_does_not_break_next_jobs(db, crawl_pool, caplog):
+    caplog.set_level(logging.INFO, logger="app.worker")
+
+    async def run():
+        job = asyncio.create_task(worker.submit_parse_job([], "market"))
+        # Процесс парсинга запускается при отправке задачи - убиваем его посреди задачи
+        while not worker.get_executor()._processes:
+            await asyncio.sleep(0.01)
+        broken = worker.get_executor()
+        for process in list(broken._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        await job
+        assert worker._executor is not broken
+
+        await worker.submit_parse_job([], "market")
+
+    asyncio.run(run())
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("crawl process died" in message for message in messages)
+    assert any(message.startswith("Parse job finished") for message in messages)
+
+def test_pool_broken_while_idle_is_replaced(crawl_pool):
+    executor = worker.get_executor()
+    with pytest.raises(Exception):
+        executor.submit(os._exit, 1).result()
+    assert worker.get_executor() is not executor
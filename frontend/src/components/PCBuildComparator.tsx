@@ -8,7 +8,7 @@ const PCBuildComparator: React.FC = () => {
   const [ourBuilds, setOurBuilds] = useState<PCBuild[]>([]);
   const [comparisonBuilds, setComparisonBuilds] = useState<PCBuild[]>([]);
   const [showBuildSelector, setShowBuildSelector] = useState(false);
-  const [comparisonType, setComparisonType] = useState<'price' | 'specs' | null>(null);
+  const [comparisonType, setComparisonType] = useState<'price' | 'specs' | 'similar' | null>(null);
   const [loading, setLoading] = useState(false);
 
   const api = new PCBuildsAPI();
@@ -63,6 +63,21 @@ const PCBuildComparator: React.FC = () => {
     }
   };
 
+  const compareBySimilarSpecs = async () => {
+    if (!selectedBuild) return;
+    
+    setLoading(true);
+    setComparisonType('similar');
+    try {
+      const builds = await api.compareBySimilarSpecs(selectedBuild.id);
+      setComparisonBuilds(builds);
+    } catch (error) {
+      console.error('Comparison failed:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   return (
     <div className="min-h-screen bg-black text-white">
       {/* Header */}
@@ -115,6 +130,13 @@ const PCBuildComparator: React.FC = () => {
                     Сравнить с другими ТОЛЬКО по CPU + GPU
                   </button>
 
+                  <button
+                    onClick={compareBySimilarSpecs}
+                    className="w-full bg-purple-600 hover:bg-purple-700 text-white font-bold py-3 px-6 rounded-lg transition-colors"
+                  >
+                    Похожие по производительности
+                  </button>
+
                   <button
                     onClick={() => {
                       setSelectedBuild(null);
@@ -137,6 +159,8 @@ const PCBuildComparator: React.FC = () => {
             <h2 className="text-2xl font-bold mb-6">
               {comparisonType === 'price' 
                 ? `Сборки в диапазоне ±50,000 руб. от ${selectedBuild?.price_formatted}`
+                : comparisonType === 'similar'
+                ? `Сборки, близкие по производительности к ${selectedBuild?.cpu} + ${selectedBuild?.gpu}`
                 : `Сборки с ${selectedBuild?.cpu} + ${selectedBuild?.gpu}`
               }
             </h2>
@@ -20,6 +20,7 @@ export interface PCBuild {
 export interface ComparisonRequest {
   build_id: string;
   comparison_type: string;
+  price_weight?: number;
 }
 
 export interface ParseRequest {
@@ -50,15 +51,10 @@ export class PCBuildsAPI {
     return response.json();
   }
 
+  // GET-варианты сравнения: браузер кэширует ответы и перепроверяет их по ETag
   async compareByPrice(buildId: string): Promise<PCBuild[]> {
-    const response = await fetch(`${this.baseUrl}/compare/price`, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ 
-        build_id: buildId, 
-        comparison_type: 'price' 
-      })
-    });
+    const params = new URLSearchParams({ build_id: buildId });
+    const response = await fetch(`${this.baseUrl}/compare/price?${params}`);
     if (!response.ok) {
       throw new Error('Comparison failed');
     }
@@ -66,27 +62,50 @@ export class PCBuildsAPI {
   }
 
   async compareBySpecs(buildId: string): Promise<PCBuild[]> {
-    const response = await fetch(`${this.baseUrl}/compare/specs`, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ 
-        build_id: buildId, 
-        comparison_type: 'specs' 
-      })
+    const params = new URLSearchParams({ build_id: buildId, comparison_type: 'specs' });
+    const response = await fetch(`${this.baseUrl}/compare/specs?${params}`);
+    if (!response.ok) {
+      throw new Error('Comparison failed');
+    }
+    return response.json();
+  }
+
+  async compareBySimilarSpecs(buildId: string, priceWeight: number = 0): Promise<PCBuild[]> {
+    const params = new URLSearchParams({
+      build_id: buildId,
+      comparison_type: 'similar',
+      price_weight: String(priceWeight)
     });
+    const response = await fetch(`${this.baseUrl}/compare/specs?${params}`);
+    if (!response.ok) {
+      throw new Error('Comparison failed');
+    }
+    return response.json();
+  }
+
+  async compareBatch(
+    comparisonType: 'price' | 'specs' | 'similar',
+    buildIds?: string[]
+  ): Promise<Record<string, PCBuild[]>> {
+    const params = new URLSearchParams({ comparison_type: comparisonType });
+    if (buildIds) {
+      params.set('build_ids', buildIds.join(','));
+    }
+    const response = await fetch(`${this.baseUrl}/compare/batch?${params}`);
     if (!response.ok) {
       throw new Error('Comparison failed');
     }
     return response.json();
   }
 
-  async startParsing(groupIds: number[], source: string = 'market'): Promise<any> {
+  async startParsing(groupIds: number[], source: string = 'market', fullResync: boolean = false): Promise<any> {
     const response = await fetch(`${this.baseUrl}/parse/start`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ 
         group_ids: groupIds, 
-        source: source 
+        source: source,
+        full_resync: fullResync
       })
     });
     if (!response.ok) {